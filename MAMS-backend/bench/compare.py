@@ -0,0 +1,78 @@
+"""Compare two ``bench.run`` reports, e.g. from before and after a change.
+
+    python -m bench.compare before.json after.json --threshold 10
+    python -m bench.compare sync.json gevent.json    # two --server modes
+
+Prints throughput and p95 per route, size and concurrency level, and exits
+with status 1 if any of them got worse by more than ``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report["meta"], {
+        (result["students"], result["route"], result["concurrency"]): result
+        for result in report["results"]
+    }
+
+
+def _server(meta):
+    # Reports from before --server existed ran on the threaded development server
+    server = meta.get("server", "werkzeug")
+    return server if server == "werkzeug" else f"{server} x{meta.get('workers', 1)}"
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) * 100 / before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    before_meta, before = _load(args.before)
+    after_meta, after = _load(args.after)
+    print(
+        f"before: {before_meta.get('commit')} ({_server(before_meta)})  "
+        f"after: {after_meta.get('commit')} ({_server(after_meta)})"
+    )
+    print(f"{'students':>9} {'route':30} {'c':>3} {'req/s':>18} {'p95 ms':>20} {'errors':>9}")
+
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        throughput = _change(old["throughput_rps"], new["throughput_rps"])
+        p95 = _change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        regressed = (
+            (throughput is not None and throughput < -args.threshold)
+            or (p95 is not None and p95 > args.threshold)
+            or new["errors"] > old["errors"]
+        )
+        regressions += regressed
+        students, route, concurrency = key
+        print(
+            f"{students:>9} {route:30} {concurrency:>3} "
+            f"{new['throughput_rps']:>9} ({throughput if throughput is not None else 0:+6.1f}%) "
+            f"{new['latency_ms']['p95']:>11} ({p95 if p95 is not None else 0:+6.1f}%) "
+            f"{old['errors']:>4}->{new['errors']:<4}"
+            + ("  REGRESSION" if regressed else "")
+        )
+
+    for key in sorted(before.keys() ^ after.keys()):
+        print(f"only in {'before' if key in before else 'after'}: {key}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
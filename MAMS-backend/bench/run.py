@@ -0,0 +1,637 @@
+"""Benchmark and load test for every API route.
+
+Seeds a database at each requested size, starts the app in a child process
+with the in-memory storage backend, and drives each route at several
+concurrency levels. Throughput and p50/p95/p99 latency go to a JSON file
+that can be diffed between commits with ``python -m bench.compare``.
+
+Run from ``MAMS-backend``::
+
+    python -m bench.run --students 1000,10000,100000 --concurrency 1,8,32
+    python -m bench.run --routes students_all,documents_upload --output before.json
+
+``--server`` picks what serves the app: Werkzeug's threaded development
+server (default), or gunicorn with ``--workers`` sync or gevent workers, the
+two production modes (``WORKER_MODE`` in ``gunicorn.conf.py``). Run it once
+per mode and compare the reports::
+
+    python -m bench.run --server sync --routes documents_upload --output sync.json
+    python -m bench.run --server gevent --routes documents_upload --output gevent.json
+    python -m bench.compare sync.json gevent.json
+
+Without ``--database-url`` a throwaway SQLite file is used. SQLite serialises
+writers, so for realistic numbers on the write routes point it at a scratch
+PostgreSQL database (every table in it is dropped and recreated).
+"""
+import argparse
+import datetime
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+
+from bench.seed import ACADEMIC_YEARS, PLACEMENT_STATUSES, gr_no, seed
+
+DEFAULT_STUDENTS = (1000, 10000, 100000)
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_REQUESTS = 200
+WARMUP_REQUESTS = 5
+BENCH_PASSWORD = "bench-password"
+
+# One request per call, ``request(ctx, i)`` returns ``(method, path, body, headers)``.
+# Write scenarios that use up seeded rows get a ``prepare(ctx)`` run before every level.
+# ``background`` is another request function kept busy by --storm-concurrency clients
+# while the level is measured, e.g. reads during an upload storm.
+Scenario = namedtuple("Scenario", "name method path request prepare requests_factor background", defaults=(None,))
+
+# Accounts the background clients spread their requests over
+STORM_USERS = 8
+
+
+class Context:
+    """Shared state the scenarios build their requests from."""
+
+    def __init__(self, models, students, pending_documents, upload_kb):
+        self.models = models
+        self.students = students
+        self.pending_documents = pending_documents
+        self.run_id = uuid.uuid4().hex[:6]
+        self.sequence = itertools.count()
+        self.padding = random.Random(students).randbytes(upload_kb * 1024)
+        self.token = None
+        self.storm_tokens = []
+        self._photo = None
+
+    def unique(self):
+        return next(self.sequence)
+
+    def random_gr_no(self, i):
+        return gr_no((i * 7919) % self.students)
+
+    def pdf(self):
+        # Unique bytes per call, so every upload is new content rather than a dedup hit
+        return b"%PDF-1.4\n%" + f"{self.run_id}-{self.unique()}".encode() + b"\n" + self.padding
+
+    def photo(self):
+        # A phone-camera sized JPEG; it goes through the image pool on every upload whatever its bytes
+        if self._photo is None:
+            import io
+            from PIL import Image
+
+            out = io.BytesIO()
+            Image.effect_noise((3000, 4000), 40).convert("RGB").save(out, format="JPEG", quality=92)
+            self._photo = out.getvalue()
+        return self._photo
+
+    def headers(self, extra=None):
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        headers.update(extra or {})
+        return headers
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content_type, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _json(ctx, value):
+    return json.dumps(value).encode(), ctx.headers({"Content-Type": "application/json"})
+
+
+# 🔹 Scenarios
+
+def _get(path, headers=None):
+    return lambda ctx, i: ("GET", path, None, ctx.headers(headers))
+
+
+def _students_page(ctx, i):
+    year = ACADEMIC_YEARS[i % len(ACADEMIC_YEARS)]
+    return "GET", f"/api/students/all?academic_year={year}&cursor={ctx.random_gr_no(i)}", None, ctx.headers()
+
+
+STATUS_BATCH = 50
+
+
+def _student_status(ctx, i):
+    gr_numbers = ",".join(ctx.random_gr_no(i * STATUS_BATCH + j) for j in range(STATUS_BATCH))
+    return "GET", f"/api/students/status?gr_no={gr_numbers}", None, ctx.headers()
+
+
+def _register(ctx, i, email=None):
+    email = email or f"bench-{ctx.run_id}-{ctx.unique()}@example.com"
+    body, headers = _json(ctx, {"email": email, "password": BENCH_PASSWORD})
+    return "POST", "/api/auth/register", body, headers
+
+
+def _login(ctx, i):
+    body, headers = _json(ctx, {"email": f"bench-{ctx.run_id}@example.com", "password": BENCH_PASSWORD})
+    return "POST", "/api/auth/login", body, headers
+
+
+def _add_student(ctx, i):
+    n = ctx.unique()
+    body, headers = _json(ctx, {
+        "gr_no": f"S{ctx.run_id}{n:08d}",
+        "name": f"Bench Student {n}",
+        "enroll_no": f"SE{ctx.run_id}{n:08d}",
+        "academic_year": ACADEMIC_YEARS[n % len(ACADEMIC_YEARS)],
+    })
+    return "POST", "/api/students", body, headers
+
+
+BULK_ROWS = 200
+
+
+def _bulk_import(ctx, i):
+    n = ctx.unique()
+    lines = ["gr_no,name,enroll_no,academic_year"]
+    for j in range(BULK_ROWS):
+        lines.append(
+            f"B{ctx.run_id}{n:06d}{j:03d},Bulk Student {j},BE{ctx.run_id}{n:06d}{j:03d},"
+            f"{ACADEMIC_YEARS[j % len(ACADEMIC_YEARS)]}"
+        )
+    body, content_type = _multipart({}, {"file": ("students.csv", "text/csv", "\n".join(lines).encode())})
+    return "POST", "/api/students/bulk", body, ctx.headers({"Content-Type": content_type})
+
+
+def _placement_upload(ctx, i):
+    body, content_type = _multipart(
+        {"gr_no": ctx.random_gr_no(i), "status": PLACEMENT_STATUSES[i % len(PLACEMENT_STATUSES)]},
+        {"proof": ("proof.pdf", "application/pdf", ctx.pdf())}
+    )
+    return "POST", "/api/placement-details", body, ctx.headers({"Content-Type": content_type})
+
+
+def _storm_placement_upload(ctx, i):
+    method, path, body, headers = _placement_upload(ctx, i)
+    headers["Authorization"] = f"Bearer {ctx.storm_tokens[i % len(ctx.storm_tokens)]}"
+    return method, path, body, headers
+
+
+def _placement_upload_photo(ctx, i):
+    body, content_type = _multipart(
+        {"gr_no": ctx.random_gr_no(i), "status": PLACEMENT_STATUSES[i % len(PLACEMENT_STATUSES)]},
+        {"proof": ("proof.jpg", "image/jpeg", ctx.photo())}
+    )
+    return "POST", "/api/placement-details", body, ctx.headers({"Content-Type": content_type})
+
+
+def _documents_upload(ctx, i):
+    files = {
+        key: (f"{key}.pdf", "application/pdf", ctx.pdf())
+        for key in ("registration_form", "marks10", "marks12", "gujcet")
+    }
+    body, content_type = _multipart({"gr_no": ctx.pending_documents[i % len(ctx.pending_documents)]}, files)
+    return "POST", "/api/documents/upload", body, ctx.headers({"Content-Type": content_type})
+
+
+def _placement_upload_url(ctx, i):
+    # First phase of a direct upload, the bytes themselves never reach the app
+    proof = ctx.pdf()
+    body, headers = _json(ctx, {"gr_no": ctx.random_gr_no(i), "files": {"proof": {
+        "filename": "proof.pdf", "size": len(proof), "sha256": hashlib.sha256(proof).hexdigest()
+    }}})
+    return "POST", "/api/placement-details/upload-url", body, headers
+
+
+def _free_pending_documents(ctx):
+    # Hand the same students out again: drop the rows the previous level created
+    models = ctx.models
+    table = models.EnrollmentRatio.__table__
+    for start in range(0, len(ctx.pending_documents), 500):
+        batch = ctx.pending_documents[start:start + 500]
+        models.db.session.execute(table.delete().where(table.c.gr_no.in_(batch)))
+    models.db.session.commit()
+
+
+RESULTS_PER_REQUEST = 100
+
+
+def _semester_results(ctx, i):
+    rng = random.Random(i)
+    results = [{
+        "gr_no": ctx.random_gr_no(i * RESULTS_PER_REQUEST + j),
+        "semester": rng.randint(1, 8),
+        "sgpa": round(rng.uniform(5, 10), 2),
+        "cgpa": round(rng.uniform(5, 10), 2),
+        "backlogs": 0,
+    } for j in range(RESULTS_PER_REQUEST)]
+    body, headers = _json(ctx, results)
+    return "POST", "/api/semester-results", body, headers
+
+
+SCENARIOS = [
+    Scenario("test_db", "GET", "/api/test-db", _get("/api/test-db"), None, 1),
+    Scenario("metrics", "GET", "/api/metrics", _get("/api/metrics"), None, 1),
+    Scenario("cache_stats", "GET", "/api/cache/stats", _get("/api/cache/stats"), None, 1),
+    Scenario("students_all", "GET", "/api/students/all", _get("/api/students/all"), None, 1),
+    Scenario("students_all_gzip", "GET", "/api/students/all",
+             _get("/api/students/all", {"Accept-Encoding": "gzip"}), None, 1),
+    Scenario("students_all_br", "GET", "/api/students/all",
+             _get("/api/students/all", {"Accept-Encoding": "br"}), None, 1),
+    Scenario("students_all_stream", "GET", "/api/students/all?limit=all",
+             _get("/api/students/all?limit=all"), None, 0.25),
+    Scenario("students_all_stream_gzip", "GET", "/api/students/all?limit=all",
+             _get("/api/students/all?limit=all", {"Accept-Encoding": "gzip"}), None, 0.25),
+    Scenario("students_all_filtered", "GET", "/api/students/all", _students_page, None, 1),
+    Scenario("students_without_placement", "GET", "/api/students", _get("/api/students"), None, 1),
+    Scenario("students_without_documents", "GET", "/api/students/available-for-documents",
+             _get("/api/students/available-for-documents"), None, 1),
+    Scenario("students_status", "GET", "/api/students/status", _student_status, None, 1),
+    Scenario("criteria_4_summary", "GET", "/api/criteria/4/summary", _get("/api/criteria/4/summary"), None, 1),
+    Scenario("criteria_4_performance", "GET", "/api/criteria/4/performance",
+             _get("/api/criteria/4/performance"), None, 0.25),
+    Scenario("report_csv", "GET", "/api/reports/criteria-4.csv",
+             _get("/api/reports/criteria-4.csv", {"Accept-Encoding": "gzip"}), None, 0.1),
+    Scenario("report_xlsx", "GET", "/api/reports/criteria-4.xlsx", _get("/api/reports/criteria-4.xlsx"), None, 0.1),
+    Scenario("auth_register", "POST", "/api/auth/register", _register, None, 0.25),
+    Scenario("auth_login", "POST", "/api/auth/login", _login, None, 0.25),
+    Scenario("students_create", "POST", "/api/students", _add_student, None, 1),
+    Scenario("students_bulk", "POST", "/api/students/bulk", _bulk_import, None, 0.25),
+    Scenario("semester_results", "POST", "/api/semester-results", _semester_results, None, 0.5),
+    Scenario("placement_upload", "POST", "/api/placement-details", _placement_upload, None, 0.5),
+    Scenario("placement_upload_photo", "POST", "/api/placement-details", _placement_upload_photo, None, 0.25),
+    Scenario("placement_upload_url", "POST", "/api/placement-details/upload-url", _placement_upload_url, None, 0.5),
+    Scenario("documents_upload", "POST", "/api/documents/upload", _documents_upload, _free_pending_documents, 0.5),
+    Scenario("students_all_during_upload_storm", "GET", "/api/students/all", _students_page, None, 0.5,
+             _storm_placement_upload),
+]
+
+
+# 🔹 Server
+
+SERVERS = ("werkzeug", "sync", "gevent")
+SERVER_START_TIMEOUT = 60
+
+
+def start_server(server="werkzeug", workers=1):
+    # Own session, so stopping it also stops the password hashing workers it starts
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.server", server, str(workers)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.PIPE,
+        start_new_session=True
+    )
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        raise RuntimeError(f"Benchmark server exited with code {process.returncode}")
+    host, port = "127.0.0.1", int(line)
+    _wait_for_port(process, host, port)
+    return process, host, port
+
+
+def _wait_for_port(process, host, port):
+    # gunicorn reports the port before its workers have booted
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Benchmark server exited with code {process.returncode}")
+            if time.monotonic() > deadline:
+                stop_server(process)
+                raise RuntimeError(f"Benchmark server did not listen on port {port}")
+            time.sleep(0.1)
+
+
+def stop_server(process):
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+            process.wait(timeout=10)
+            return
+        except ProcessLookupError:
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def _send(host, port, method, path, body, headers):
+    connection = http.client.HTTPConnection(host, port, timeout=120)
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+class Background:
+    """Keeps ``concurrency`` clients sending ``request`` until the block exits, tallying statuses."""
+
+    def __init__(self, host, port, ctx, request, concurrency):
+        self.host, self.port, self.ctx, self.request = host, port, ctx, request
+        self.concurrency = concurrency
+        self.statuses = Counter()
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _client(self):
+        while not self._stop.is_set():
+            method, path, body, headers = self.request(self.ctx, next(self._counter))
+            try:
+                status = str(_send(self.host, self.port, method, path, body, headers)[0])
+            except Exception as e:
+                status = type(e).__name__
+            with self._lock:
+                self.statuses[status] += 1
+
+    def __enter__(self):
+        self._threads = [threading.Thread(target=self._client) for _ in range(self.concurrency)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def summary(self):
+        return {"concurrency": self.concurrency, "statuses": dict(sorted(self.statuses.items()))}
+
+
+def _storm_tokens(host, port, ctx):
+    tokens = []
+    for k in range(STORM_USERS):
+        email = f"bench-{ctx.run_id}-storm{k}@example.com"
+        _send(host, port, *_register(ctx, None, email=email))
+        body, headers = _json(ctx, {"email": email, "password": BENCH_PASSWORD})
+        status, response = _send(host, port, "POST", "/api/auth/login", body, headers)
+        tokens.append(json.loads(response).get("token"))
+    return tokens
+
+
+# 🔹 Measurement
+
+def percentile(values, point):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * point / 100))]
+
+
+def run_level(host, port, scenario, ctx, concurrency, total):
+    counter = itertools.count()
+    latencies = []
+    sizes = []
+    statuses = Counter()
+    error_samples = []
+    lock = threading.Lock()
+
+    def worker():
+        local_latencies = []
+        local_sizes = []
+        local_statuses = Counter()
+        local_error = None
+        while True:
+            i = next(counter)
+            if i >= total:
+                break
+            method, path, body, headers = scenario.request(ctx, i)
+            started = time.perf_counter()
+            try:
+                status, response_body = _send(host, port, method, path, body, headers)
+                status = str(status)
+            except Exception as e:
+                status, response_body = type(e).__name__, str(e).encode()
+            local_latencies.append(time.perf_counter() - started)
+            local_sizes.append(len(response_body))
+            local_statuses[status] += 1
+            if local_error is None and not status.startswith(("2", "3")):
+                local_error = f"{status}: {response_body[:200].decode(errors='replace')}"
+        with lock:
+            latencies.extend(local_latencies)
+            sizes.extend(local_sizes)
+            statuses.update(local_statuses)
+            if local_error:
+                error_samples.append(local_error)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_sample": error_samples[0] if error_samples else None,
+        "statuses": dict(sorted(statuses.items())),
+        # Bytes on the wire, i.e. after any Content-Encoding
+        "response_bytes": round(sum(sizes) / len(sizes)) if sizes else None,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", latencies[-1] if latencies else None),
+            )
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=_int_list, default=list(DEFAULT_STUDENTS),
+                        help="comma-separated database sizes to seed (1000 to 500000)")
+    parser.add_argument("--concurrency", type=_int_list, default=list(DEFAULT_CONCURRENCY),
+                        help="comma-separated numbers of concurrent clients")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help="requests per route and concurrency level (write routes use a fraction)")
+    parser.add_argument("--routes", help="comma-separated scenario names, default all")
+    parser.add_argument("--semesters", type=int, default=4, help="semester results seeded per student")
+    parser.add_argument("--upload-kb", type=int, default=200, help="size of each uploaded file")
+    parser.add_argument("--storage-latency-ms", type=float, default=20,
+                        help="simulated round trip of every storage call")
+    parser.add_argument("--server", choices=SERVERS, default="werkzeug",
+                        help="werkzeug (threaded dev server), or gunicorn with sync or gevent workers")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--admission", action="store_true",
+                        help="keep admission control on (off by default, it would turn the upload levels away)")
+    parser.add_argument("--storm-concurrency", type=int, default=32,
+                        help="background clients for the *_during_*_storm scenarios")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on (off by default)")
+    parser.add_argument("--database-url", help="scratch database to use; ALL ITS TABLES ARE DROPPED")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    return parser.parse_args(argv)
+
+
+def _configure_environment(args, workdir):
+    # Set before the app is imported, here and in the server process
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ["MEMORY_STORAGE_LATENCY_MS"] = str(args.storage_latency_ms)
+    if args.cache and args.server != "werkzeug" and args.workers > 1:
+        # gunicorn.conf.py refuses several workers on the per-process memory cache
+        os.environ["RESPONSE_CACHE_BACKEND"] = "sqlite"
+        os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "response_cache.sqlite3")
+    else:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+    if not args.cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    if not args.admission:
+        os.environ["ADMISSION_CONTROL"] = "false"
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key-not-for-production-use")
+    os.environ["SLOW_REQUEST_MS"] = "0"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name:30} {scenario.method:5} {scenario.path}")
+        return 0
+
+    scenarios = SCENARIOS
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        unknown = wanted - {s.name for s in SCENARIOS}
+        if unknown:
+            print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+        scenarios = [s for s in SCENARIOS if s.name in wanted]
+
+    workdir = tempfile.mkdtemp(prefix="mams-bench-")
+    _configure_environment(args, workdir)
+    from mams import create_app, models
+    from mams.serialization import ENCODER
+
+    app = create_app()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage_latency_ms": args.storage_latency_ms,
+            "upload_kb": args.upload_kb,
+            "response_cache": args.cache,
+            "requests_per_level": args.requests,
+            "json_encoder": ENCODER,
+            "server": args.server,
+            "workers": args.workers,
+            "admission_control": args.admission,
+        },
+        "results": [],
+    }
+
+    with app.app_context():
+        report["meta"]["database"] = models.db.engine.dialect.name
+        for students in args.students:
+            print(f"Seeding {students} students...", flush=True)
+            started = time.perf_counter()
+            pending = seed(models, students, semesters=args.semesters)
+            ctx = Context(models, students, pending, args.upload_kb)
+            print(f"  seeded in {time.perf_counter() - started:.1f}s", flush=True)
+
+            process, host, port = start_server(args.server, args.workers)
+            try:
+                # Registered through the API, the server owns the hashing pool
+                _send(host, port, *_register(ctx, None, email=f"bench-{ctx.run_id}@example.com"))
+                ctx.token = _login_token(host, port, ctx)
+                for scenario in scenarios:
+                    for concurrency in args.concurrency:
+                        total = max(concurrency, int(args.requests * scenario.requests_factor))
+                        if scenario.name == "documents_upload":
+                            total = min(total, len(pending))
+                        if scenario.prepare:
+                            scenario.prepare(ctx)
+                        if total == 0:
+                            continue
+                        run_level(host, port, scenario, ctx, 1, min(WARMUP_REQUESTS, total))
+                        if scenario.prepare:
+                            scenario.prepare(ctx)
+                        if scenario.background:
+                            if not ctx.storm_tokens:
+                                ctx.storm_tokens = _storm_tokens(host, port, ctx)
+                            with Background(host, port, ctx, scenario.background, args.storm_concurrency) as storm:
+                                result = run_level(host, port, scenario, ctx, concurrency, total)
+                            result["background"] = storm.summary()
+                        else:
+                            result = run_level(host, port, scenario, ctx, concurrency, total)
+                        report["results"].append({
+                            "students": students,
+                            "route": scenario.name,
+                            "method": scenario.method,
+                            "path": scenario.path,
+                            "concurrency": concurrency,
+                            **result,
+                        })
+                        latency = result["latency_ms"]
+                        print(
+                            f"  {scenario.name:30} c={concurrency:<3} {result['throughput_rps']:>9} req/s "
+                            f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                            f"{result['response_bytes']}B errors={result['errors']}",
+                            flush=True
+                        )
+                        if "background" in result:
+                            print(f"    background: {result['background']['statuses']}", flush=True)
+                        if result["error_sample"]:
+                            print(f"    first error: {result['error_sample']}", flush=True)
+            finally:
+                stop_server(process)
+
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2, sort_keys=True)
+        out.write("\n")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def _login_token(host, port, ctx):
+    status, body = _send(host, port, *_login(ctx, 0))
+    return json.loads(body).get("token") if status == 200 else None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
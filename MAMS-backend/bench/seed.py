@@ -0,0 +1,113 @@
+"""Deterministic seed data for the benchmark database.
+
+Rows are generated from the student count alone, so two runs with the same
+``--students`` value see exactly the same tables.
+"""
+import random
+
+ACADEMIC_YEARS = ("2019-20", "2020-21", "2021-22", "2022-23", "2023-24")
+PLACEMENT_STATUSES = ("placement", "higher-studies", "entrepreneur", "other")
+
+# Share of students that already have a placement / enrollment documents row
+PLACED_FRACTION = 0.6
+DOCUMENTED_FRACTION = 0.7
+
+INSERT_BATCH = 10000
+SEED_URL = "http://storage.invalid/seed"
+
+
+def gr_no(i):
+    return f"GR{i:08d}"
+
+
+def _batched(rows, size=INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _students(count):
+    for i in range(count):
+        yield {
+            "gr_no": gr_no(i),
+            "name": f"Student {i}",
+            "enroll_no": f"EN{i:010d}",
+            "academic_year": ACADEMIC_YEARS[i % len(ACADEMIC_YEARS)],
+        }
+
+
+def _placements(count, rng):
+    for i in range(count):
+        if rng.random() < PLACED_FRACTION:
+            yield {
+                "gr_no": gr_no(i),
+                "after_graduation": PLACEMENT_STATUSES[i % len(PLACEMENT_STATUSES)],
+                "doc_proof_url": f"{SEED_URL}/proof/{i}.pdf",
+            }
+
+
+def _enrollments(count, rng, pending):
+    for i in range(count):
+        if rng.random() < DOCUMENTED_FRACTION:
+            yield {
+                "gr_no": gr_no(i),
+                "registration_form_url": f"{SEED_URL}/registration/{i}.pdf",
+                "marks10_url": f"{SEED_URL}/marks10/{i}.pdf",
+                "marks12_url": f"{SEED_URL}/marks12/{i}.pdf",
+                "gujcet_marksheet_url": f"{SEED_URL}/gujcet/{i}.pdf",
+            }
+        else:
+            pending.append(gr_no(i))
+
+
+def _semester_results(count, semesters, rng):
+    for i in range(count):
+        cgpa = round(rng.uniform(5.0, 9.5), 2)
+        for semester in range(1, semesters + 1):
+            backlogs = 1 if rng.random() < 0.08 else 0
+            yield {
+                "gr_no": gr_no(i),
+                "semester": semester,
+                "sgpa": round(min(10.0, max(0.0, cgpa + rng.uniform(-0.8, 0.8))), 2),
+                "cgpa": cgpa,
+                "backlogs": backlogs,
+                "appeared": True,
+            }
+
+
+def seed(models, students, semesters=4, seed_value=13):
+    """Recreate every table and fill it for ``students`` students.
+
+    ``models`` is the ``mams.models`` module, imported by the caller once
+    the environment is set up.
+
+    Returns the GR numbers that have no enrollment documents yet, which the
+    document upload scenario hands out one per request.
+    """
+    db = models.db
+    rng = random.Random(seed_value)
+    pending = []
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+    # Core inserts skip the ORM flush hooks, the counters are rebuilt at the end
+    tables = (
+        (models.Student.__table__, _students(students)),
+        (models.Placement.__table__, _placements(students, rng)),
+        (models.EnrollmentRatio.__table__, _enrollments(students, rng, pending)),
+        (models.SemesterResult.__table__, _semester_results(students, semesters, rng)),
+    )
+    for table, rows in tables:
+        for batch in _batched(rows):
+            db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+    models.rebuild_criteria_stats()
+    return pending
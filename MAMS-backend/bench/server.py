@@ -0,0 +1,55 @@
+"""Serve the app for ``bench.run``: prints the bound port, then serves until killed.
+
+    python -m bench.server [werkzeug|sync|gevent] [workers]
+
+``werkzeug`` is the threaded development server. ``sync`` and ``gevent`` run
+gunicorn with ``gunicorn.conf.py`` and that ``WORKER_MODE``, as in production.
+"""
+import logging
+import os
+import socket
+import sys
+
+from werkzeug.serving import make_server
+
+
+def serve_werkzeug():
+    from app import app
+
+    # Access logs and the routes' prints would only slow the server down
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    print(server.server_port, flush=True)
+    sys.stdout = open(os.devnull, "w")
+    server.serve_forever()
+
+
+def serve_gunicorn(mode, workers):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    print(port, flush=True)
+    # Nobody reads the pipe after the port, the routes' prints must not fill it
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.environ["WORKER_MODE"] = mode
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--config", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--log-level", "warning",
+    ])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    mode = argv[0] if argv else "werkzeug"
+    if mode == "werkzeug":
+        serve_werkzeug()
+    else:
+        serve_gunicorn(mode, int(argv[1]) if len(argv) > 1 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Picked up automatically by `gunicorn app:app` when run from this directory
+import os
+
+# 🔹 Worker mode, WORKER_MODE=sync (default) or gevent
+# The upload routes spend most of their time waiting on Supabase and PostgreSQL, and a
+# sync worker serves one request at a time. A gevent worker runs every request in a
+# greenlet and switches on each blocking socket call, so one process keeps
+# WORKER_CONNECTIONS requests in flight. The views don't change: httpx (Supabase), the
+# storage thread pool and time.sleep become cooperative once the standard library is
+# patched, psycogreen does the same for psycopg2's C code. The patching has to happen
+# here, before the app (and Flask) is preloaded, so nothing from mams is imported above.
+WORKER_MODE = os.getenv("WORKER_MODE", "sync")
+if WORKER_MODE == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:  # No psycopg2, the app is on SQLite
+        pass
+    else:
+        patch_psycopg()
+
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("WORKER_CONNECTIONS", "100"))
+elif WORKER_MODE != "sync":
+    raise ValueError(f"WORKER_MODE must be sync or gevent, got {WORKER_MODE!r}")
+
+# Build the app once in the master, workers are forked with everything imported
+preload_app = True
+
+
+def on_starting(server):
+    # Each worker would keep its own memory cache and never see the others' invalidations
+    from mams.cache import MemoryBackend
+    from mams.extensions import response_cache
+
+    backend = response_cache.backend
+    if server.cfg.workers > 1 and isinstance(backend, MemoryBackend) and backend.max_entries:
+        raise RuntimeError(
+            f"{server.cfg.workers} workers can't share the memory response cache, "
+            "set RESPONSE_CACHE_BACKEND=sqlite"
+        )
+
+
+def post_fork(server, worker):
+    # The master never connects, but never let a forked worker reuse a pooled connection
+    from app import app
+    from mams.extensions import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # A worker killed mid-request (timeout, OOM killer) never gave back its admission slots
+    from mams.admission import reclaim
+
+    reclaimed = reclaim(worker.pid)
+    if reclaimed:
+        server.log.warning("Reclaimed admission slots of worker %s: %s", worker.pid, reclaimed)
@@ -0,0 +1,92 @@
+"""MAMS backend package, build the app with :func:`create_app`.
+
+Building the app never touches the network: the database engine opens its
+first connection on first checkout and the Supabase client is created by
+the first storage call. That keeps worker boot short and makes
+``gunicorn --preload`` safe, no connection is shared across the fork.
+"""
+import os
+import time
+
+_import_started = time.perf_counter()
+from dotenv import load_dotenv  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask_cors import CORS  # noqa: E402
+from werkzeug.middleware.proxy_fix import ProxyFix  # noqa: E402
+_framework_import = time.perf_counter() - _import_started
+
+from .startup import StartupReport  # noqa: E402
+
+CORS_ORIGINS = [
+    "http://localhost:8080", "http://localhost:8081", "http://127.0.0.1:3000",
+    "https://madms-backend.onrender.com", "https://madms.vercel.app",
+]
+
+
+def create_app(config=None):
+    """Build the Flask app; ``config`` overrides settings read from the environment."""
+    report = StartupReport()
+    report.add("import flask", _framework_import)
+
+    with report.step("load .env"):
+        # Before the package modules, they read their settings from the environment on import
+        load_dotenv()
+
+    with report.step("import models"):
+        from .compression import init_compression
+        from .dbpool import engine_options, sqlite_savepoints
+        from .extensions import db
+        from .metrics import init_metrics
+        from .serialization import FastJSONProvider
+        from .uploads import MAX_REQUEST_SIZE, UploadRequest
+        from . import models  # noqa: F401
+
+    with report.step("import storage"):
+        from .storage import storage_backend
+        from .storage_backends import LocalStorage
+
+    with report.step("import blueprints"):
+        from .api import BLUEPRINTS
+        from .api.system import local_storage_file
+        from .commands import COMMANDS
+
+    with report.step("configure app"):
+        app = Flask(__name__)
+        app.request_class = UploadRequest  # Spool uploaded files to disk in bounded chunks
+        app.json = FastJSONProvider(app)  # orjson when installed
+
+        # 🔹 PostgreSQL Connection (Aiven)
+        app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+        # Enforced while the body is read, whether or not it declares a Content-Length
+        app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_SIZE
+        app.config.update(config or {})
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+        # Proxies in front of the app that append to X-Forwarded-For (e.g. 1 behind Render's load
+        # balancer). Left at 0 the header is ignored, clients could put anything in it
+        app.config.setdefault("PROXY_FIX_X_FOR", int(os.getenv("PROXY_FIX_X_FOR", "0")))
+        if app.config["PROXY_FIX_X_FOR"]:
+            # remote_addr becomes the client address the trusted proxies saw
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
+    with report.step("init extensions"):
+        db.init_app(app)
+        with app.app_context():
+            sqlite_savepoints(db.engine)
+        init_metrics(app)
+        init_compression(app)
+        # 🔹 Enable CORS for multiple frontend origins
+        CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, expose_headers=["X-Next-Cursor", "ETag", "X-Cache", "Content-Disposition", "Retry-After"])
+
+    with report.step("register blueprints"):
+        for blueprint in BLUEPRINTS:
+            app.register_blueprint(blueprint)
+        if isinstance(storage_backend, LocalStorage):
+            app.add_url_rule("/storage/<path:path>", view_func=local_storage_file, methods=["GET"])
+        for command in COMMANDS:
+            app.cli.add_command(command)
+
+    app.extensions["startup_report"] = report
+    report.log()
+    return app
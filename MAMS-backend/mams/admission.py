@@ -0,0 +1,264 @@
+"""Admission control for the expensive routes: uploads, bulk ingestion, report exports.
+
+Each limiter caps how many requests of its routes run at once, lets up to
+``queue`` more wait ``wait`` seconds for a slot, and caps every user (the
+JWT email, the client address without a token) at ``per_user`` slots, so
+one account's burst can't starve the others. Anything past that is turned
+away before its body is read: 429 when the user is over their share, 503
+when the route is full, both with ``Retry-After``.
+
+The slots live in shared memory created on import. With ``preload_app``
+that happens in the gunicorn master, so the limits hold across all worker
+processes: uploads can't take every sync worker, and the GET routes and
+logins always find a free one. Every slot records the worker holding it,
+and the master frees the slots of a worker that died mid-request (a
+gunicorn timeout, the OOM killer) in its ``child_exit`` hook, see
+``gunicorn.conf.py``. Waiting requests hold their worker too, so
+keep ``limit + queue`` below the worker count for sync workers, or below
+``WORKER_CONNECTIONS`` for gevent. A ``limit`` of 0 turns a limiter off,
+``ADMISSION_CONTROL=false`` turns them all off.
+"""
+import contextlib
+import multiprocessing
+import os
+import time
+import zlib
+from functools import partial, wraps
+
+from flask import current_app, g, jsonify, request
+
+from .metrics import Counter, Gauge, Histogram, registry
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+# Users are counted in this many hashed slots, two users sharing one only makes both stricter
+USER_SLOTS = 1024
+# Waiting requests poll for a slot, backing off from the first to the second interval
+POLL_INTERVALS = (0.005, 0.05)
+# The lock guards a few array reads and writes, holding it this long means its holder was killed
+LOCK_TIMEOUT = 1.0
+
+# A ticket per request holding or waiting for a slot: holder pid, hashed user, state
+_PID, _USER, _STATE, _TICKET_SIZE = 0, 1, 2, 3
+_FREE, _WAITING, _RUNNING = 0, 1, 2
+
+# 🔹 Metrics
+admission_rejections = registry.register(Counter(
+    "mams_admission_rejections_total", "Requests turned away by admission control", ("limiter", "reason")
+))
+admission_wait = registry.register(Histogram(
+    "mams_admission_wait_seconds", "Time admitted requests waited for a slot", ("limiter",)
+))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status, reason, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """Concurrency limit with a bounded wait queue and a per-user share, shared by forked workers."""
+
+    def __init__(self, name, limit, queue=0, wait=0.0, per_user=0, retry_after=1):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.wait = wait
+        self.per_user = per_user
+        self.retry_after = retry_after
+        self._lock = multiprocessing.Lock()
+        self._tickets = multiprocessing.RawArray("i", _TICKET_SIZE * max(1, limit + queue))
+
+    @classmethod
+    def from_env(cls, name, limit, queue, wait, per_user, retry_after):
+        """Defaults overridden by ``ADMISSION_<NAME>_LIMIT``, ``_QUEUE``, ``_WAIT_SECONDS``, ``_PER_USER``, ``_RETRY_AFTER``."""
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            limit=int(os.getenv(prefix + "LIMIT", str(limit))),
+            queue=int(os.getenv(prefix + "QUEUE", str(queue))),
+            wait=float(os.getenv(prefix + "WAIT_SECONDS", str(wait))),
+            per_user=int(os.getenv(prefix + "PER_USER", str(per_user))),
+            retry_after=int(os.getenv(prefix + "RETRY_AFTER", str(retry_after))),
+        )
+
+    @property
+    def running(self):
+        return self._count(_RUNNING)
+
+    @property
+    def waiting(self):
+        return self._count(_WAITING)
+
+    def _count(self, state, user=None):
+        tickets = self._tickets
+        return sum(
+            1 for start in range(0, len(tickets), _TICKET_SIZE)
+            if tickets[start + _STATE] == state and (user is None or tickets[start + _USER] == user)
+        )
+
+    def _take_ticket(self, user, state):
+        # Called with the lock held; the state goes last, it is what marks the ticket taken
+        tickets = self._tickets
+        for start in range(0, len(tickets), _TICKET_SIZE):
+            if tickets[start + _STATE] == _FREE:
+                tickets[start + _PID] = os.getpid()
+                tickets[start + _USER] = user
+                tickets[start + _STATE] = state
+                return start
+        raise RuntimeError(f"Admission limiter {self.name!r} ran out of tickets")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if not self._lock.acquire(timeout=LOCK_TIMEOUT):
+            raise self._rejected(503, "lock_timeout", "Server is busy, try again shortly")
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    def acquire(self, user):
+        """Take a slot for ``user``, returning a ticket for :meth:`release`.
+
+        Raises :class:`AdmissionRejected` when the user is over their share,
+        the wait queue is full, or no slot freed up within ``wait`` seconds.
+        """
+        user = zlib.crc32(str(user).encode()) % USER_SLOTS
+        started = time.monotonic()
+        delay = POLL_INTERVALS[0]
+        ticket = None
+        try:
+            while True:
+                with self._locked():
+                    if self.per_user and self._count(_RUNNING, user) >= self.per_user:
+                        raise self._rejected(429, "user_share", "Too many requests of this kind in progress for your account")
+                    if self._count(_RUNNING) < self.limit:
+                        if ticket is None:
+                            ticket = self._take_ticket(user, _RUNNING)
+                        else:
+                            self._tickets[ticket + _STATE] = _RUNNING
+                        admission_wait.observe(time.monotonic() - started, self.name)
+                        return ticket
+                    if ticket is None:
+                        if self._count(_WAITING) >= self.queue:
+                            raise self._rejected(503, "queue_full", "Server is busy, try again shortly")
+                        ticket = self._take_ticket(user, _WAITING)
+                if time.monotonic() - started >= self.wait:
+                    raise self._rejected(503, "wait_timeout", "Server is busy, try again shortly")
+                time.sleep(delay)
+                delay = min(delay * 2, POLL_INTERVALS[1])
+        except BaseException:
+            if ticket is not None:
+                self.release(ticket)
+            raise
+
+    def release(self, ticket):
+        # One aligned write, safe without the lock: only the holder writes a taken ticket
+        self._tickets[ticket + _STATE] = _FREE
+
+    def reclaim(self, pid):
+        """Free the tickets of worker ``pid`` once it has exited, returning how many it held."""
+        if not self._lock.acquire(timeout=LOCK_TIMEOUT):
+            # Only a killed holder keeps the lock this long, give it back on its behalf
+            self._lock.release()
+            if not self._lock.acquire(timeout=LOCK_TIMEOUT):
+                return 0
+        try:
+            tickets = self._tickets
+            freed = 0
+            for start in range(0, len(tickets), _TICKET_SIZE):
+                if tickets[start + _STATE] != _FREE and tickets[start + _PID] == pid:
+                    tickets[start + _STATE] = _FREE
+                    freed += 1
+            return freed
+        finally:
+            self._lock.release()
+
+    def _rejected(self, status, reason, message):
+        admission_rejections.inc(self.name, reason)
+        return AdmissionRejected(status, reason, message, self.retry_after)
+
+
+# 🔹 Limiters (name -> limiter), routes pick one with @admission(name)
+LIMITERS = {
+    # Multipart and direct uploads: request body, image pool and storage round trips
+    "uploads": Limiter.from_env("uploads", limit=4, queue=4, wait=5, per_user=2, retry_after=2),
+    # ZIP and spreadsheet ingestion, hundreds of megabytes each
+    "bulk": Limiter.from_env("bulk", limit=1, queue=0, wait=0, per_user=1, retry_after=30),
+    # Streamed report exports, long-lived and query heavy
+    "reports": Limiter.from_env("reports", limit=2, queue=2, wait=5, per_user=1, retry_after=5),
+}
+
+# Read at scrape time, the same numbers from every worker
+registry.register(Gauge(
+    "mams_admission_in_flight", "Requests holding a slot, across all workers", ("limiter",),
+    lambda: {(name,): limiter.running for name, limiter in LIMITERS.items()}
+))
+registry.register(Gauge(
+    "mams_admission_queue_depth", "Requests waiting for a slot, across all workers", ("limiter",),
+    lambda: {(name,): limiter.waiting for name, limiter in LIMITERS.items()}
+))
+
+
+def reclaim(pid):
+    """Free every slot worker ``pid`` still held, called by the gunicorn master when it exits."""
+    reclaimed = {}
+    for name, limiter in LIMITERS.items():
+        freed = limiter.reclaim(pid)
+        if freed:
+            reclaimed[name] = freed
+    return reclaimed
+
+
+def _user():
+    # Set by @token_required; without a token fall back to the client address. Not
+    # X-Forwarded-For, anyone can send that: behind a proxy PROXY_FIX_X_FOR sets remote_addr
+    return g.get("user_email") or request.remote_addr
+
+
+def admission(name):
+    """Run the view only once the ``name`` limiter admits the request.
+
+    Goes below ``@token_required`` so the user is known. The slot is held
+    until the response is closed, i.e. until a streamed body is fully sent,
+    or by whatever the view hands it off to, see :func:`hand_off`.
+    """
+    limiter = LIMITERS[name]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_CONTROL or not limiter.limit:
+                return view(*args, **kwargs)
+            try:
+                ticket = limiter.acquire(_user())
+            except AdmissionRejected as e:
+                return jsonify({"error": str(e)}), e.status, {"Retry-After": str(e.retry_after)}
+            # Emptied by hand_off(), the response then leaves the slot alone
+            g.admission_slot = held = [partial(limiter.release, ticket)]
+
+            def release_if_held():
+                if held:
+                    held.pop()()
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release_if_held()
+                raise
+            response.call_on_close(release_if_held)
+            return response
+        return wrapper
+    return decorator
+
+
+def hand_off():
+    """Keep the request's slot past its response, for work the view leaves running.
+
+    Returns the function that frees the slot, to be called once that work
+    is done; a no-op when the route isn't admission controlled.
+    """
+    held = g.pop("admission_slot", None)
+    return held.pop() if held else (lambda: None)
@@ -0,0 +1,10 @@
+from . import auth, criteria, documents, reports, students, system
+
+BLUEPRINTS = (
+    auth.bp,
+    students.bp,
+    documents.bp,
+    criteria.bp,
+    reports.bp,
+    system.bp,
+)
@@ -0,0 +1,66 @@
+import datetime
+
+import jwt
+from flask import Blueprint, current_app, jsonify, request
+
+from ..auth import HashQueueFull, hash_password, verify_password
+from ..extensions import db
+from ..models import User
+
+bp = Blueprint("auth", __name__, url_prefix="/api")
+
+# 🔹 Register API
+@bp.route("/auth/register", methods=["POST"])
+def register():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data received"}), 400
+
+        email = data.get("email")
+        password = data.get("password")
+
+        if not email or not password:
+            return jsonify({"error": "Missing email or password"}), 400
+
+        existing_user = User.query.filter_by(email=email).first()
+        if existing_user:
+            return jsonify({"error": "User already exists"}), 400
+
+        hashed_password = hash_password(password)
+        new_user = User(email=email, password=hashed_password)
+        db.session.add(new_user)
+        db.session.commit()
+
+        return jsonify({"message": "User registered successfully"}), 201
+    except HashQueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Login API
+@bp.route("/auth/login", methods=["POST"])
+def login():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data received"}), 400
+
+        email = data.get("email")
+        password = data.get("password")
+
+        user = User.query.filter_by(email=email).first()
+        if not user or not verify_password(user.password, password):
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        # Generate JWT Token (Fixed datetime issue)
+        token = jwt.encode(
+            {"email": user.email, "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+            current_app.config["SECRET_KEY"], algorithm="HS256"
+        )
+
+        return jsonify({"message": "Login successful", "token": token}), 200
+    except HashQueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
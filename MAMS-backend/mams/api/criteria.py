@@ -0,0 +1,150 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import tuple_
+
+from ..auth import token_required
+from ..bulk_import import chunked, detect_format, iter_rows
+from ..dbpool import statement_timeout
+from ..extensions import db
+from ..models import CriteriaYearStats, SemesterResult, Student
+from ..performance import (
+    API_SEMESTER, SANCTIONED_INTAKE, STIPULATED_SEMESTERS, compute_cohort_metrics, normalize_result_row, percentage
+)
+
+bp = Blueprint("criteria", __name__, url_prefix="/api")
+
+# 🔹 NBA Criterion 4 Summary API
+@bp.route("/criteria/4/summary", methods=["GET"])
+@token_required
+@statement_timeout(db, 2000)
+def criteria_four_summary():
+    try:
+        query = CriteriaYearStats.query
+        academic_year = request.args.get("academic_year")
+        if academic_year:
+            query = query.filter(CriteriaYearStats.academic_year == academic_year)
+
+        summary = []
+        for stats in query.order_by(CriteriaYearStats.academic_year.desc()):
+            placed_total = stats.placed + stats.higher_studies + stats.entrepreneur
+            summary.append({
+                "academic_year": stats.academic_year,
+                "enrollment": {
+                    "sanctioned_intake": SANCTIONED_INTAKE,
+                    "admitted": stats.admitted,
+                    "documents_submitted": stats.documents_submitted,
+                    "ratio": percentage(stats.admitted, SANCTIONED_INTAKE)
+                },
+                "placement": {
+                    "final_year_students": stats.admitted,
+                    "placed": stats.placed,
+                    "higher_studies": stats.higher_studies,
+                    "entrepreneur": stats.entrepreneur,
+                    "index": percentage(placed_total, stats.admitted)
+                }
+            })
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Semester Results Batch Upload API
+def _store_result_chunk(chunk):
+    """Validate and upsert one chunk of semester results, returning the rejects."""
+    rejects = []
+    rows = {}
+    for number, raw in chunk:
+        if "_error" in raw:
+            rejects.append({"row": number, "reason": raw["_error"]})
+            continue
+        row, error = normalize_result_row(raw)
+        if error:
+            rejects.append({"row": number, "reason": error})
+        elif (row["gr_no"], row["semester"]) in rows:
+            rejects.append({"row": number, "reason": "Duplicate result for this semester in upload"})
+        else:
+            rows[(row["gr_no"], row["semester"])] = (number, row)
+
+    if rows:
+        gr_numbers = {gr_no for gr_no, _ in rows}
+        known = {r.gr_no for r in db.session.query(Student.gr_no).filter(Student.gr_no.in_(gr_numbers))}
+        for key, (number, row) in list(rows.items()):
+            if row["gr_no"] not in known:
+                rejects.append({"row": number, "reason": "Student not found"})
+                del rows[key]
+
+    if rows:
+        # Upsert: replace whatever was stored for these (gr_no, semester) pairs
+        table = SemesterResult.__table__
+        db.session.execute(table.delete().where(
+            tuple_(table.c.gr_no, table.c.semester).in_(list(rows))
+        ))
+        db.session.execute(table.insert(), [row for _, row in rows.values()])
+        db.session.commit()
+
+    rejects.sort(key=lambda r: r["row"])
+    return len(rows), rejects
+
+@bp.route("/semester-results", methods=["POST"])
+@token_required
+def upload_semester_results():
+    try:
+        if detect_format(content_type=request.content_type) == "jsonl":
+            results = iter_rows(request.stream, "jsonl")
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get("results")
+            if not isinstance(data, list):
+                return jsonify({"error": "Send a JSON array of results or JSON lines"}), 400
+            results = (raw if isinstance(raw, dict) else {"_error": "Each result must be a JSON object"} for raw in data)
+
+        stored = 0
+        rejects = []
+        for chunk in chunked(results):
+            count, chunk_rejects = _store_result_chunk(chunk)
+            stored += count
+            rejects.extend(chunk_rejects)
+
+        return jsonify({
+            "message": "Semester results processed",
+            "stored": stored,
+            "rejected": rejects
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Success Rate & Academic Performance API (NBA 4.2 / 4.3)
+@bp.route("/criteria/4/performance", methods=["GET"])
+@token_required
+@statement_timeout(db, 15000)
+def criteria_four_performance():
+    try:
+        api_semester = request.args.get("api_semester", API_SEMESTER, type=int)
+        if not 1 <= api_semester <= STIPULATED_SEMESTERS:
+            return jsonify({"error": f"api_semester must be between 1 and {STIPULATED_SEMESTERS}"}), 400
+
+        # Cohort sizes come from the maintained counters, no need to count students
+        stats_query = db.session.query(CriteriaYearStats.academic_year, CriteriaYearStats.admitted)
+        years = request.args.getlist("academic_year")
+        if years:
+            stats_query = stats_query.filter(CriteriaYearStats.academic_year.in_(years))
+        stats = stats_query.order_by(CriteriaYearStats.academic_year.desc()).all()
+        if not stats:
+            return jsonify([]), 200
+
+        rows = db.session.query(
+            Student.academic_year, SemesterResult.gr_no, SemesterResult.semester,
+            SemesterResult.cgpa, SemesterResult.backlogs, SemesterResult.appeared
+        ).join(Student, Student.gr_no == SemesterResult.gr_no).filter(
+            Student.academic_year.in_([s.academic_year for s in stats])
+        ).all()
+
+        metrics = compute_cohort_metrics(
+            [s.academic_year for s in stats],
+            [s.admitted for s in stats],
+            rows,
+            api_semester=api_semester
+        )
+        return jsonify(metrics), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,422 @@
+import hashlib
+import io
+import os
+
+from flask import Blueprint, g, jsonify, request, url_for
+from itsdangerous import BadSignature, SignatureExpired
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from ..admission import admission, hand_off
+from ..auth import token_required
+from ..content_store import StorageUploadError, UploadNotFoundError
+from ..direct_uploads import local_signer, parse_declared_files, upload_signer
+from ..extensions import db, response_cache
+from ..images import process_uploads
+from ..models import EnrollmentRatio, Placement, PlacementBatch, Student
+from ..placement_batch import (
+    MAX_BATCH_ARCHIVE_SIZE, BatchError, batch_status, check_entries, create_batch, open_archive, read_manifest,
+    start_batch
+)
+from ..storage import content_store, storage
+from ..uploads import (
+    UPLOAD_BUFFER_SIZE, BoundedSpool, check_request_size, close_quietly, file_size_limits, matches_extension,
+    open_for_upload, starts_with_magic
+)
+
+bp = Blueprint("documents", __name__, url_prefix="/api")
+
+PLACEMENT_FILES = ('proof',)
+DOCUMENT_FILES = ('registration_form', 'marks10', 'marks12', 'gujcet')
+
+
+def _save_placement(gr_no, after_graduation, file_url):
+    """Insert or update the student's placement row, the caller commits."""
+    # Check if placement record already exists
+    existing_placement = Placement.query.get(gr_no)
+    if existing_placement:
+        # The old file is collected by the worker once nothing references it
+        content_store.release(existing_placement.doc_proof_url)
+
+        # Update existing record
+        existing_placement.after_graduation = after_graduation
+        existing_placement.doc_proof_url = file_url
+    else:
+        # Create new placement record
+        new_placement = Placement(
+            gr_no=gr_no,
+            after_graduation=after_graduation,
+            doc_proof_url=file_url
+        )
+        db.session.add(new_placement)
+
+
+def _save_documents(gr_no, urls):
+    """Insert the student's enrollment documents row, the caller commits."""
+    new_entry = EnrollmentRatio(
+        gr_no=gr_no,
+        registration_form_url=urls['registration_form_url'],
+        marks10_url=urls['marks10_url'],
+        marks12_url=urls['marks12_url'],
+        gujcet_marksheet_url=urls['gujcet_url']
+    )
+    db.session.add(new_entry)
+
+
+def _student_error(gr_no):
+    """``(response, status)`` if ``gr_no`` is missing or names no student, else None."""
+    if not gr_no:
+        return jsonify({"error": "GR number is required"}), 400
+
+    # Check if student exists
+    student = Student.query.get(gr_no)
+    if not student:
+        return jsonify({"error": "Student not found"}), 404
+    return None
+
+
+def _documents_error(gr_no):
+    """Why documents can't be taken for ``gr_no`` right now, as ``(response, status)`` or None."""
+    error = _student_error(gr_no)
+    if error:
+        return error
+
+    # Check if documents already uploaded
+    existing_entry = EnrollmentRatio.query.get(gr_no)
+    if existing_entry:
+        return jsonify({"error": "Documents already uploaded for this student"}), 400
+    return None
+
+# 🔹 Placement Details Upload API
+@bp.route("/placement-details", methods=["POST"])
+@token_required
+@admission("uploads")
+def upload_placement_details():
+    try:
+        print("Received placement details upload request")
+        check_request_size(request)
+        
+        if 'proof' not in request.files:
+            print("No proof file in request")
+            return jsonify({"error": "No file provided"}), 400
+            
+        file = request.files['proof']
+        gr_no = request.form.get('gr_no')
+        after_graduation = request.form.get('status')
+        
+        print(f"Received data - GR: {gr_no}, Status: {after_graduation}")
+        
+        if not file or not gr_no or not after_graduation:
+            print(f"Missing fields - File: {bool(file)}, GR: {bool(gr_no)}, Status: {bool(after_graduation)}")
+            return jsonify({"error": "Missing required fields"}), 400
+            
+        # Check for allowed file types
+        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
+        file_extension = os.path.splitext(file.filename)[1].lower()
+        if file_extension not in allowed_extensions:
+            return jsonify({"error": "Only PDF and image files (JPG, JPEG, PNG) are allowed"}), 400
+
+        if not matches_extension(file, file_extension):
+            return jsonify({"error": "File content does not match its extension"}), 400
+            
+        try:
+            # Set content type based on file extension
+            content_type = "application/pdf" if file_extension == '.pdf' else f"image/{file_extension[1:]}"
+            
+            # Photos are recompressed in the image pool (deterministically, so dedup still works)
+            files, thumbnails = process_uploads([("proof", file, file_extension, content_type)])
+
+            # Stored under its SHA-256, re-uploading the same proof is a metadata-only update
+            stored = content_store.store_many(files, thumbnails)["proof"]
+            file_url = stored.url
+            
+            print(f"Proof stored at {file_url} (deduplicated: {stored.deduplicated})")
+            
+            _save_placement(gr_no, after_graduation, file_url)
+            db.session.commit()
+            response_cache.invalidate("placements")
+            
+            return jsonify({
+                "message": "Placement details uploaded successfully",
+                "file_url": file_url
+            }), 201
+            
+        except StorageUploadError as upload_error:
+            db.session.rollback()
+            return jsonify({"error": str(upload_error)}), 500
+        except Exception as upload_error:
+            print(f"Error during file upload or database save: {str(upload_error)}")
+            raise upload_error
+        
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        print(f"Error in upload_placement_details: {str(e)}")
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Batch Placement Upload API (ZIP of proofs plus a CSV manifest, see placement_batch.py)
+file_size_limits["documents.upload_placement_batch"] = MAX_BATCH_ARCHIVE_SIZE
+
+def _own_stream(file):
+    # Own handle on the spool file, the request closes its files before the batch is done
+    stream = open_for_upload(file)
+    return io.BytesIO(stream) if isinstance(stream, bytes) else stream
+
+@bp.route("/placement-details/batch", methods=["POST"])
+@token_required
+@admission("bulk")
+def upload_placement_batch():
+    stream = archive = None
+    try:
+        if 'archive' not in request.files:
+            return jsonify({"error": "No archive provided"}), 400
+
+        stream = _own_stream(request.files['archive'])
+        archive = open_archive(stream)
+        if 'manifest' in request.files:
+            manifest = _own_stream(request.files['manifest'])
+            try:
+                entries = read_manifest(archive, manifest)
+            finally:
+                close_quietly(manifest)
+        else:
+            entries = read_manifest(archive)
+
+        accepted, rejected = check_entries(archive, entries)
+        batch = create_batch(entries, rejected, g.user_email)
+        if accepted:
+            # The runner keeps the admission slot, so batches are bounded like the requests
+            release = hand_off()
+            try:
+                start_batch(batch.id, archive, stream, accepted, _save_placement, release)
+            except BaseException:
+                release()
+                raise
+            stream = archive = None  # Closed by the batch runner
+
+        return jsonify({
+            "job_id": batch.id,
+            "status_url": url_for("documents.placement_batch_status", job_id=batch.id),
+            "total": len(entries),
+            "accepted": len(accepted),
+            "rejected": len(rejected)
+        }), 202
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if archive is not None:
+            archive.close()
+        close_quietly(stream)
+
+@bp.route("/placement-details/batch/<job_id>", methods=["GET"])
+@token_required
+def placement_batch_status(job_id):
+    try:
+        batch = db.session.get(PlacementBatch, job_id)
+        if batch is None:
+            return jsonify({"error": "Batch not found"}), 404
+        return jsonify(batch_status(batch)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Upload Documents API
+@bp.route("/documents/upload", methods=["POST"])
+@token_required
+@admission("uploads")
+def upload_documents():
+    try:
+        check_request_size(request)
+        gr_no = request.form.get('gr_no')
+        error = _documents_error(gr_no)
+        if error:
+            return error
+
+        # Allowed file extensions
+        ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+
+        def allowed_file(filename):
+            return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+        # Validate every file before touching storage
+        uploads = []
+        for file_key in DOCUMENT_FILES:
+            if file_key not in request.files:
+                return jsonify({"error": f"Missing {file_key} file"}), 400
+
+            file = request.files[file_key]
+            if not file.filename:
+                return jsonify({"error": f"No {file_key} file selected"}), 400
+
+            if not allowed_file(file.filename):
+                return jsonify({"error": f"Invalid file type for {file_key}. Allowed types: PDF, PNG, JPG, JPEG"}), 400
+
+            if not matches_extension(file, '.' + file.filename.rsplit('.', 1)[1]):
+                return jsonify({"error": f"Content of {file_key} does not match its file type"}), 400
+
+            uploads.append((file_key, file, '.' + file.filename.rsplit('.', 1)[1], file.content_type))
+
+        # Photos are recompressed and given thumbnails in the image pool, all at once
+        uploads, thumbnails = process_uploads(uploads)
+
+        # Hash and upload all files at once, files we already hold are not uploaded again
+        try:
+            stored = content_store.store_many(uploads, thumbnails)
+        except StorageUploadError as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+        urls = {f"{file_key}_url": stored_file.url for file_key, stored_file in stored.items()}
+
+        # Create new enrollment ratio entry
+        _save_documents(gr_no, urls)
+        db.session.commit()
+        response_cache.invalidate("documents")
+
+        return jsonify({
+            "message": "Documents uploaded successfully",
+            "urls": urls
+        })
+
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Direct-to-storage Uploads (signed upload URLs, see direct_uploads.py)
+@bp.route("/placement-details/upload-url", methods=["POST"])
+@token_required
+def placement_upload_url():
+    try:
+        data = request.get_json(silent=True) or {}
+        error = _student_error(data.get('gr_no'))
+        if error:
+            return error
+        files, error = parse_declared_files(data, PLACEMENT_FILES)
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify({"files": content_store.upload_targets(files, upload_signer(storage))}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/placement-details/finalize", methods=["POST"])
+@token_required
+def finalize_placement_details():
+    try:
+        data = request.get_json(silent=True) or {}
+        gr_no = data.get('gr_no')
+        after_graduation = data.get('status')
+        if not gr_no or not after_graduation:
+            return jsonify({"error": "Missing required fields"}), 400
+        error = _student_error(gr_no)
+        if error:
+            return error
+        files, error = parse_declared_files(data, PLACEMENT_FILES)
+        if error:
+            return jsonify({"error": error}), 400
+
+        file_url = content_store.register_many(files)[PLACEMENT_FILES[0]].url
+        _save_placement(gr_no, after_graduation, file_url)
+        db.session.commit()
+        response_cache.invalidate("placements")
+
+        return jsonify({
+            "message": "Placement details uploaded successfully",
+            "file_url": file_url
+        }), 201
+    except UploadNotFoundError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/documents/upload-urls", methods=["POST"])
+@token_required
+def documents_upload_urls():
+    try:
+        data = request.get_json(silent=True) or {}
+        error = _documents_error(data.get('gr_no'))
+        if error:
+            return error
+        files, error = parse_declared_files(data, DOCUMENT_FILES)
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify({"files": content_store.upload_targets(files, upload_signer(storage))}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/documents/finalize", methods=["POST"])
+@token_required
+def finalize_documents():
+    try:
+        data = request.get_json(silent=True) or {}
+        gr_no = data.get('gr_no')
+        error = _documents_error(gr_no)
+        if error:
+            return error
+        files, error = parse_declared_files(data, DOCUMENT_FILES)
+        if error:
+            return jsonify({"error": error}), 400
+
+        stored = content_store.register_many(files)
+        urls = {f"{file_key}_url": stored_file.url for file_key, stored_file in stored.items()}
+        _save_documents(gr_no, urls)
+        db.session.commit()
+        response_cache.invalidate("documents")
+
+        return jsonify({
+            "message": "Documents uploaded successfully",
+            "urls": urls
+        })
+    except UploadNotFoundError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Signed Upload Target (local stand-in for Supabase's signed upload URLs)
+@bp.route("/uploads/<token>", methods=["PUT"])
+@admission("uploads")
+def signed_upload_target(token):
+    try:
+        try:
+            signed = local_signer().load(token)
+        except SignatureExpired:
+            return jsonify({"error": "Upload URL has expired"}), 403
+        except BadSignature:
+            return jsonify({"error": "Invalid upload URL"}), 403
+        if request.content_length != signed["size"]:
+            return jsonify({"error": f"Upload must be exactly {signed['size']} bytes"}), 400
+
+        # Hashed on its way to disk: only the bytes the URL was signed for are stored
+        spool = BoundedSpool(signed["size"])
+        try:
+            digest = hashlib.sha256()
+            for block in iter(lambda: request.stream.read(UPLOAD_BUFFER_SIZE), b""):
+                digest.update(block)
+                spool.write(block)
+            spool.seek(0)
+            if digest.hexdigest() != signed["sha256"]:
+                return jsonify({"error": "Upload does not match the SHA-256 it was signed for"}), 400
+            if not starts_with_magic(spool.read(16), os.path.splitext(signed["path"])[1]):
+                return jsonify({"error": "File content does not match its extension"}), 400
+            spool.seek(0)
+            try:
+                storage.upload(signed["path"], spool, signed["content_type"])
+            except FileExistsError:
+                pass  # Same address, same bytes
+        finally:
+            spool.close()
+        return jsonify({"message": "Uploaded", "path": signed["path"]}), 201
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
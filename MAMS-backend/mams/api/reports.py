@@ -0,0 +1,46 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from ..admission import admission
+from ..auth import token_required
+from ..extensions import db
+from ..performance import API_SEMESTER, STIPULATED_SEMESTERS
+from ..reports import Criteria4Report, stream_csv, stream_xlsx
+
+bp = Blueprint("reports", __name__, url_prefix="/api")
+
+REPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _report_stream(writer, names, years, api_semester):
+    # Runs while the response is sent, after the view's teardown closed its session,
+    # so the report reads through the session of the context stream_with_context pushes
+    report = Criteria4Report(db.session(), years=years, api_semester=api_semester)
+    yield from writer(report.tables(names))
+
+
+# 🔹 NBA Criterion 4 Report Export API
+@bp.route("/reports/criteria-4.<any(csv, xlsx):fmt>", methods=["GET"])
+@token_required
+@admission("reports")
+def export_criteria_four(fmt):
+    try:
+        api_semester = request.args.get("api_semester", API_SEMESTER, type=int)
+        if not 1 <= api_semester <= STIPULATED_SEMESTERS:
+            return jsonify({"error": f"api_semester must be between 1 and {STIPULATED_SEMESTERS}"}), 400
+
+        names = request.args.getlist("table")
+        known = [table.name for table in Criteria4Report(None).tables()]
+        unknown = sorted(set(names) - set(known))
+        if unknown:
+            return jsonify({"error": f"Unknown table: {', '.join(unknown)}", "tables": known}), 400
+
+        writer, mimetype = REPORT_FORMATS[fmt]
+        body = _report_stream(writer, names, request.args.getlist("academic_year"), api_semester)
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers["Content-Disposition"] = f'attachment; filename="criteria-4.{fmt}"'
+        return response, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,382 @@
+import io
+import json
+import os
+from collections import Counter
+from functools import partial
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from ..admission import admission
+from ..auth import token_required
+from ..bulk_import import (
+    DEFAULT_CHUNK_SIZE, chunked, copy_rows_csv, detect_format, iter_rows, readable_stream, validate_chunk
+)
+from ..dbpool import set_statement_timeout, statement_timeout
+from ..extensions import db, response_cache
+from ..models import EnrollmentRatio, Placement, Student, bump_criteria_stats
+from ..serialization import stream_json_array
+from ..storage import content_store
+from ..uploads import MB, close_quietly, file_size_limits, open_for_upload, spool_body
+
+bp = Blueprint("students", __name__, url_prefix="/api")
+
+# 🔹 Add Student API
+@bp.route("/students", methods=["POST"])
+@token_required
+def add_student():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data received"}), 400
+
+        gr_no = data.get("gr_no")
+        name = data.get("name")
+        enroll_no = data.get("enroll_no")
+        academic_year = data.get("academic_year")
+
+        if not all([gr_no, name, enroll_no, academic_year]):
+            return jsonify({"error": "Missing student details"}), 400
+
+        # Check if the student already exists
+        existing_student = Student.query.filter(
+            (Student.gr_no == gr_no) | (Student.enroll_no == enroll_no)
+        ).first()
+        
+        if existing_student:
+            return jsonify({"error": "Student already exists with this GR number or enrollment number"}), 400
+
+        new_student = Student(gr_no=gr_no, name=name, enroll_no=enroll_no, academic_year=academic_year)
+        db.session.add(new_student)
+        db.session.commit()
+        response_cache.invalidate("students")
+
+        return jsonify({"message": "Student added successfully"}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Bulk Student Import API
+COPY_STUDENTS = "COPY student (gr_no, name, enroll_no, academic_year) FROM STDIN WITH (FORMAT csv)"
+
+def _insert_students(rows):
+    """Insert already validated student rows in one round trip."""
+    dialect = db.engine.dialect
+    if dialect.name == "postgresql":
+        # COPY is the fastest load path on PostgreSQL and runs inside the session transaction
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(COPY_STUDENTS, copy_rows_csv(rows))
+        except dialect.loaded_dbapi.Error as e:
+            # The raw cursor bypasses SQLAlchemy, translate so a unique violation is an IntegrityError here too
+            raise DBAPIError.instance(COPY_STUDENTS, None, e, dialect.loaded_dbapi.Error, dialect=dialect) from e
+        finally:
+            cursor.close()
+    else:
+        db.session.execute(Student.__table__.insert(), rows)
+
+def _import_chunk(chunk):
+    """Validate and insert one chunk, returning (row_number, row, reason) results."""
+    candidates, results = validate_chunk(chunk)
+    if candidates:
+        gr_numbers = [row["gr_no"] for _, row, _ in candidates]
+        enroll_numbers = [row["enroll_no"] for _, row, _ in candidates]
+
+        # One set-based lookup for every conflict in the chunk
+        existing = db.session.query(Student.gr_no, Student.enroll_no).filter(
+            Student.gr_no.in_(gr_numbers) | Student.enroll_no.in_(enroll_numbers)
+        ).all()
+        taken_gr = {r.gr_no for r in existing}
+        taken_enroll = {r.enroll_no for r in existing}
+
+        valid = []
+        for number, row, _ in candidates:
+            if row["gr_no"] in taken_gr:
+                results.append((number, row, "Student already exists with this GR number"))
+            elif row["enroll_no"] in taken_enroll:
+                results.append((number, row, "Student already exists with this enrollment number"))
+            else:
+                valid.append((number, row))
+
+        if valid:
+            try:
+                _insert_students([row for _, row in valid])
+                # Core inserts skip the ORM flush hook, so bump the counters here
+                admitted = Counter(row["academic_year"] for _, row in valid)
+                bump_criteria_stats(db.session.connection(), {
+                    academic_year: {"admitted": count} for academic_year, count in admitted.items()
+                })
+                db.session.commit()
+                response_cache.invalidate("students")
+                results.extend((number, row, None) for number, row in valid)
+            except IntegrityError:
+                # Another writer got in between the lookup and the insert
+                db.session.rollback()
+                results.extend(
+                    (number, row, "Conflicting student was added concurrently, retry this row")
+                    for number, row in valid
+                )
+    results.sort(key=lambda r: r[0])
+    return results
+
+# Imports are spooled to disk like any upload, they are just allowed to be much larger
+file_size_limits["students.bulk_import_students"] = int(os.getenv("MAX_IMPORT_FILE_MB", "512")) * MB
+
+@bp.route("/students/bulk", methods=["POST"])
+@token_required
+@admission("bulk")
+def bulk_import_students():
+    try:
+        if "file" in request.files:
+            upload = request.files["file"]
+            import_format = detect_format(upload.filename, upload.mimetype)
+            # Own handle on the spool file, the request closes its files before the report streams
+            stream = open_for_upload(upload)
+            if isinstance(stream, bytes):
+                stream = io.BytesIO(stream)
+        else:
+            import_format = detect_format(content_type=request.content_type)
+            stream = readable_stream(request.stream)
+            if import_format == "xlsx":
+                # openpyxl seeks around the zip archive, so the body goes to disk first
+                stream = spool_body(stream, file_size_limits[request.endpoint])
+
+        if import_format is None:
+            return jsonify({"error": "Upload a CSV, XLSX or JSON-lines file"}), 400
+
+        chunk_size = request.args.get("chunk_size", DEFAULT_CHUNK_SIZE, type=int)
+        chunk_size = max(1, min(chunk_size, 5000))
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        # The report is streamed as JSON lines so memory stays bounded by the chunk size
+        accepted = rejected = 0
+        try:
+            for chunk in chunked(iter_rows(stream, import_format), chunk_size):
+                for number, row, reason in _import_chunk(chunk):
+                    entry = {"row": number, "gr_no": row.get("gr_no")}
+                    if reason is None:
+                        accepted += 1
+                        entry["status"] = "accepted"
+                    else:
+                        rejected += 1
+                        entry["status"] = "rejected"
+                        entry["reason"] = reason
+                    yield json.dumps(entry) + "\n"
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            close_quietly(stream)
+        yield json.dumps({"summary": {"accepted": accepted, "rejected": rejected}}) + "\n"
+
+    return Response(stream_with_context(generate()), status=200, mimetype="application/x-ndjson")
+
+# 🔹 Student listing pagination
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+# Rows fetched per round trip when a whole list is streamed
+STREAM_BATCH_SIZE = 1000
+# Cap on each of those fetches, the stream's session doesn't see the view's @statement_timeout
+STREAM_STATEMENT_TIMEOUT_MS = 5000
+
+def _student_page(query):
+    """Apply keyset pagination and the optional filters to a projected student query.
+
+    The page is ordered by ``gr_no`` and continues after the ``cursor`` query
+    parameter, so every page is an index range scan no matter how deep it is.
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    rows = _filter_students(query).order_by(Student.gr_no).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].gr_no
+    return rows, next_cursor
+
+def _filter_students(query):
+    cursor = request.args.get("cursor")
+    academic_year = request.args.get("academic_year")
+    prefix = request.args.get("q")
+
+    if cursor:
+        query = query.filter(Student.gr_no > cursor)
+    if academic_year:
+        query = query.filter(Student.academic_year == academic_year)
+    if prefix:
+        query = query.filter(
+            Student.gr_no.startswith(prefix, autoescape=True) | Student.name.startswith(prefix, autoescape=True)
+        )
+    return query
+
+def _page_response(items, next_cursor):
+    # The body stays a plain array for existing clients, the cursor travels in a header
+    response = jsonify(items)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def _stream_rows(query, to_item):
+    # Runs after the view's teardown closed its session, so read through the session of the
+    # context stream_with_context pushes; that one is closed when the stream ends
+    session = db.session()
+    set_statement_timeout(session, STREAM_STATEMENT_TIMEOUT_MS)
+    for row in query.with_session(session).yield_per(STREAM_BATCH_SIZE):
+        yield to_item(row)
+
+
+def _student_list(query, to_item, paged=False):
+    """``to_item(row)`` dicts for every matching row, or one page of them.
+
+    Without ``limit`` or ``cursor`` the whole list is returned as one body,
+    as before pagination, so the dropdowns that load it keep working and it
+    stays cacheable; ``paged`` returns the first page instead. With
+    ``limit=all`` the full list is read through a server-side cursor and
+    encoded as it arrives, so neither the rows nor the JSON body are ever
+    held in full.
+    """
+    limit = request.args.get("limit")
+    if limit == "all":
+        rows = _stream_rows(_filter_students(query).order_by(Student.gr_no), to_item)
+        return Response(stream_with_context(stream_json_array(rows)), mimetype="application/json")
+    if limit is None and not request.args.get("cursor") and not paged:
+        return jsonify([to_item(row) for row in _filter_students(query).order_by(Student.gr_no)])
+    rows, next_cursor = _student_page(query)
+    return _page_response([to_item(row) for row in rows], next_cursor)
+
+# 🔹 Get All Students API (without filtering)
+@bp.route("/students/all", methods=["GET"])
+@token_required
+@response_cache.cached("students")
+@statement_timeout(db, 5000)
+def get_all_students():
+    try:
+        return _student_list(db.session.query(Student.gr_no), lambda row: {"gr_no": row.gr_no}), 200
+    except Exception as e:
+        print(f"Error in get_all_students: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Get Available Students for Placement API
+@bp.route("/students", methods=["GET"])
+@token_required
+@response_cache.cached("students", "placements")
+@statement_timeout(db, 5000)
+def get_students():
+    try:
+        # Anti-join: students without a placement record
+        has_placement = db.session.query(Placement.gr_no).filter(Placement.gr_no == Student.gr_no).exists()
+        query = db.session.query(Student.gr_no, Student.name).filter(~has_placement)
+        return _student_list(query, lambda row: {"gr_no": row.gr_no, "name": row.name}), 200
+    except Exception as e:
+        print(f"Error in get_students: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Get Available Students for Document Upload API
+@bp.route("/students/available-for-documents", methods=["GET"])
+@token_required
+@response_cache.cached("students", "documents")
+@statement_timeout(db, 5000)
+def get_available_students_for_documents():
+    try:
+        # Anti-join: students who don't have documents uploaded yet
+        has_documents = db.session.query(EnrollmentRatio.gr_no).filter(EnrollmentRatio.gr_no == Student.gr_no).exists()
+        query = db.session.query(Student.gr_no, Student.name).filter(~has_documents)
+        return _student_list(query, lambda row: {
+            "gr_no": row.gr_no,
+            "name": row.name
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Batch Student Status API
+DOCUMENT_URL_FIELDS = ("registration_form_url", "marks10_url", "marks12_url", "gujcet_marksheet_url")
+
+def _student_status(gr_numbers):
+    """Placement and document status for many students from one outer-joined query.
+
+    Either ``gr_numbers`` or the ``academic_year`` query parameter selects the
+    students, the usual ``limit``/``cursor``/``q`` parameters apply on top.
+    Unknown GR numbers are simply absent from the result. ``thumbnails=1``
+    adds preview URLs for image uploads.
+    """
+    if gr_numbers is not None and len(gr_numbers) > MAX_PAGE_SIZE:
+        return jsonify({"error": f"At most {MAX_PAGE_SIZE} GR numbers per request"}), 400
+    if not gr_numbers and not request.args.get("academic_year"):
+        return jsonify({"error": "Pass gr_no values or an academic_year"}), 400
+
+    query = db.session.query(
+        Student.gr_no, Student.name, Student.enroll_no, Student.academic_year,
+        Placement.after_graduation, Placement.doc_proof_url,
+        EnrollmentRatio.gr_no.label("documents_gr_no"),
+        *(getattr(EnrollmentRatio, field) for field in DOCUMENT_URL_FIELDS)
+    ).outerjoin(Placement, Placement.gr_no == Student.gr_no).outerjoin(
+        EnrollmentRatio, EnrollmentRatio.gr_no == Student.gr_no
+    )
+    if gr_numbers:
+        query = query.filter(Student.gr_no.in_(gr_numbers))
+    thumbnails = request.args.get("thumbnails", "").lower() in ("1", "true", "yes")
+    return _student_list(query, partial(_status_entry, thumbnails=thumbnails), paged=True), 200
+
+def _status_entry(row, thumbnails=False):
+    entry = {
+        "gr_no": row.gr_no,
+        "name": row.name,
+        "enroll_no": row.enroll_no,
+        "academic_year": row.academic_year,
+        "has_placement": row.after_graduation is not None,
+        "placement": {
+            "status": row.after_graduation,
+            "doc_proof_url": row.doc_proof_url
+        } if row.after_graduation is not None else None,
+        "has_documents": row.documents_gr_no is not None,
+        "documents": {
+            field: getattr(row, field) for field in DOCUMENT_URL_FIELDS
+        } if row.documents_gr_no is not None else None
+    }
+    if thumbnails:
+        # Previews for image uploads, None for PDFs
+        if entry["placement"]:
+            entry["placement"]["thumbnail_url"] = content_store.thumbnail_url(row.doc_proof_url)
+        if entry["documents"]:
+            entry["documents"]["thumbnails"] = {
+                field: content_store.thumbnail_url(getattr(row, field)) for field in DOCUMENT_URL_FIELDS
+            }
+    return entry
+
+def _gr_number_list(values):
+    # Accepts repeated values and comma-separated lists, keeps the first occurrence order
+    gr_numbers = []
+    for value in values:
+        gr_numbers.extend(part.strip() for part in str(value).split(",") if part.strip())
+    return list(dict.fromkeys(gr_numbers))
+
+@bp.route("/students/status", methods=["GET"])
+@token_required
+@response_cache.cached("students", "placements", "documents")
+@statement_timeout(db, 5000)
+def get_student_status():
+    try:
+        gr_numbers = _gr_number_list(request.args.getlist("gr_no")) or None
+        return _student_status(gr_numbers)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Same lookup for lists too long for a query string: {"gr_nos": [...]}
+@bp.route("/students/status", methods=["POST"])
+@token_required
+@statement_timeout(db, 5000)
+def post_student_status():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("gr_nos"), list):
+            return jsonify({"error": "Send {\"gr_nos\": [...]}"}), 400
+        return _student_status(_gr_number_list(data["gr_nos"]))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
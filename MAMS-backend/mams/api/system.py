@@ -0,0 +1,48 @@
+import time
+
+from flask import Blueprint, Response, jsonify, send_from_directory
+from sqlalchemy import text
+
+from ..auth import token_required
+from ..dbpool import pool_status
+from ..extensions import db, response_cache
+from ..metrics import registry
+from ..storage import storage_backend
+
+bp = Blueprint("system", __name__, url_prefix="/api")
+
+# 🔹 Response Cache Stats API
+@bp.route("/cache/stats", methods=["GET"])
+@token_required
+def cache_stats():
+    try:
+        return jsonify(response_cache.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 🔹 Prometheus Metrics API
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+# 🔹 Database Connection Test Route
+@bp.route("/test-db", methods=["GET"])
+def test_db():
+    try:
+        # Checkout plus a round trip, i.e. what a request pays before its first query
+        started = time.perf_counter()
+        db.session.execute(text("SELECT 1"))
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        db.session.rollback()  # Hand the connection straight back to the pool
+        return jsonify({
+            "message": "Database connection successful",
+            "connect_latency_ms": latency_ms,
+            "pool": pool_status(db.engine)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database connection failed: {str(e)}", "pool": pool_status(db.engine)}), 503
+
+# 🔹 Local storage files (STORAGE_BACKEND=local only, added to the URL map by create_app)
+def local_storage_file(path):
+    return send_from_directory(storage_backend.root, path)
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
+from werkzeug.security import check_password_hash, generate_password_hash
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes allowed to be queued or running at once before logins are turned away
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# Until every page sends its token, missing tokens are only rejected when this is on
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+
+class HashQueueFull(Exception):
+    """Raised when too many password hashes are already waiting."""
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+
+def _get_hash_pool():
+    # Created on first use so pre-forked workers each get their own pool
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _hash_pool
+
+
+def _run_hash(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashQueueFull("Too many logins in progress, try again shortly")
+    try:
+        return _get_hash_pool().submit(fn, *args).result(timeout=HASH_TIMEOUT)
+    finally:
+        _hash_slots.release()
+
+
+def hash_password(password):
+    """pbkdf2 hash computed in the hashing process pool."""
+    return _run_hash(generate_password_hash, password, "pbkdf2:sha256")
+
+
+def verify_password(password_hash, password):
+    return _run_hash(check_password_hash, password_hash, password)
+
+
+class TokenCache:
+    """LRU of already verified JWTs, each entry dropped once its token expires."""
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            item = self._entries.get(token)
+            if item is None:
+                return None
+            expires, payload = item
+            if expires <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def set(self, token, payload):
+        expires = payload.get("exp")
+        if expires is None:
+            return  # Never cache tokens that don't expire
+        with self._lock:
+            self._entries[token] = (expires, payload)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token):
+    """Return the token's payload, verifying the signature only on a cache miss."""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+        token_cache.set(token, payload)
+    return payload
+
+
+def token_required(view):
+    """Verify the ``Authorization: Bearer`` token and expose its email as ``g.user_email``.
+
+    An invalid or expired token is always rejected. A missing one is only
+    rejected when ``AUTH_REQUIRED`` is enabled.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.user_email = None
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            try:
+                g.user_email = decode_token(header[len("Bearer "):].strip()).get("email")
+            except jwt.ExpiredSignatureError:
+                return jsonify({"error": "Token has expired"}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({"error": "Invalid token"}), 401
+        elif AUTH_REQUIRED:
+            return jsonify({"error": "Missing token"}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import os
+
+# Columns every imported student row must carry
+STUDENT_FIELDS = ("gr_no", "name", "enroll_no", "academic_year")
+
+# Rows are validated and written this many at a time
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def normalize_row(raw):
+    """Return a dict with only the student fields, stripped of whitespace."""
+    row = {}
+    for field in STUDENT_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            row[field] = None
+        else:
+            value = str(value).strip()
+            row[field] = value or None
+    return row
+
+
+class _ReadOnlyInput(io.RawIOBase):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def readable_stream(stream):
+    """Wrap a request body stream so the io wrappers accept it.
+
+    gunicorn passes its own body object, which has ``read`` but no
+    ``readable``, and ``TextIOWrapper`` refuses it. Closing the wrapper
+    leaves the body alone.
+    """
+    return io.BufferedReader(_ReadOnlyInput(stream))
+
+
+def iter_csv_rows(stream, encoding="utf-8-sig"):
+    """Yield dict rows from a binary CSV stream without reading it all."""
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text)
+        for raw in reader:
+            yield {(k or "").strip().lower(): v for k, v in raw.items()}
+    finally:
+        # Don't let the wrapper close the underlying upload stream
+        text.detach()
+
+
+def iter_xlsx_rows(stream):
+    """Yield dict rows from the first sheet of an XLSX file in read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        keys = [str(h or "").strip().lower() for h in header]
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            yield dict(zip(keys, values))
+    finally:
+        workbook.close()
+
+
+def iter_jsonl_rows(stream):
+    """Yield dict rows from a binary JSON-lines stream, one object per line.
+
+    Lines that are not valid JSON objects are yielded as an ``{"_error": ...}``
+    marker so the caller can reject that row and keep going.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield {"_error": f"Invalid JSON: {e}"}
+            continue
+        if not isinstance(obj, dict):
+            yield {"_error": "Each line must be a JSON object"}
+            continue
+        yield obj
+
+
+def detect_format(filename=None, content_type=None):
+    """Work out the upload format from the file extension or content type."""
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension == ".xlsx":
+            return "xlsx"
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
+        return "xlsx"
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "jsonl"
+    return None
+
+
+def iter_rows(stream, fmt):
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    if fmt == "xlsx":
+        return iter_xlsx_rows(stream)
+    if fmt == "jsonl":
+        return iter_jsonl_rows(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def chunked(rows, size=DEFAULT_CHUNK_SIZE):
+    """Group an iterator of rows into lists of ``(row_number, row)`` pairs."""
+    chunk = []
+    for number, row in enumerate(rows, start=1):
+        chunk.append((number, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_chunk(chunk):
+    """Split a chunk into candidate rows and in-file rejects.
+
+    Returns ``(candidates, rejects)`` where both are lists of
+    ``(row_number, row, reason)``; ``reason`` is ``None`` for candidates.
+    Only rows that are well formed and not repeated earlier in the same chunk
+    become candidates, the database check happens afterwards.
+    """
+    candidates = []
+    rejects = []
+    seen_gr = set()
+    seen_enroll = set()
+    for number, raw in chunk:
+        if "_error" in raw:
+            rejects.append((number, {}, raw["_error"]))
+            continue
+        row = normalize_row(raw)
+        missing = [f for f in STUDENT_FIELDS if not row[f]]
+        if missing:
+            rejects.append((number, row, f"Missing {', '.join(missing)}"))
+            continue
+        if row["gr_no"] in seen_gr:
+            rejects.append((number, row, "Duplicate GR number in file"))
+            continue
+        if row["enroll_no"] in seen_enroll:
+            rejects.append((number, row, "Duplicate enrollment number in file"))
+            continue
+        seen_gr.add(row["gr_no"])
+        seen_enroll.add(row["enroll_no"])
+        candidates.append((number, row, None))
+    return candidates, rejects
+
+
+def copy_rows_csv(rows):
+    """Render rows as an in-memory CSV buffer for PostgreSQL ``COPY``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[f] for f in STUDENT_FIELDS])
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+# Response headers worth keeping alongside a cached body
+CACHED_HEADERS = ("Content-Type", "X-Next-Cursor")
+
+
+class MemoryBackend:
+    """Per-process LRU with a TTL on every entry.
+
+    Invalidations only reach the process that made the write, so this is for
+    a single worker; with more, every other worker keeps serving stale lists
+    until the TTL runs out. See :func:`create_response_cache`.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, tag):
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache shared by every worker on the host through one SQLite file.
+
+    Stands in for a networked cache: invalidations made by one worker are
+    seen by all the others because the tag generations live in the file too.
+    """
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self):
+        # Opened on first use and per process, a connection must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generations (tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache_entries SET used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires, used) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now)
+        )
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            "SELECT key FROM cache_entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def generation(self, tag):
+        row = self._connect().execute(
+            "SELECT generation FROM cache_generations WHERE tag = ?", (tag,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, tag):
+        self._connect().execute(
+            "INSERT INTO cache_generations (tag, generation) VALUES (?, 1) "
+            "ON CONFLICT(tag) DO UPDATE SET generation = generation + 1",
+            (tag,)
+        )
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class ResponseCache:
+    """Read-through cache for GET responses, invalidated by tag.
+
+    Every cached response depends on one or more tags (e.g. ``"students"``).
+    The current generation of each tag is part of the cache key, so bumping a
+    tag on write makes every dependent entry unreachable at once.
+    """
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def key_for(self, tags):
+        generations = ",".join(f"{tag}={self.backend.generation(tag)}" for tag in tags)
+        return f"{request.path}?{request.query_string.decode()}|{generations}"
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.bump(tag)
+            self._count("invalidations")
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations
+        }
+
+    def cached(self, *tags, ttl=None):
+        """Decorator caching a view's successful responses under ``tags``."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self.key_for(tags)
+                entry = self.backend.get(key)
+                if entry is None:
+                    self._count("misses")
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    entry = {
+                        "body": body.decode("utf-8"),
+                        "etag": hashlib.sha256(body).hexdigest(),
+                        "headers": {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers}
+                    }
+                    self.backend.set(key, entry, ttl or self.ttl)
+                    cache_status = "MISS"
+                else:
+                    self._count("hits")
+                    cache_status = "HIT"
+
+                # Weak comparison (RFC 9110), compressed responses carry the weak form of the tag
+                if request.if_none_match.contains_weak(entry["etag"]):
+                    self._count("not_modified")
+                    response = make_response("", 304)
+                else:
+                    response = make_response(entry["body"], 200)
+                    response.headers.update(entry["headers"])
+                response.set_etag(entry["etag"])
+                # Clients may keep the body but must revalidate it on every use
+                response.headers["Cache-Control"] = "no-cache"
+                response.headers["X-Cache"] = cache_status
+                return response
+            return wrapper
+        return decorator
+
+
+def create_response_cache():
+    """Build the cache from ``RESPONSE_CACHE_*`` environment variables.
+
+    ``RESPONSE_CACHE_BACKEND`` is ``memory`` or ``sqlite``. It defaults to
+    ``sqlite`` when ``WEB_CONCURRENCY`` asks for more than one worker, the
+    memory backend can't pass invalidations between them; gunicorn.conf.py
+    refuses to start several workers on it.
+    """
+    ttl = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    max_entries = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    backend = os.getenv("RESPONSE_CACHE_BACKEND", "sqlite" if workers > 1 else "memory")
+    if backend == "sqlite":
+        path = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+        return ResponseCache(SQLiteBackend(path, max_entries), ttl)
+    return ResponseCache(MemoryBackend(max_entries), ttl)
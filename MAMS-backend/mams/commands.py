@@ -0,0 +1,100 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from . import migrations
+from .extensions import db
+from .images import IMAGE_EXTENSIONS
+from .models import StoredObject, rebuild_criteria_stats
+from .storage import STORAGE_JOB_HANDLERS, content_store, job_queue, storage
+
+
+@click.command("rebuild-criteria-stats")
+@with_appcontext
+def rebuild_criteria_stats_command():
+    """Recompute the Criterion 4 counters from scratch."""
+    years = rebuild_criteria_stats()
+    print(f"Rebuilt Criterion 4 counters for {years} academic year(s)")
+
+
+@click.command("storage-worker")
+@with_appcontext
+def storage_worker_command():
+    """Run queued storage jobs (deletes, orphan cleanup) until interrupted."""
+    job_queue.run_forever(STORAGE_JOB_HANDLERS)
+
+
+@click.command("generate-thumbnails")
+@with_appcontext
+def generate_thumbnails_command():
+    """Make previews for stored images that don't have one, e.g. from before thumbnails."""
+    made = 0
+    for obj in StoredObject.query.order_by(StoredObject.sha256).yield_per(500):
+        if os.path.splitext(obj.path)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        if storage.exists(content_store.thumbnail_path(obj.sha256)):
+            continue
+        try:
+            made += content_store.store_thumbnail(obj.sha256, obj.path, storage.download(obj.path))
+        except Exception as e:
+            print(f"Skipped {obj.path}: {e}")
+    print(f"Generated {made} thumbnail(s)")
+
+
+@click.command("migrate")
+@click.option("--to", "target", type=int, help="Stop after this migration version.")
+@click.option("--skip-checks", is_flag=True, help="Don't run the bundled EXPLAIN checks.")
+@with_appcontext
+def migrate_command(target, skip_checks):
+    """Apply pending schema migrations, checking each one's hot queries use their indexes."""
+    applied = 0
+    try:
+        for migration, results in migrations.upgrade(db.engine, target, check=not skip_checks):
+            print(f"Applied {migration.version:04d}_{migration.name}")
+            _print_checks(results)
+            applied += 1
+    except migrations.ExplainCheckFailed as e:
+        _print_checks(e.results)
+        raise click.ClickException(f"Migration rolled back: {e}")
+    print(f"{applied} migration(s) applied" if applied else "Database is up to date")
+
+
+@click.command("explain-check")
+@click.option("--students", type=int, default=migrations.EXPLAIN_STUDENTS, show_default=True,
+              help="Synthetic students to plan against.")
+@with_appcontext
+def explain_check_command(students):
+    """Re-run the EXPLAIN checks of every applied migration, e.g. after a PostgreSQL upgrade."""
+    failed = 0
+    for migration, results in migrations.check_applied(db.engine, students):
+        print(f"{migration.version:04d}_{migration.name}")
+        _print_checks(results)
+        failed += sum(1 for result in results if result.missing)
+    if failed:
+        raise click.ClickException(f"{failed} check(s) did not use their index")
+
+
+def _print_checks(results):
+    for result in results:
+        verdict = "ok" if not result.missing else "MISSING " + ", ".join(result.missing)
+        scans = f", seq scan on {', '.join(sorted(result.seq_scans))}" if result.seq_scans else ""
+        print(f"  {result.check.name}: {verdict} ({result.ms} ms{scans})")
+
+
+@click.command("startup-report")
+@with_appcontext
+def startup_report_command():
+    """Show what building the app cost, per component."""
+    print(current_app.extensions["startup_report"].format())
+
+
+COMMANDS = (
+    rebuild_criteria_stats_command,
+    storage_worker_command,
+    generate_thumbnails_command,
+    migrate_command,
+    explain_check_command,
+    startup_report_command,
+)
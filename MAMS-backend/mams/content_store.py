@@ -0,0 +1,315 @@
+import hashlib
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import wait
+
+from sqlalchemy.exc import IntegrityError
+
+from .images import IMAGE_EXTENSIONS, THUMBNAIL_CONTENT_TYPE, make_thumbnail
+from .jobs import ORPHAN_GRACE_SECONDS
+from .uploads import UPLOAD_BUFFER_SIZE, close_quietly, open_for_upload, starts_with_magic
+
+logger = logging.getLogger("mams.storage")
+
+OBJECT_PREFIX = "objects"
+THUMBNAIL_PREFIX = "thumbnails"
+
+StoredFile = namedtuple("StoredFile", "sha256 path url deduplicated")
+
+# A file the client uploads itself through a signed URL, described by what it claims
+DeclaredFile = namedtuple("DeclaredFile", "file_key sha256 size extension content_type")
+
+
+class StorageUploadError(Exception):
+    def __init__(self, file_key, error):
+        super().__init__(f"Error uploading {file_key}: {error}")
+        self.file_key = file_key
+
+
+class UploadNotFoundError(Exception):
+    """A declared file is missing from storage, or isn't the size it was declared with."""
+
+    def __init__(self, file_key, error):
+        super().__init__(f"{file_key} {error}")
+        self.file_key = file_key
+
+
+def sha256_of(file):
+    """Hash an uploaded file in fixed-size chunks, returning ``(hexdigest, size)``."""
+    content = open_for_upload(file)
+    try:
+        if isinstance(content, bytes):
+            return hashlib.sha256(content).hexdigest(), len(content)
+        digest = hashlib.sha256()
+        size = 0
+        for block in iter(lambda: content.read(UPLOAD_BUFFER_SIZE), b""):
+            digest.update(block)
+            size += len(block)
+        return digest.hexdigest(), size
+    finally:
+        close_quietly(content)
+
+
+class ContentStore:
+    """Content-addressed object storage with reference counting.
+
+    Every object lives at ``objects/<aa>/<sha256><ext>``, so identical bytes
+    are uploaded once and later submissions only bump ``ref_count``. Objects
+    whose count drops to zero are deleted by a ``gc_object`` job, which
+    re-checks the count under a row lock before touching storage.
+    """
+
+    def __init__(self, db, model, backend, job_queue, executor):
+        self.db = db
+        self.model = model
+        self.backend = backend
+        self.job_queue = job_queue
+        self.executor = executor
+
+    @staticmethod
+    def object_path(sha256, extension):
+        return f"{OBJECT_PREFIX}/{sha256[:2]}/{sha256}{extension.lower()}"
+
+    @staticmethod
+    def thumbnail_path(sha256):
+        return f"{THUMBNAIL_PREFIX}/{sha256[:2]}/{sha256}.jpg"
+
+    def thumbnail_url(self, url):
+        """Preview of the image stored at ``url``, None for PDFs and files stored before thumbnails."""
+        sha256 = self.sha256_from_url(url)
+        if not sha256 or os.path.splitext(url)[1].lower() not in IMAGE_EXTENSIONS:
+            return None
+        return self.backend.public_url(self.thumbnail_path(sha256))
+
+    def sha256_from_url(self, url):
+        path = self.backend.path_from_url(url)
+        if not path or not path.startswith(OBJECT_PREFIX + "/"):
+            return None
+        return path.rsplit("/", 1)[-1].split(".", 1)[0]
+
+    def store_many(self, files, thumbnails=None):
+        """Store ``(file_key, file, extension, content_type)`` entries.
+
+        Hashing and uploads run on the shared executor. Reference counts are
+        bumped in the caller's session and commit with the caller's row, the
+        only commit made here is the orphan guard for newly uploaded objects.
+        ``thumbnails`` maps file keys to JPEG previews, uploaded next to the
+        objects that are new. Returns ``{file_key: StoredFile}``.
+        """
+        thumbnails = thumbnails or {}
+        digests = list(self.executor.map(lambda entry: sha256_of(entry[1]), files))
+        entries = [
+            (file_key, file, content_type, sha256, size, self.object_path(sha256, extension))
+            for (file_key, file, extension, content_type), (sha256, size) in zip(files, digests)
+        ]
+
+        known = self._known({entry[3] for entry in entries})
+        new_entries = {entry[3]: entry for entry in entries if entry[3] not in known}
+
+        if new_entries:
+            # Collected by the worker if the caller's row change never commits
+            guards = [
+                self.job_queue.enqueue("gc_object", {"sha256": sha256, "path": entry[5]}, delay=ORPHAN_GRACE_SECONDS)
+                for sha256, entry in new_entries.items()
+            ]
+            self.db.session.commit()
+            try:
+                self._upload(new_entries.values(), thumbnails)
+            except StorageUploadError:
+                self.job_queue.release([job.id for job in guards])
+                raise
+
+        uploaded = set(new_entries)
+        stored = {}
+        for file_key, file, content_type, sha256, size, path in entries:
+            obj = self.db.session.query(self.model).filter(self.model.sha256 == sha256).with_for_update().first()
+            if obj is None:
+                if sha256 not in uploaded:
+                    # Garbage-collected between our lookup and now, put it back
+                    self._upload([(file_key, file, content_type, sha256, size, path)], thumbnails)
+                    uploaded.add(sha256)
+                obj = self._insert(sha256, path, size, content_type)
+            else:
+                obj.ref_count += 1
+            stored[file_key] = StoredFile(sha256, obj.path, self.backend.public_url(obj.path), sha256 not in uploaded)
+        return stored
+
+    def _insert(self, sha256, path, size, content_type):
+        try:
+            with self.db.session.begin_nested():
+                obj = self.model(sha256=sha256, path=path, size=size, content_type=content_type, ref_count=1)
+                self.db.session.add(obj)
+            return obj
+        except IntegrityError:
+            # Another request stored the same bytes a moment ago
+            obj = self.db.session.query(self.model).filter(self.model.sha256 == sha256).with_for_update().one()
+            obj.ref_count += 1
+            return obj
+
+    def _upload(self, entries, thumbnails=None):
+        entries = list(entries)
+        thumbnails = thumbnails or {}
+        contents = [open_for_upload(entry[1]) for entry in entries]
+        try:
+            futures = {
+                self.executor.submit(self.backend.upload, path, content, content_type, True): file_key
+                for (file_key, _, content_type, _, _, path), content in zip(entries, contents)
+            }
+            previews = {
+                self.executor.submit(
+                    self.backend.upload, self.thumbnail_path(sha256), thumbnails[file_key], THUMBNAIL_CONTENT_TYPE, True
+                ): file_key
+                for file_key, _, _, sha256, _, _ in entries if file_key in thumbnails
+            }
+            wait(list(futures) + list(previews))
+            for future, file_key in futures.items():
+                if future.exception() is not None:
+                    raise StorageUploadError(file_key, future.exception())
+            for future, file_key in previews.items():
+                if future.exception() is not None:
+                    # The document itself is stored, a missing preview isn't worth failing for
+                    logger.warning("Thumbnail upload for %s failed: %s", file_key, future.exception())
+        finally:
+            for content in contents:
+                close_quietly(content)
+
+    def _paths(self, sha256, path):
+        # The object and, for images, its thumbnail
+        if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+            return [path, self.thumbnail_path(sha256)]
+        return [path]
+
+    def upload_targets(self, files, sign):
+        """Work out where the client should put ``DeclaredFile`` entries itself.
+
+        Objects we already hold need no upload. For the rest ``sign(entry,
+        path)`` returns the signed upload (a dict with at least ``expires_in``), and a delayed ``gc_object`` job collects the object
+        if it is uploaded but never finalized. Commits the session.
+        Returns ``{file_key: {"path": ..., "upload": dict or None}}``.
+        """
+        known = self._known({entry.sha256 for entry in files})
+        targets = {}
+        for entry in files:
+            path = self.object_path(entry.sha256, entry.extension)
+            upload = None
+            if entry.sha256 not in known:
+                upload = sign(entry, path)
+                self.job_queue.enqueue(
+                    "gc_object", {"sha256": entry.sha256, "path": path},
+                    delay=upload["expires_in"] + ORPHAN_GRACE_SECONDS
+                )
+            targets[entry.file_key] = {"path": path, "upload": upload}
+        self.db.session.commit()
+        return targets
+
+    def register_many(self, files):
+        """Take references on ``DeclaredFile`` entries the client has uploaded.
+
+        Objects that are new to us must be in storage at the declared size;
+        their content is re-hashed later by a ``verify_object`` job, since
+        the bytes never passed through this process. Like :meth:`store_many`
+        reference counts change in the caller's session.
+        Returns ``{file_key: StoredFile}``, or raises :class:`UploadNotFoundError`.
+        """
+        known = self._known({entry.sha256 for entry in files})
+        new_entries = [entry for entry in files if entry.sha256 not in known]
+        self._check_uploaded(new_entries)
+        checked = {entry.sha256 for entry in new_entries}
+
+        stored = {}
+        for entry in files:
+            path = self.object_path(entry.sha256, entry.extension)
+            obj = self.db.session.query(self.model).filter(self.model.sha256 == entry.sha256).with_for_update().first()
+            if obj is None:
+                if entry.sha256 not in checked:
+                    # Garbage-collected between our lookup and now
+                    self._check_uploaded([entry])
+                    checked.add(entry.sha256)
+                obj = self._insert(entry.sha256, path, entry.size, entry.content_type)
+                if obj.ref_count == 1:
+                    self.job_queue.enqueue("verify_object", {"sha256": entry.sha256, "path": path})
+            else:
+                obj.ref_count += 1
+            stored[entry.file_key] = StoredFile(
+                entry.sha256, obj.path, self.backend.public_url(obj.path), entry.sha256 in known
+            )
+        return stored
+
+    def _known(self, hashes):
+        return {
+            sha256 for (sha256,) in self.db.session.query(self.model.sha256).filter(self.model.sha256.in_(hashes))
+        }
+
+    def _check_uploaded(self, entries):
+        paths = [self.object_path(entry.sha256, entry.extension) for entry in entries]
+        # One storage round trip per object, run side by side
+        for entry, size in zip(entries, self.executor.map(self.backend.size, paths)):
+            if size is None:
+                raise UploadNotFoundError(entry.file_key, "was not uploaded")
+            if size != entry.size:
+                raise UploadNotFoundError(entry.file_key, f"is {size} bytes, {entry.size} were declared")
+
+    def release(self, url):
+        """Drop one reference to the object behind ``url`` (in the caller's transaction)."""
+        sha256 = self.sha256_from_url(url)
+        obj = None
+        if sha256:
+            obj = self.db.session.query(self.model).filter(self.model.sha256 == sha256).with_for_update().first()
+        if obj is None:
+            # Stored before content addressing, nothing else can point at it
+            path = self.backend.path_from_url(url)
+            if path:
+                self.job_queue.enqueue("delete_objects", {"paths": [path]})
+            return
+        obj.ref_count -= 1
+        if obj.ref_count <= 0:
+            self.job_queue.enqueue("gc_object", {"sha256": obj.sha256, "path": obj.path})
+
+    def store_thumbnail(self, sha256, path, data):
+        """Make and upload the preview of an image already in storage, returns whether it worked."""
+        try:
+            thumbnail = make_thumbnail(data, os.path.splitext(path)[1].lower())
+        except Exception as e:
+            logger.warning("No thumbnail for %s: %s", path, e)
+            return False
+        self.backend.upload(self.thumbnail_path(sha256), thumbnail, THUMBNAIL_CONTENT_TYPE, True)
+        return True
+
+    def verify(self, payload):
+        """``verify_object`` job handler: check a client-uploaded object has the bytes its path names.
+
+        A matching image gets its thumbnail here, direct uploads never go
+        through :func:`~mams.images.process_uploads`. An object that doesn't
+        match is deleted along with its row, so nobody else is deduplicated
+        onto it; the record that declared it is left with a dead link.
+        """
+        try:
+            data = self.backend.download(payload["path"])
+        except FileNotFoundError:
+            return  # Already collected
+        extension = os.path.splitext(payload["path"])[1].lower()
+        if hashlib.sha256(data).hexdigest() == payload["sha256"] and starts_with_magic(data[:16], extension):
+            if extension in IMAGE_EXTENSIONS:
+                # Direct uploads are stored as sent, only the preview is made here
+                self.store_thumbnail(payload["sha256"], payload["path"], data)
+            return
+        logger.warning("Object %s does not match its declared content, deleting it", payload["path"])
+        obj = self.db.session.query(self.model).filter(
+            self.model.sha256 == payload["sha256"]
+        ).with_for_update().first()
+        self.backend.remove(self._paths(payload["sha256"], payload["path"]))
+        if obj is not None:
+            self.db.session.delete(obj)
+
+    def collect(self, payload):
+        """``gc_object`` job handler: delete the object if nothing references it."""
+        obj = self.db.session.query(self.model).filter(
+            self.model.sha256 == payload["sha256"]
+        ).with_for_update().first()
+        if obj is not None and obj.ref_count > 0:
+            return
+        # Storage first: if that fails the row stays and the job is retried
+        self.backend.remove(self._paths(payload["sha256"], payload["path"]))
+        if obj is not None:
+            self.db.session.delete(obj)
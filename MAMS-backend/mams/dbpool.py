@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+
+# How many recent timings the percentiles are computed from
+TIMING_WINDOW = 1000
+
+
+class TimingWindow:
+    def __init__(self, size=TIMING_WINDOW):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentiles(self, *points):
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return {f"p{p}": None for p in points}
+        return {
+            f"p{p}": round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 2)
+            for p in points
+        }
+
+    def __len__(self):
+        return len(self._values)
+
+
+checkout_waits = TimingWindow()
+connect_times = TimingWindow()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_waits.add(time.perf_counter() - started)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            connect_times.add(time.perf_counter() - started)
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options for ``SQLALCHEMY_ENGINE_OPTIONS``, tuned from ``DB_*`` env vars."""
+    options = {
+        # Managed PostgreSQL drops idle connections, test them before use
+        "pool_pre_ping": True,
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+    }
+    if database_uri and database_uri.startswith(("postgres://", "postgresql")):
+        options.update({
+            "poolclass": TimedQueuePool,
+            "pool_size": _env_int("DB_POOL_SIZE", 5),
+            "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+            "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+            "connect_args": {
+                "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 10),
+                # Server-side default, routes can tighten it with @statement_timeout
+                "options": f"-c statement_timeout={_env_int('DB_STATEMENT_TIMEOUT_MS', 30000)}",
+            },
+        })
+    return options
+
+
+def sqlite_savepoints(engine):
+    """Make SAVEPOINTs nest inside a transaction on SQLite (SQLite only).
+
+    pysqlite only begins a transaction before DML, so a SAVEPOINT issued
+    first starts one of its own and releasing it commits everything: a
+    ``begin_nested`` block would outlive the caller's rollback. Begin the
+    transaction just before such a savepoint; plain reads keep taking no
+    lock, as before.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "savepoint")
+    def _begin_first(connection, name):
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+
+
+def set_statement_timeout(session, milliseconds):
+    """Cap every statement of the session's current transaction (PostgreSQL only)."""
+    if session.get_bind().dialect.name == "postgresql":
+        # SET can't take bind parameters, the value is always an int we control
+        session.execute(text(f"SET LOCAL statement_timeout = {int(milliseconds)}"))
+
+
+def statement_timeout(db, milliseconds):
+    """Cap every statement the view runs in its first transaction (PostgreSQL only)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            set_statement_timeout(db.session, milliseconds)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedout", "checkedin", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    if "checkedin" in status:
+        status["idle"] = status.pop("checkedin")
+    status["checkout_wait_ms"] = checkout_waits.percentiles(50, 95, 99)
+    status["new_connection_ms"] = connect_times.percentiles(50, 95, 99)
+    return status
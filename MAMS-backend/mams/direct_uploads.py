@@ -0,0 +1,106 @@
+"""Two-phase uploads: the client puts files straight into storage.
+
+1. The client hashes each file and asks for upload URLs, naming the
+   SHA-256, size and file name of every file.
+2. It PUTs each file to its signed URL (files we already hold get none).
+3. It calls the matching ``finalize`` endpoint, which checks the objects
+   are in storage and writes the database row.
+
+The bytes never pass through a worker. Supabase signs the URLs itself; the
+local and memory backends use :class:`LocalUploadSigner`, whose URLs point
+back at this app's ``PUT /api/uploads/<token>`` route.
+"""
+import os
+import re
+
+from flask import current_app, url_for
+from itsdangerous import URLSafeTimedSerializer
+
+from .content_store import DeclaredFile
+from .uploads import MAX_FILE_SIZE, MB
+
+# How long a locally signed upload URL stays valid
+UPLOAD_URL_TTL = int(os.getenv("UPLOAD_URL_TTL_SECONDS", "600"))
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class LocalUploadSigner:
+    """Signed upload tokens for backends that can't sign URLs themselves.
+
+    The token carries the object path, content type, size and SHA-256,
+    signed with the app's ``SECRET_KEY`` and valid for ``max_age`` seconds.
+    """
+
+    salt = "mams-direct-upload"
+
+    def __init__(self, secret_key, max_age=UPLOAD_URL_TTL):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt=self.salt)
+        self.max_age = max_age
+
+    def sign(self, path, content_type, size, sha256):
+        return self.serializer.dumps({"path": path, "content_type": content_type, "size": size, "sha256": sha256})
+
+    def load(self, token):
+        """Return the signed fields, raises ``itsdangerous.BadSignature`` (or its subclass ``SignatureExpired``)."""
+        return self.serializer.loads(token, max_age=self.max_age)
+
+
+def local_signer():
+    return LocalUploadSigner(current_app.config["SECRET_KEY"])
+
+
+def upload_signer(backend):
+    """``sign(entry, path)`` for :meth:`ContentStore.upload_targets`."""
+    if hasattr(backend, "create_signed_upload_url"):
+        def sign(entry, path):
+            # Supabase's signed upload URLs live for two hours
+            return {**backend.create_signed_upload_url(path, entry.content_type), "expires_in": 2 * 60 * 60}
+        return sign
+
+    signer = local_signer()
+
+    def sign(entry, path):
+        token = signer.sign(path, entry.content_type, entry.size, entry.sha256)
+        return {
+            "url": url_for("documents.signed_upload_target", token=token, _external=True),
+            "method": "PUT",
+            "headers": {"Content-Type": entry.content_type},
+            "expires_in": signer.max_age,
+        }
+    return sign
+
+
+def parse_declared_files(data, file_keys):
+    """Read ``{"files": {key: {"filename", "size", "sha256"}}}`` for exactly ``file_keys``.
+
+    Returns ``(files, error)``, with ``files`` a list of :class:`DeclaredFile`.
+    """
+    declared = data.get("files") if isinstance(data, dict) else None
+    if not isinstance(declared, dict):
+        return None, "files must be an object keyed by file name"
+    files = []
+    for file_key in file_keys:
+        info = declared.get(file_key)
+        if not isinstance(info, dict):
+            return None, f"Missing {file_key} file"
+        extension = os.path.splitext(str(info.get("filename") or ""))[1].lower()
+        if extension not in CONTENT_TYPES:
+            return None, f"Invalid file type for {file_key}. Allowed types: PDF, PNG, JPG, JPEG"
+        size = info.get("size")
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            return None, f"size of {file_key} must be a positive number of bytes"
+        if size > MAX_FILE_SIZE:
+            return None, f"Each file must be at most {MAX_FILE_SIZE // MB} MB"
+        sha256 = str(info.get("sha256") or "").lower()
+        if not _SHA256.match(sha256):
+            return None, f"sha256 of {file_key} must be 64 hex digits"
+        files.append(DeclaredFile(file_key, sha256, size, extension, CONTENT_TYPES[extension]))
+    return files, None
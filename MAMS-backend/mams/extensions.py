@@ -0,0 +1,14 @@
+from flask_sqlalchemy import SQLAlchemy
+
+from .cache import create_response_cache
+from .metrics import Gauge, registry
+
+# Bound to the app in create_app(), the engine opens no connection until first checkout
+db = SQLAlchemy()
+
+# 🔹 Response cache for the read-heavy listing routes
+response_cache = create_response_cache()
+registry.register(Gauge(
+    "mams_response_cache", "Response cache counters by event", ("event",),
+    lambda: {(event,): value for event, value in response_cache.stats().items() if event != "backend"}
+))
@@ -0,0 +1,153 @@
+"""Recompression and thumbnails for uploaded photos.
+
+Phone photos of certificates arrive as multi-megabyte JPEGs/PNGs with EXIF
+data. Before they are stored each one is turned upright, stripped of its
+metadata, scaled down to ``IMAGE_MAX_DIMENSION`` and re-encoded, and a
+small JPEG thumbnail is made for preview grids.
+
+The Pillow work runs in a process pool, request threads only wait on it.
+Pillow itself is imported by the pool processes, not by the app.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger("mams.images")
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "30"))
+# Longest side of a stored photo, plenty to read a marksheet at full screen
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2000"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+THUMBNAIL_DIMENSION = int(os.getenv("THUMBNAIL_DIMENSION", "320"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "70"))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+THUMBNAIL_CONTENT_TYPE = "image/jpeg"
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+
+def _get_image_pool():
+    # Created on first use so pre-forked workers each get their own pool
+    global _image_pool
+    if _image_pool is None:
+        with _image_pool_lock:
+            if _image_pool is None:
+                _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_pool
+
+
+def _flatten(image):
+    # JPEG has no alpha channel, put transparent images on white
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+
+def _encode(image, extension, quality):
+    out = io.BytesIO()
+    if extension == ".png":
+        # Re-encoding drops EXIF, text chunks and the rest of the metadata
+        image.save(out, format="PNG", optimize=True)
+    else:
+        _flatten(image).save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def process_image(source, extension):
+    """Return ``(image_bytes, thumbnail_bytes)`` for an image file path or bytes.
+
+    Runs in the image pool. The recompressed image keeps the original's
+    format; if it comes out larger and nothing had to be removed or scaled,
+    the original bytes are kept.
+    """
+    from PIL import Image, ImageOps
+
+    if isinstance(source, (bytes, bytearray)):
+        original = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            original = f.read()
+
+    with Image.open(io.BytesIO(original)) as image:
+        has_metadata = bool(image.info.get("exif") or image.getexif())
+        scaled = max(image.size) > IMAGE_MAX_DIMENSION
+        if scaled and image.format == "JPEG":
+            # Let the decoder skip detail we would throw away (1/2, 1/4 or 1/8 scale)
+            image.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGB")
+
+        if scaled:
+            image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+        recompressed = _encode(image, extension, IMAGE_JPEG_QUALITY)
+        if len(recompressed) >= len(original) and not (scaled or has_metadata):
+            recompressed = original
+
+        image.thumbnail((THUMBNAIL_DIMENSION, THUMBNAIL_DIMENSION), Image.LANCZOS)
+        thumbnail = _encode(image, ".jpg", THUMBNAIL_QUALITY)
+    return recompressed, thumbnail
+
+
+def make_thumbnail(data, extension):
+    """Thumbnail only, for images that were stored as uploaded."""
+    return process_image(data, extension)[1]
+
+
+class ProcessedFile:
+    """Recompressed image standing in for the uploaded file it came from."""
+
+    def __init__(self, data, filename):
+        self.stream = io.BytesIO(data)
+        self.filename = filename
+
+
+def process_uploads(files):
+    """Recompress the images among ``(file_key, file, extension, content_type)`` entries.
+
+    All images are handed to the pool at once. Returns the entries with each
+    image's file replaced by a :class:`ProcessedFile`, and the thumbnails as
+    ``{file_key: bytes}``. Images Pillow can't read are kept as uploaded,
+    without a thumbnail.
+    """
+    pool = None
+    futures = {}
+    for file_key, file, extension, content_type in files:
+        if extension.lower() in IMAGE_EXTENSIONS:
+            pool = pool or _get_image_pool()
+            futures[file_key] = pool.submit(process_image, _source(file), extension.lower())
+
+    processed = []
+    thumbnails = {}
+    for file_key, file, extension, content_type in files:
+        future = futures.get(file_key)
+        if future is not None:
+            try:
+                data, thumbnails[file_key] = future.result(timeout=IMAGE_TIMEOUT)
+                file = ProcessedFile(data, getattr(file, "filename", None))
+            except Exception as e:
+                # Unreadable or too slow, store the upload untouched
+                logger.warning("Could not process image %s: %s", file_key, e)
+        processed.append((file_key, file, extension, content_type))
+    return processed, thumbnails
+
+
+def _source(file):
+    # Spooled uploads are read from disk by the pool process, anything else is sent as bytes
+    stream = file.stream
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.exists(name):
+        stream.flush()
+        return name
+    stream.seek(0)
+    return stream.read()
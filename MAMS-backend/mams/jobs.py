@@ -0,0 +1,103 @@
+import datetime
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("mams.jobs")
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "8"))
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "20"))
+# How long an upload may take before its files count as orphaned
+ORPHAN_GRACE_SECONDS = int(os.getenv("ORPHAN_GRACE_SECONDS", "900"))
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class OutboxQueue:
+    """Durable job queue backed by an outbox table in the application database.
+
+    Jobs are added to the caller's session, so they commit or roll back with
+    the row change they belong to. A separate worker process claims and runs
+    them, retrying failures with exponential backoff.
+    """
+
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+
+    def enqueue(self, kind, payload, delay=0):
+        job = self.model(
+            kind=kind,
+            payload=json.dumps(payload),
+            available_at=_now() + datetime.timedelta(seconds=delay)
+        )
+        self.db.session.add(job)
+        return job
+
+    def release(self, job_ids):
+        """Make delayed jobs runnable right away, e.g. orphan checks for a failed upload."""
+        if not job_ids:
+            return
+        self.db.session.query(self.model).filter(self.model.id.in_(job_ids)).update(
+            {"available_at": _now()}, synchronize_session=False
+        )
+        self.db.session.commit()
+
+    def pending_count(self):
+        return self.db.session.query(self.model).filter(self.model.status == "pending").count()
+
+    def _claim(self, batch_size):
+        model = self.model
+        return (
+            self.db.session.query(model)
+            .filter(model.status == "pending", model.available_at <= _now())
+            .order_by(model.available_at, model.id)
+            .limit(batch_size)
+            # Several workers can run side by side without taking the same job
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def run_once(self, handlers, batch_size=BATCH_SIZE):
+        """Run one batch of due jobs, returning how many were attempted.
+
+        Each handler runs in a savepoint: a database error rolls back only
+        that handler's work, and the failed attempt is still recorded, so a
+        poison job backs off and ends up failed instead of retrying forever.
+        """
+        jobs = self._claim(batch_size)
+        for job in jobs:
+            handler = handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind {job.kind!r}")
+                with self.db.session.begin_nested():
+                    handler(json.loads(job.payload))
+            except Exception as e:
+                job.attempts += 1
+                job.last_error = str(e)[:500]
+                if job.attempts >= MAX_ATTEMPTS:
+                    job.status = "failed"
+                    logger.error("Job %s (%s) failed for good: %s", job.id, job.kind, e)
+                else:
+                    job.available_at = _now() + datetime.timedelta(seconds=2 ** job.attempts)
+                    logger.warning("Job %s (%s) failed, retry %d: %s", job.id, job.kind, job.attempts, e)
+            else:
+                self.db.session.delete(job)
+        self.db.session.commit()
+        return len(jobs)
+
+    def run_forever(self, handlers, poll_interval=POLL_INTERVAL):
+        logger.info("Storage worker started")
+        while True:
+            try:
+                if self.run_once(handlers):
+                    continue  # More may be due, don't sleep between busy batches
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error("Worker batch failed: %s", e)
+            time.sleep(poll_interval)
@@ -0,0 +1,252 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter as TallyCounter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("mams.metrics")
+
+# Requests slower than this are logged with their query breakdown (0 disables the log)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# The same statement running this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (bucket_counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.labels, label_values, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {bucket_count}"
+            labels = _format_labels(self.labels, label_values, ("le", "+Inf"))
+            yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {total!r}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {count}"
+
+
+class Gauge:
+    """Gauge whose values are read from a callback at scrape time."""
+
+    def __init__(self, name, help_text, labels, callback):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.callback = callback
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for label_values, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "mams_request_duration_seconds", "Request latency per endpoint", ("endpoint", "method")
+))
+requests_total = registry.register(Counter(
+    "mams_requests_total", "Requests per endpoint and status", ("endpoint", "method", "status")
+))
+db_queries = registry.register(Histogram(
+    "mams_db_queries_per_request", "SQL statements run per request", ("endpoint",), QUERY_COUNT_BUCKETS
+))
+db_time = registry.register(Histogram(
+    "mams_db_time_seconds", "Time spent in SQL per request", ("endpoint",)
+))
+storage_duration = registry.register(Histogram(
+    "mams_storage_call_duration_seconds", "Latency of storage calls", ("operation",)
+))
+storage_errors = registry.register(Counter(
+    "mams_storage_errors_total", "Storage calls that raised", ("operation",)
+))
+n_plus_one = registry.register(Counter(
+    "mams_n_plus_one_total", "Requests that repeated one statement N_PLUS_ONE_THRESHOLD+ times", ("endpoint",)
+))
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+# 🔹 SQL instrumentation
+
+_literal = re.compile(r"('[^']*'|\b\d+\b)")
+
+
+def _statement_shape(statement):
+    # Collapse literals so the same query with different values counts as one shape
+    return _literal.sub("?", " ".join(statement.split()))[:200]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context, a failing statement never reaches after_cursor_execute
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is None or not has_request_context() or "db_stats" not in g:
+        return
+    stats = g.db_stats
+    stats["count"] += 1
+    stats["time"] += time.perf_counter() - started
+    stats["shapes"][_statement_shape(statement)] += 1
+
+
+# 🔹 Storage instrumentation
+
+def timed_storage_call(operation, fn, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        storage_errors.inc(operation)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        storage_duration.observe(elapsed, operation)
+        if has_request_context() and "storage_stats" in g:
+            g.storage_stats["count"] += 1
+            g.storage_stats["time"] += elapsed
+
+
+class InstrumentedBackend:
+    """Wraps a storage backend so every call lands in the storage histogram."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    # Pure helpers that never leave the process
+    untimed = {"public_url", "path_from_url", "full_path"}
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr) or name in self.untimed:
+            return attr
+
+        def call(*args, **kwargs):
+            return timed_storage_call(name, attr, *args, **kwargs)
+        return call
+
+
+# 🔹 Request hooks
+
+def init_metrics(app):
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.db_stats = {"count": 0, "time": 0.0, "shapes": TallyCounter()}
+        g.storage_stats = {"count": 0, "time": 0.0}
+
+    @app.after_request
+    def _record_request(response):
+        if "request_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = _endpoint()
+        request_duration.observe(elapsed, endpoint, request.method)
+        requests_total.inc(endpoint, request.method, str(response.status_code))
+
+        stats = g.db_stats
+        db_queries.observe(stats["count"], endpoint)
+        db_time.observe(stats["time"], endpoint)
+
+        repeated = [(shape, n) for shape, n in stats["shapes"].most_common(3) if n >= N_PLUS_ONE_THRESHOLD]
+        if repeated:
+            n_plus_one.inc(endpoint)
+            logger.warning("Possible N+1 in %s: %s", endpoint, repeated)
+
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s took %.0f ms: %d queries in %.0f ms, %d storage calls in %.0f ms, top queries %s",
+                request.method, request.path, elapsed * 1000,
+                stats["count"], stats["time"] * 1000,
+                g.storage_stats["count"], g.storage_stats["time"] * 1000,
+                stats["shapes"].most_common(3)
+            )
+        return response
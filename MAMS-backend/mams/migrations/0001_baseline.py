@@ -0,0 +1,111 @@
+"""The schema as ``db.create_all()`` built it before migrations existed.
+
+The tables are a snapshot, later migrations change them rather than this
+file. Missing tables are created and existing ones left alone, so a
+database from ``init-db`` is adopted without changes.
+"""
+import sqlalchemy as sa
+
+from .explain import ExplainCheck
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "user", metadata,
+    sa.Column("email", sa.String(100), primary_key=True),
+    sa.Column("password", sa.String(255), nullable=False),
+)
+sa.Table(
+    "student", metadata,
+    sa.Column("gr_no", sa.String(20), primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("enroll_no", sa.String(50), unique=True, nullable=False),
+    sa.Column("academic_year", sa.String(20), nullable=False),
+)
+sa.Table(
+    "placement", metadata,
+    sa.Column("gr_no", sa.String(20), sa.ForeignKey("student.gr_no"), primary_key=True),
+    sa.Column("after_graduation", sa.String(100), nullable=False),
+    sa.Column("doc_proof_url", sa.String(255), nullable=False),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "enrollment_ratio", metadata,
+    sa.Column("gr_no", sa.String(20), sa.ForeignKey("student.gr_no"), primary_key=True),
+    sa.Column("registration_form_url", sa.String(255), nullable=False),
+    sa.Column("marks10_url", sa.String(255), nullable=False),
+    sa.Column("marks12_url", sa.String(255), nullable=False),
+    sa.Column("gujcet_marksheet_url", sa.String(255), nullable=False),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "semester_result", metadata,
+    sa.Column("gr_no", sa.String(20), sa.ForeignKey("student.gr_no"), primary_key=True),
+    sa.Column("semester", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("sgpa", sa.Float),
+    sa.Column("cgpa", sa.Float),
+    sa.Column("backlogs", sa.Integer, nullable=False),
+    sa.Column("appeared", sa.Boolean, nullable=False),
+    sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "storage_job", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("kind", sa.String(50), nullable=False),
+    sa.Column("payload", sa.Text, nullable=False),
+    sa.Column("status", sa.String(20), nullable=False, index=True),
+    sa.Column("attempts", sa.Integer, nullable=False),
+    sa.Column("available_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    sa.Column("last_error", sa.Text),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "stored_object", metadata,
+    sa.Column("sha256", sa.String(64), primary_key=True),
+    sa.Column("path", sa.String(255), nullable=False),
+    sa.Column("size", sa.BigInteger, nullable=False),
+    sa.Column("content_type", sa.String(100)),
+    sa.Column("ref_count", sa.Integer, nullable=False),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+)
+sa.Table(
+    "placement_batch", metadata,
+    sa.Column("id", sa.String(32), primary_key=True),
+    sa.Column("status", sa.String(20), nullable=False),
+    sa.Column("total", sa.Integer, nullable=False),
+    sa.Column("processed", sa.Integer, nullable=False),
+    sa.Column("succeeded", sa.Integer, nullable=False),
+    sa.Column("failed", sa.Integer, nullable=False),
+    sa.Column("results", sa.Text, nullable=False),
+    sa.Column("error", sa.Text),
+    sa.Column("created_by", sa.String(100)),
+    sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    sa.Column("updated_at", sa.DateTime),
+)
+sa.Table(
+    "criteria_year_stats", metadata,
+    sa.Column("academic_year", sa.String(20), primary_key=True),
+    *(
+        sa.Column(column, sa.Integer, nullable=False, server_default="0")
+        for column in ("admitted", "documents_submitted", "placed", "higher_studies", "entrepreneur")
+    ),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+
+
+# The batch status lookup: one outer-joined probe per student through the primary keys
+CHECKS = [
+    ExplainCheck(
+        "student status by GR numbers",
+        "SELECT s.gr_no, s.name, p.after_graduation, e.gr_no FROM student s "
+        "LEFT OUTER JOIN placement p ON p.gr_no = s.gr_no "
+        "LEFT OUTER JOIN enrollment_ratio e ON e.gr_no = s.gr_no "
+        "WHERE s.gr_no IN ('explain-1000010', 'explain-1000020', 'explain-1000030') ORDER BY s.gr_no",
+        {},
+        ("student.pkey", "placement.pkey", "enrollment_ratio.pkey"),
+    ),
+]
@@ -0,0 +1,81 @@
+"""Indexes for the academic-year dashboards and the storage worker.
+
+``ix_student_academic_year_gr_no`` serves every per-year student list:
+the keyset pages (``academic_year = ? AND gr_no > ? ORDER BY gr_no``), the
+missing-placement and missing-document anti-joins and the status outer
+joins all walk it in ``gr_no`` order and probe ``placement`` and
+``enrollment_ratio`` by primary key. Cohorts run newest first so the
+Criterion 4 export reads it in order too, and on PostgreSQL it carries
+``name`` and ``enroll_no`` so the list pages can be index-only scans.
+
+``ix_storage_job_pending`` is partial: the worker's claim only ever wants
+pending jobs, while failed ones pile up. It replaces the plain index on
+``status``.
+"""
+import sqlalchemy as sa
+
+from .explain import EXPLAIN_YEAR, ExplainCheck
+
+
+def upgrade(connection):
+    metadata = sa.MetaData()
+    student = sa.Table("student", metadata, autoload_with=connection)
+    storage_job = sa.Table("storage_job", metadata, autoload_with=connection)
+
+    sa.Index(
+        "ix_student_academic_year_gr_no", student.c.academic_year.desc(), student.c.gr_no,
+        postgresql_include=["name", "enroll_no"]
+    ).create(connection, checkfirst=True)
+
+    sa.Index("ix_storage_job_status", storage_job.c.status).drop(connection, checkfirst=True)
+    pending = storage_job.c.status == "pending"
+    sa.Index(
+        "ix_storage_job_pending", storage_job.c.available_at, storage_job.c.id,
+        postgresql_where=pending, sqlite_where=pending
+    ).create(connection, checkfirst=True)
+
+
+# The first page of a year, what the dashboards open with
+_YEAR = {"year": EXPLAIN_YEAR}
+
+CHECKS = [
+    ExplainCheck(
+        "students of a year, first page",
+        "SELECT gr_no, name, enroll_no, academic_year FROM student "
+        "WHERE academic_year = :year ORDER BY gr_no LIMIT 1001",
+        _YEAR,
+        ("ix_student_academic_year_gr_no",),
+    ),
+    ExplainCheck(
+        "students of a year without documents",
+        "SELECT s.gr_no, s.name FROM student s WHERE s.academic_year = :year "
+        "AND NOT (EXISTS (SELECT e.gr_no FROM enrollment_ratio e WHERE e.gr_no = s.gr_no)) "
+        "ORDER BY s.gr_no LIMIT 1001",
+        _YEAR,
+        ("ix_student_academic_year_gr_no", "enrollment_ratio.pkey"),
+    ),
+    ExplainCheck(
+        "students of a year without a placement",
+        "SELECT s.gr_no, s.name FROM student s WHERE s.academic_year = :year "
+        "AND NOT (EXISTS (SELECT p.gr_no FROM placement p WHERE p.gr_no = s.gr_no)) "
+        "ORDER BY s.gr_no LIMIT 1001",
+        _YEAR,
+        ("ix_student_academic_year_gr_no", "placement.pkey"),
+    ),
+    ExplainCheck(
+        "placement and document status of a year",
+        "SELECT s.gr_no, s.name, s.enroll_no, p.after_graduation, e.gr_no FROM student s "
+        "LEFT OUTER JOIN placement p ON p.gr_no = s.gr_no "
+        "LEFT OUTER JOIN enrollment_ratio e ON e.gr_no = s.gr_no "
+        "WHERE s.academic_year = :year ORDER BY s.gr_no LIMIT 1001",
+        _YEAR,
+        ("ix_student_academic_year_gr_no", "placement.pkey", "enrollment_ratio.pkey"),
+    ),
+    ExplainCheck(
+        "storage worker claim",
+        "SELECT id FROM storage_job WHERE status = 'pending' AND available_at <= CURRENT_TIMESTAMP "
+        "ORDER BY available_at, id LIMIT 20",
+        {},
+        ("ix_storage_job_pending",),
+    ),
+]
@@ -0,0 +1,125 @@
+"""Versioned schema migrations, applied with ``flask migrate``.
+
+Every ``NNNN_<name>.py`` module in this package is one migration: an
+``upgrade(connection)`` function and, optionally, ``CHECKS``, the hot
+queries it exists for (see :mod:`.explain`). A migration's DDL, its checks
+and its row in ``schema_migrations`` share one transaction, so a migration
+whose queries don't use their indexes is rolled back rather than recorded.
+
+``0001_baseline`` only creates the tables that are missing, so databases
+set up with ``db.create_all()`` before migrations existed are adopted as
+they are.
+"""
+import contextlib
+import datetime
+import importlib
+import pkgutil
+import re
+from collections import namedtuple
+
+import sqlalchemy as sa
+
+from .explain import EXPLAIN_STUDENTS, ExplainCheckFailed, clean_up, run_checks, verify  # noqa: F401
+
+Migration = namedtuple("Migration", "version name module")
+
+_MODULE_NAME = re.compile(r"^(\d{4})_(\w+)$")
+# Serialises concurrent `flask migrate` runs on PostgreSQL, e.g. from two deploys
+_ADVISORY_LOCK_ID = 0x4D414D53
+
+schema_migrations = sa.Table(
+    "schema_migrations", sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+def migrations():
+    """Every migration in this package, oldest first."""
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(module.name)
+        if match:
+            found.append(Migration(
+                int(match.group(1)), match.group(2), importlib.import_module(f"{__name__}.{module.name}")
+            ))
+    return sorted(found, key=lambda migration: migration.version)
+
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(sa.select(schema_migrations.c.version))}
+
+
+def pending(engine, target=None):
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+    return [
+        migration for migration in migrations()
+        if migration.version not in done and (target is None or migration.version <= target)
+    ]
+
+
+@contextlib.contextmanager
+def _transaction(engine):
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as connection:
+            yield connection
+        return
+    # pysqlite only opens a transaction before DML, begin explicitly so the DDL rolls back too
+    with engine.execution_options(isolation_level="AUTOCOMMIT").begin() as connection:
+        connection.exec_driver_sql("BEGIN")
+        yield connection
+
+
+def upgrade(engine, target=None, check=True, students=EXPLAIN_STUDENTS):
+    """Apply pending migrations up to ``target``, each in its own transaction.
+
+    Yields ``(migration, check_results)`` after each one commits. With
+    ``check`` the migration's bundled EXPLAIN checks run before the commit
+    and :class:`ExplainCheckFailed` rolls it back.
+    """
+    for migration in pending(engine, target):
+        checks = getattr(migration.module, "CHECKS", ()) if check else ()
+        try:
+            with _transaction(engine) as connection:
+                if connection.dialect.name == "postgresql":
+                    connection.execute(sa.text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+                if migration.version in applied_versions(connection):
+                    continue  # Applied by a concurrent run while we waited for the lock
+                migration.module.upgrade(connection)
+                results = verify(connection, checks, students) if checks else []
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                ))
+        finally:
+            if checks:
+                clean_up(engine)
+        yield migration, results
+
+
+def check_applied(engine, students=EXPLAIN_STUDENTS):
+    """Run the checks of every applied migration again, returning ``[(migration, results)]``.
+
+    All of them share one set of synthetic rows: every rolled back set leaves
+    dead index entries behind that would skew the plans of the next one.
+    """
+    with engine.connect() as connection:
+        with connection.begin():
+            done = applied_versions(connection)
+            checked = [
+                migration for migration in migrations()
+                if migration.version in done and getattr(migration.module, "CHECKS", ())
+            ]
+            results = iter(run_checks(
+                connection, [check for migration in checked for check in migration.module.CHECKS], students
+            ))
+            results = [
+                (migration, [next(results) for _ in migration.module.CHECKS])
+                for migration in checked
+            ]
+    clean_up(engine)
+    return results
@@ -0,0 +1,146 @@
+"""EXPLAIN checks proving that hot queries are answered through an index.
+
+A migration bundles :class:`ExplainCheck` entries in ``CHECKS``. They run
+against ``EXPLAIN_STUDENTS`` synthetic students (with placements,
+documents and outbox jobs in the usual proportions) added on top of the
+real rows inside a savepoint, so the planner sees production-sized tables,
+and everything is rolled back afterwards.
+
+PostgreSQL runs ``EXPLAIN (ANALYZE, FORMAT JSON)``. SQLite, used for local
+development and the benchmarks, has no ANALYZE option, so its check reads
+``EXPLAIN QUERY PLAN`` and times the query separately.
+"""
+import json
+import os
+import re
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+
+# The plans must hold with at least this many students
+EXPLAIN_STUDENTS = int(os.getenv("EXPLAIN_STUDENTS", "100000"))
+# Cohorts the synthetic students are split into, labelled 2016-17 onwards. GR numbers are
+# handed out at admission, so like real ones each cohort is one contiguous range of them.
+EXPLAIN_YEARS = 8
+# A cohort present in the synthetic data, for checks that filter by year
+EXPLAIN_YEAR = "2019-20"
+
+# ``sql`` runs with ``params``; each name in ``uses`` must show up as an index in its plan.
+# ``<table>.pkey`` stands for the table's primary key index, whatever the database calls it.
+ExplainCheck = namedtuple("ExplainCheck", "name sql params uses")
+CheckResult = namedtuple("CheckResult", "check missing indexes seq_scans ms")
+
+_SERIES = "WITH RECURSIVE series(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM series WHERE n < :rows) "
+
+# Fixed width, so GR numbers sort like the counter: explain-1000001, explain-1000002, ...
+_GR_NO = "'explain-' || (1000000 + n)"
+_COHORT = f"(n - 1) * {EXPLAIN_YEARS} / :rows"
+
+# Placements for 3 in 5 students, documents for 7 in 10, and a backlog of failed outbox jobs
+_SYNTHETIC_ROWS = (
+    ("student", "INSERT INTO student (gr_no, name, enroll_no, academic_year) " + _SERIES +
+     f"SELECT {_GR_NO}, 'Student ' || n, 'explain-e' || n, "
+     f"'20' || (16 + {_COHORT}) || '-' || (17 + {_COHORT}) FROM series", 1),
+    ("placement", "INSERT INTO placement (gr_no, after_graduation, doc_proof_url) " + _SERIES +
+     f"SELECT {_GR_NO}, 'placement', 'explain' FROM series WHERE n % 5 < 3", 1),
+    ("enrollment_ratio", "INSERT INTO enrollment_ratio (gr_no, registration_form_url, marks10_url, marks12_url, gujcet_marksheet_url) "
+     + _SERIES + f"SELECT {_GR_NO}, 'explain', 'explain', 'explain', 'explain' FROM series WHERE n % 10 < 7", 1),
+    ("storage_job", "INSERT INTO storage_job (kind, payload, status, attempts) " + _SERIES +
+     "SELECT 'explain', '{}', CASE WHEN n % 100 = 0 THEN 'pending' ELSE 'failed' END, 0 FROM series", 0.2),
+)
+
+
+class ExplainCheckFailed(Exception):
+    def __init__(self, results):
+        failed = [result for result in results if result.missing]
+        super().__init__("; ".join(
+            f"{result.check.name} did not use {', '.join(result.missing)} "
+            f"(plan used {', '.join(sorted(result.indexes)) or 'no index'})"
+            for result in failed
+        ))
+        self.results = results
+
+
+def run_checks(connection, checks, students=EXPLAIN_STUDENTS):
+    """Run ``checks`` with ``students`` synthetic students added, returning a :class:`CheckResult` each."""
+    savepoint = connection.begin_nested()
+    try:
+        _add_synthetic_rows(connection, students)
+        return [_explain(connection, check) for check in checks]
+    finally:
+        savepoint.rollback()
+
+
+def verify(connection, checks, students=EXPLAIN_STUDENTS):
+    """Like :func:`run_checks`, raising :class:`ExplainCheckFailed` if any plan misses its index."""
+    results = run_checks(connection, checks, students)
+    if any(result.missing for result in results):
+        raise ExplainCheckFailed(results)
+    return results
+
+
+def clean_up(engine):
+    """Vacuum away the synthetic rows :func:`run_checks` rolled back, once its transaction is over.
+
+    PostgreSQL keeps their index entries until the next vacuum, bloating the
+    indexes the next run plans against, and the rolled back ANALYZE left row
+    counts for them behind. SQLite rolls back without leftovers.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"VACUUM (ANALYZE) {', '.join(table for table, _, _ in _SYNTHETIC_ROWS)}"))
+
+
+def _add_synthetic_rows(connection, students):
+    for table, statement, share in _SYNTHETIC_ROWS:
+        connection.execute(text(statement), {"rows": max(1, int(students * share))})
+        # Fresh statistics before the next table's foreign key checks plan against this one,
+        # a rolled back earlier run leaves the planner believing it is still small
+        connection.execute(text(f"ANALYZE {table}"))
+
+
+def _explain(connection, check):
+    if connection.dialect.name == "postgresql":
+        indexes, seq_scans, ms = _explain_postgresql(connection, check)
+    else:
+        indexes, seq_scans, ms = _explain_sqlite(connection, check)
+    expected = [_index_name(connection, name) for name in check.uses]
+    return CheckResult(check, [name for name in expected if name not in indexes], indexes, seq_scans, ms)
+
+
+def _index_name(connection, name):
+    if not name.endswith(".pkey"):
+        return name
+    table = name[:-len(".pkey")]
+    return f"{table}_pkey" if connection.dialect.name == "postgresql" else f"sqlite_autoindex_{table}_1"
+
+
+def _explain_postgresql(connection, check):
+    document = connection.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + check.sql), check.params).scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    nodes = list(_plan_nodes(document[0]["Plan"]))
+    indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    seq_scans = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+    return indexes, seq_scans, round(document[0]["Execution Time"], 2)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\S+)$")
+
+
+def _explain_sqlite(connection, check):
+    details = [row[3] for row in connection.execute(text("EXPLAIN QUERY PLAN " + check.sql), check.params)]
+    indexes = {match.group(1) for detail in details for match in [_SQLITE_INDEX.search(detail)] if match}
+    seq_scans = {match.group(1) for detail in details for match in [_SQLITE_SCAN.match(detail)] if match}
+    started = time.perf_counter()
+    connection.execute(text(check.sql), check.params).all()
+    return indexes, seq_scans, round((time.perf_counter() - started) * 1000, 2)
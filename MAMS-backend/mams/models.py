@@ -0,0 +1,253 @@
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .extensions import db
+
+# 🔹 User Model
+class User(db.Model):
+    email = db.Column(db.String(100), primary_key=True)  # Primary key is email
+    password = db.Column(db.String(255), nullable=False)
+
+# 🔹 Student Model (No 'id' field)
+class Student(db.Model):
+    gr_no = db.Column(db.String(20), primary_key=True)  # GR number as primary key
+    name = db.Column(db.String(100), nullable=False)
+    enroll_no = db.Column(db.String(50), unique=True, nullable=False)
+    academic_year = db.Column(db.String(20), nullable=False)
+    __table_args__ = (
+        # Per-year lists in GR order, newest cohort first (migration 0002)
+        db.Index(
+            "ix_student_academic_year_gr_no", academic_year.desc(), gr_no,
+            postgresql_include=["name", "enroll_no"]
+        ),
+    )
+
+# 🔹 Placement Model
+class Placement(db.Model):
+    __tablename__ = 'placement'
+    gr_no = db.Column(db.String(20), db.ForeignKey('student.gr_no'), primary_key=True)
+    after_graduation = db.Column(db.String(100), nullable=False)
+    doc_proof_url = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+# 🔹 Enrollment Ratio Model
+class EnrollmentRatio(db.Model):
+    __tablename__ = 'enrollment_ratio'
+    gr_no = db.Column(db.String(20), db.ForeignKey('student.gr_no'), primary_key=True)
+    registration_form_url = db.Column(db.String(255), nullable=False)
+    marks10_url = db.Column(db.String(255), nullable=False)
+    marks12_url = db.Column(db.String(255), nullable=False)
+    gujcet_marksheet_url = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+# 🔹 Semester Result Model (one row per student per semester)
+class SemesterResult(db.Model):
+    __tablename__ = 'semester_result'
+    gr_no = db.Column(db.String(20), db.ForeignKey('student.gr_no'), primary_key=True)
+    semester = db.Column(db.Integer, primary_key=True)
+    sgpa = db.Column(db.Float)
+    cgpa = db.Column(db.Float)
+    backlogs = db.Column(db.Integer, nullable=False, default=0)
+    appeared = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+# 🔹 Storage Job Model (outbox for storage side effects, run by `flask storage-worker`)
+class StorageJob(db.Model):
+    __tablename__ = 'storage_job'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    __table_args__ = (
+        # The worker's claim, only over pending jobs (migration 0002)
+        db.Index(
+            "ix_storage_job_pending", available_at, id,
+            postgresql_where=status == "pending", sqlite_where=status == "pending"
+        ),
+    )
+
+# 🔹 Stored Object Model (content-addressed files and how many rows point at them)
+class StoredObject(db.Model):
+    __tablename__ = 'stored_object'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100))
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+# 🔹 Placement Batch Model (progress and per-entry results of a ZIP ingestion, see placement_batch.py)
+class PlacementBatch(db.Model):
+    __tablename__ = 'placement_batch'
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    results = db.Column(db.Text, nullable=False, default="[]")  # JSON list, one entry per manifest row
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime)
+
+# 🔹 Criterion 4 per-year counters (maintained on every write, see below)
+class CriteriaYearStats(db.Model):
+    __tablename__ = 'criteria_year_stats'
+    academic_year = db.Column(db.String(20), primary_key=True)
+    admitted = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    documents_submitted = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    placed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    higher_studies = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    entrepreneur = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+# Placement status (as sent by the frontend) -> counter column
+PLACEMENT_STATUS_COLUMNS = {
+    "placement": "placed",
+    "higher-studies": "higher_studies",
+    "entrepreneur": "entrepreneur",
+}
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def bump_criteria_stats(connection, deltas):
+    """Apply ``{academic_year: {column: delta}}`` to the counter table.
+
+    Runs on the caller's connection so the counters commit or roll back
+    together with the row change that caused them. One upsert covers every
+    year, so two writers adding the first rows of a new year both land
+    instead of one failing on the primary key.
+    """
+    table = CriteriaYearStats.__table__
+    deltas = {
+        academic_year: {column: delta for column, delta in counts.items() if delta}
+        for academic_year, counts in deltas.items()
+    }
+    columns = sorted({column for counts in deltas.values() for column in counts})
+    if not columns:
+        return
+    # Sorted so concurrent writers lock the year rows in the same order
+    rows = [
+        {"academic_year": academic_year, **{column: counts.get(column, 0) for column in columns}}
+        for academic_year, counts in sorted(deltas.items()) if counts
+    ]
+    insert = _UPSERT_INSERTS[connection.dialect.name](table).values(rows)
+    connection.execute(insert.on_conflict_do_update(
+        index_elements=[table.c.academic_year],
+        set_={column: table.c[column] + insert.excluded[column] for column in columns}
+    ))
+
+def _placement_column(status):
+    return PLACEMENT_STATUS_COLUMNS.get(status)
+
+@event.listens_for(db.session, "after_flush")
+def _track_criteria_stats(session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flushed changes here
+    year_deltas = defaultdict(Counter)
+    gr_deltas = []  # (gr_no, column, delta) for rows that only know their student
+    moved = {}  # gr_no -> academic year before the flush, for students that changed year
+
+    for obj, sign in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        if isinstance(obj, Student):
+            year_deltas[obj.academic_year]["admitted"] += sign
+        elif isinstance(obj, EnrollmentRatio):
+            gr_deltas.append((obj.gr_no, "documents_submitted", sign))
+        elif isinstance(obj, Placement) and _placement_column(obj.after_graduation):
+            gr_deltas.append((obj.gr_no, _placement_column(obj.after_graduation), sign))
+
+    for obj in session.dirty:
+        if isinstance(obj, Student):
+            history = inspect(obj).attrs.academic_year.history
+            if history.deleted and history.added:
+                year_deltas[history.deleted[0]]["admitted"] -= 1
+                year_deltas[history.added[0]]["admitted"] += 1
+                moved[obj.gr_no] = history.deleted[0]
+        elif isinstance(obj, Placement):
+            history = inspect(obj).attrs.after_graduation.history
+            if history.deleted and history.added:
+                old_column = _placement_column(history.deleted[0])
+                new_column = _placement_column(history.added[0])
+                if old_column:
+                    gr_deltas.append((obj.gr_no, old_column, -1))
+                if new_column:
+                    gr_deltas.append((obj.gr_no, new_column, 1))
+
+    if not year_deltas and not gr_deltas:
+        return
+
+    connection = session.connection()
+    if moved:
+        _move_student_counts(connection, moved, gr_deltas, year_deltas)
+        gr_deltas = [delta for delta in gr_deltas if delta[0] not in moved]
+    if gr_deltas:
+        gr_numbers = {gr_no for gr_no, _, _ in gr_deltas}
+        years = dict(connection.execute(
+            select(Student.gr_no, Student.academic_year).where(Student.gr_no.in_(gr_numbers))
+        ).all())
+        for gr_no, column, delta in gr_deltas:
+            if gr_no in years:
+                year_deltas[years[gr_no]][column] += delta
+
+    if year_deltas:
+        bump_criteria_stats(connection, year_deltas)
+
+def _move_student_counts(connection, moved, gr_deltas, year_deltas):
+    # Everything a student counted follows it to its new year: what it counts after the
+    # flush is added there, what it counted before (after minus the flush's own deltas)
+    # is taken from the old year
+    flushed = defaultdict(Counter)
+    for gr_no, column, delta in gr_deltas:
+        if gr_no in moved:
+            flushed[gr_no][column] += delta
+
+    rows = connection.execute(
+        select(Student.gr_no, Student.academic_year, EnrollmentRatio.gr_no, Placement.after_graduation)
+        .outerjoin(EnrollmentRatio, EnrollmentRatio.gr_no == Student.gr_no)
+        .outerjoin(Placement, Placement.gr_no == Student.gr_no)
+        .where(Student.gr_no.in_(moved))
+    ).all()
+    for gr_no, academic_year, documents_gr_no, status in rows:
+        after = Counter()
+        if documents_gr_no is not None:
+            after["documents_submitted"] += 1
+        if _placement_column(status):
+            after[_placement_column(status)] += 1
+        before = after.copy()
+        before.subtract(flushed[gr_no])
+        year_deltas[academic_year].update(after)
+        year_deltas[moved[gr_no]].subtract(before)
+
+def rebuild_criteria_stats():
+    """Recompute every counter from the source tables in one transaction."""
+    CriteriaYearStats.__table__.create(db.engine, checkfirst=True)
+    deltas = defaultdict(Counter)
+
+    for academic_year, count in db.session.query(
+        Student.academic_year, db.func.count()
+    ).group_by(Student.academic_year):
+        deltas[academic_year]["admitted"] = count
+
+    for academic_year, count in db.session.query(
+        Student.academic_year, db.func.count()
+    ).join(EnrollmentRatio, EnrollmentRatio.gr_no == Student.gr_no).group_by(Student.academic_year):
+        deltas[academic_year]["documents_submitted"] = count
+
+    for academic_year, status, count in db.session.query(
+        Student.academic_year, Placement.after_graduation, db.func.count()
+    ).join(Placement, Placement.gr_no == Student.gr_no).group_by(Student.academic_year, Placement.after_graduation):
+        column = _placement_column(status)
+        if column:
+            deltas[academic_year][column] += count
+
+    db.session.execute(CriteriaYearStats.__table__.delete())
+    bump_criteria_stats(db.session.connection(), deltas)
+    db.session.commit()
+    return len(deltas)
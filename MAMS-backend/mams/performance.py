@@ -0,0 +1,186 @@
+import os
+
+# NumPy is imported by the functions that use it: it is the most expensive import
+# in the app and only the performance report needs it, so workers boot without it
+
+# Semesters in the programme, graduating "in the stipulated period" means clearing all of them
+STIPULATED_SEMESTERS = 8
+
+# NBA 4.3 looks at second year results, i.e. the end of semester 4
+API_SEMESTER = 4
+
+MAX_CGPA = 10.0
+
+# NBA 4.1 / 4.4 denominators
+SANCTIONED_INTAKE = int(os.getenv("SANCTIONED_INTAKE", "60"))
+
+
+def percentage(numerator, denominator):
+    return round(numerator * 100 / denominator, 2) if denominator else None
+
+
+def normalize_result_row(raw):
+    """Validate one semester result row, returning ``(row, error)``."""
+    gr_no = str(raw.get("gr_no") or "").strip()
+    if not gr_no:
+        return None, "Missing gr_no"
+
+    try:
+        semester = int(raw.get("semester"))
+    except (TypeError, ValueError):
+        return None, "semester must be a number"
+    if not 1 <= semester <= STIPULATED_SEMESTERS:
+        return None, f"semester must be between 1 and {STIPULATED_SEMESTERS}"
+
+    row = {"gr_no": gr_no, "semester": semester}
+    for field in ("sgpa", "cgpa"):
+        value = raw.get(field)
+        if value in (None, ""):
+            row[field] = None
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None, f"{field} must be a number"
+        if not 0 <= value <= MAX_CGPA:
+            return None, f"{field} must be between 0 and {MAX_CGPA:g}"
+        row[field] = value
+
+    try:
+        row["backlogs"] = int(raw.get("backlogs") or 0)
+    except (TypeError, ValueError):
+        return None, "backlogs must be a number"
+    if row["backlogs"] < 0:
+        return None, "backlogs cannot be negative"
+
+    appeared = raw.get("appeared", True)
+    if isinstance(appeared, str):
+        appeared = appeared.strip().lower() in ("1", "true", "yes", "y")
+    row["appeared"] = bool(appeared)
+    return row, None
+
+
+def _group_sum(groups, matrix, n_groups):
+    """Sum the rows of a (students x semesters) matrix per group in one bincount."""
+    import numpy as np
+    semesters = matrix.shape[1]
+    flat = (groups[:, None] * semesters + np.arange(semesters)).ravel()
+    totals = np.bincount(flat, weights=matrix.ravel(), minlength=n_groups * semesters)
+    return totals.reshape(n_groups, semesters)
+
+
+def _ratio(numerators, denominators):
+    import numpy as np
+    out = np.full(numerators.shape, np.nan)
+    np.divide(numerators, denominators, out=out, where=denominators > 0)
+    return out
+
+
+def _value(x, digits=2):
+    import numpy as np
+    # NaN means "not computable" (e.g. nobody appeared), which JSON has no literal for
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def compute_cohort_metrics(years, admitted, rows, api_semester=API_SEMESTER):
+    """Compute Criterion 4.2/4.3 figures for several cohorts at once.
+
+    ``years`` is the list of academic years (year of entry) to report on and
+    ``admitted`` the matching number of admitted students. ``rows`` holds
+    ``(academic_year, gr_no, semester, cgpa, backlogs, appeared)`` tuples for
+    every result of those cohorts. All counting happens on NumPy arrays, the
+    only Python loop is the one that formats the output.
+    """
+    import numpy as np
+    year_labels = np.asarray(years, dtype=str)
+    n_years = len(year_labels)
+    if not n_years:
+        return []
+    admitted = np.asarray(admitted, dtype=float)
+    S = STIPULATED_SEMESTERS
+
+    columns = list(zip(*rows)) if rows else [()] * 6
+    result_years = np.asarray(columns[0], dtype=str)
+    gr_numbers = np.asarray(columns[1], dtype=str)
+    semester_idx = np.asarray(columns[2], dtype=int) - 1
+    cgpa = np.asarray(columns[3], dtype=float)
+    backlogs = np.asarray(columns[4], dtype=int)
+    appeared = np.asarray(columns[5], dtype=bool)
+
+    # Map every result to its cohort and student, dropping cohorts not asked for
+    order = np.argsort(year_labels)
+    position = order[np.clip(np.searchsorted(year_labels, result_years, sorter=order), 0, n_years - 1)]
+    known = year_labels[position] == result_years
+    row_year = position[known]
+    student_labels, student_idx = np.unique(gr_numbers[known], return_inverse=True)
+    semester_idx, cgpa, backlogs, appeared = semester_idx[known], cgpa[known], backlogs[known], appeared[known]
+
+    n_students = len(student_labels)
+    student_year = np.zeros(n_students, dtype=int)
+    student_year[student_idx] = row_year
+
+    # One (students x semesters) matrix per measure
+    sat = np.zeros((n_students, S), dtype=bool)
+    sat[student_idx, semester_idx] = appeared
+    backlog_matrix = np.zeros((n_students, S), dtype=int)
+    backlog_matrix[student_idx, semester_idx] = backlogs
+    cgpa_matrix = np.full((n_students, S), np.nan)
+    cgpa_matrix[student_idx, semester_idx] = cgpa
+
+    # 4.2.1: appeared in every semester and never had a backlog
+    without_backlog = sat.all(axis=1) & (backlog_matrix == 0).all(axis=1)
+    # 4.2.2: cleared everything by the final semester
+    stipulated = sat[:, S - 1] & (backlog_matrix[:, S - 1] == 0)
+
+    graduated_without_backlog = np.bincount(student_year, weights=without_backlog, minlength=n_years)
+    graduated_stipulated = np.bincount(student_year, weights=stipulated, minlength=n_years)
+    success_without_backlog = _ratio(graduated_without_backlog * 100, admitted)
+    success_stipulated = _ratio(graduated_stipulated * 100, admitted)
+
+    appeared_per_semester = _group_sum(student_year, sat, n_years)
+    with_backlog_per_semester = _group_sum(student_year, sat & (backlog_matrix > 0), n_years)
+    backlogs_per_semester = _group_sum(student_year, backlog_matrix, n_years)
+
+    # 4.3: API = X * (Y / Z) for the chosen semester
+    a = api_semester - 1
+    api_appeared = sat[:, a]
+    api_successful = api_appeared & (backlog_matrix[:, a] == 0) & ~np.isnan(cgpa_matrix[:, a])
+    z = np.bincount(student_year, weights=api_appeared, minlength=n_years)
+    y = np.bincount(student_year, weights=api_successful, minlength=n_years)
+    cgpa_sum = np.bincount(student_year, weights=np.where(api_successful, cgpa_matrix[:, a], 0.0), minlength=n_years)
+    x = _ratio(cgpa_sum, y)
+    api = x * _ratio(y, z)
+
+    results = []
+    for i, academic_year in enumerate(year_labels):
+        results.append({
+            "academic_year": str(academic_year),
+            "admitted": int(admitted[i]),
+            "success_rate": {
+                "without_backlog": {
+                    "graduated": int(graduated_without_backlog[i]),
+                    "index": _value(success_without_backlog[i])
+                },
+                "stipulated_period": {
+                    "graduated": int(graduated_stipulated[i]),
+                    "index": _value(success_stipulated[i])
+                }
+            },
+            "semesters": [
+                {
+                    "semester": s + 1,
+                    "appeared": int(appeared_per_semester[i, s]),
+                    "with_backlog": int(with_backlog_per_semester[i, s]),
+                    "total_backlogs": int(backlogs_per_semester[i, s])
+                }
+                for s in range(S)
+            ],
+            "academic_performance": {
+                "semester": api_semester,
+                "mean_cgpa": _value(x[i]),
+                "successful": int(y[i]),
+                "appeared": int(z[i]),
+                "api": _value(api[i])
+            }
+        })
+    return results
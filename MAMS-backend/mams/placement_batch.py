@@ -0,0 +1,303 @@
+"""Batch placement ingestion: a ZIP of proofs plus a CSV manifest.
+
+The placement cell hands over a whole year's offer letters at once. The
+request only checks the archive and the manifest (``filename,gr_no,status``
+per row, every GR number looked up in one query) and answers with a batch
+id. A runner thread, which keeps the request's ``bulk`` admission slot
+until it is done, then works through the accepted rows
+``PLACEMENT_BATCH_CHUNK`` at a time: the chunk's photos are recompressed in
+the image pool, its files hashed and uploaded on the storage executor, and
+its placement rows, reference counts and the batch's progress commit in one
+transaction.
+
+Progress and per-row results live in the ``placement_batch`` table, so any
+worker can answer ``GET /api/placement-details/batch/<id>``.
+"""
+import datetime
+import json
+import logging
+import os
+import uuid
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .bulk_import import iter_csv_rows
+from .content_store import StorageUploadError
+from .direct_uploads import CONTENT_TYPES
+from .extensions import db, response_cache
+from .images import process_uploads
+from .models import Placement, PlacementBatch, Student
+from .storage import content_store
+from .uploads import MAX_FILE_SIZE, MB, UPLOAD_BUFFER_SIZE, BoundedSpool, close_quietly, starts_with_magic
+
+logger = logging.getLogger("mams.placement_batch")
+
+# Largest archive accepted, offer letters for a whole year
+MAX_BATCH_ARCHIVE_SIZE = int(os.getenv("MAX_BATCH_ARCHIVE_MB", "512")) * MB
+MAX_BATCH_ENTRIES = int(os.getenv("MAX_BATCH_ENTRIES", "2000"))
+# Manifest rows stored and committed together
+PLACEMENT_BATCH_CHUNK = int(os.getenv("PLACEMENT_BATCH_CHUNK", "25"))
+# Batches run at once per worker process, their files share the image and storage pools
+PLACEMENT_BATCH_JOBS = int(os.getenv("PLACEMENT_BATCH_JOBS", "2"))
+# A batch that made no progress for this long went down with its worker
+PLACEMENT_BATCH_STALE_SECONDS = int(os.getenv("PLACEMENT_BATCH_STALE_SECONDS", "600"))
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_FIELDS = ("filename", "gr_no", "status")
+
+ManifestEntry = namedtuple("ManifestEntry", "row filename gr_no status")
+
+# Threads are only started on first submit, so this is safe to build before a fork
+batch_executor = ThreadPoolExecutor(max_workers=PLACEMENT_BATCH_JOBS, thread_name_prefix="placement-batch")
+
+
+class BatchError(ValueError):
+    """The archive or the manifest can't be used at all."""
+
+
+class ArchiveFile:
+    """Archive member spooled to disk, shaped like an uploaded file."""
+
+    def __init__(self, spool, filename):
+        self.stream = spool
+        self.filename = filename
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def open_archive(stream):
+    try:
+        return zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise BatchError("archive must be a ZIP file")
+
+
+def read_manifest(archive, manifest=None):
+    """Parse the manifest upload, or ``manifest.csv`` at the root of the archive.
+
+    Returns a list of :class:`ManifestEntry` numbered from 1, raises
+    :class:`BatchError` if the manifest is missing, malformed or too long.
+    """
+    from_archive = manifest is None
+    if from_archive:
+        if MANIFEST_NAME not in archive.namelist():
+            raise BatchError(f"Send a manifest file or put {MANIFEST_NAME} in the archive")
+        manifest = archive.open(MANIFEST_NAME)
+
+    entries = []
+    try:
+        for number, raw in enumerate(iter_csv_rows(manifest), start=1):
+            if number == 1:
+                missing = [field for field in MANIFEST_FIELDS if field not in raw]
+                if missing:
+                    raise BatchError(f"Manifest is missing the {', '.join(missing)} column(s)")
+            if number > MAX_BATCH_ENTRIES:
+                raise BatchError(f"Manifest must have at most {MAX_BATCH_ENTRIES} rows")
+            entries.append(ManifestEntry(number, *(str(raw.get(field) or "").strip() for field in MANIFEST_FIELDS)))
+    except UnicodeDecodeError:
+        raise BatchError("Manifest must be a UTF-8 CSV file")
+    finally:
+        if from_archive:
+            manifest.close()
+    if not entries:
+        raise BatchError("Manifest has no rows")
+    return entries
+
+
+def check_entries(archive, entries):
+    """Split manifest rows into ``(accepted, rejected)``.
+
+    Every GR number is checked against ``Student`` in one query. ``accepted``
+    holds entries to process, ``rejected`` their per-row results.
+    """
+    members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+    gr_numbers = {entry.gr_no for entry in entries if entry.gr_no}
+    known = set()
+    if gr_numbers:
+        known = {gr_no for (gr_no,) in db.session.query(Student.gr_no).filter(Student.gr_no.in_(gr_numbers))}
+
+    accepted, rejected, seen = [], [], set()
+    for entry in entries:
+        reason = _entry_error(entry, members, known, seen)
+        if reason:
+            rejected.append(_result(entry, "rejected", reason=reason))
+        else:
+            seen.add(entry.gr_no)
+            accepted.append(entry)
+    return accepted, rejected
+
+
+def _entry_error(entry, members, known, seen):
+    missing = [field for field, value in zip(MANIFEST_FIELDS, entry[1:]) if not value]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if len(entry.status) > Placement.after_graduation.type.length:
+        return f"status must be at most {Placement.after_graduation.type.length} characters"
+    if entry.gr_no in seen:
+        return "Duplicate GR number in manifest"
+    if entry.gr_no not in known:
+        return "Student not found"
+    member = members.get(entry.filename)
+    if member is None:
+        return "File not found in archive"
+    if os.path.splitext(entry.filename)[1].lower() not in CONTENT_TYPES:
+        return "Only PDF and image files (JPG, JPEG, PNG) are allowed"
+    if member.flag_bits & 0x1:
+        return "Encrypted files are not supported"
+    if member.file_size > MAX_FILE_SIZE:
+        return f"Each file must be at most {MAX_FILE_SIZE // MB} MB"
+    return None
+
+
+def _result(entry, status, **fields):
+    return {"row": entry.row, "filename": entry.filename, "gr_no": entry.gr_no, "status": status, **fields}
+
+
+def create_batch(entries, rejected, created_by=None):
+    """Record a new batch with its rejected rows already counted, and commit it."""
+    batch = PlacementBatch(
+        id=uuid.uuid4().hex,
+        status="queued" if len(rejected) < len(entries) else "done",
+        total=len(entries),
+        processed=len(rejected),
+        succeeded=0,
+        failed=len(rejected),
+        results=json.dumps(rejected),
+        created_by=created_by,
+        updated_at=_now()
+    )
+    db.session.add(batch)
+    db.session.commit()
+    return batch
+
+
+def start_batch(batch_id, archive, stream, entries, save, done=None):
+    """Process ``entries`` in the background; the runner closes ``archive`` and ``stream``.
+
+    ``save(gr_no, status, file_url)`` adds or updates one placement row in
+    the session without committing. ``done()`` is called when the batch
+    has finished either way, e.g. to free the request's admission slot.
+    """
+    app = current_app._get_current_object()
+    return batch_executor.submit(_run, app, batch_id, archive, stream, entries, save, done)
+
+
+def _run(app, batch_id, archive, stream, entries, save, done=None):
+    with app.app_context():
+        try:
+            _update(batch_id, status="running")
+            for start in range(0, len(entries), PLACEMENT_BATCH_CHUNK):
+                _run_chunk(batch_id, archive, entries[start:start + PLACEMENT_BATCH_CHUNK], save)
+            _update(batch_id, status="done")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Placement batch %s failed", batch_id)
+            _update(batch_id, status="failed", error=str(e)[:500])
+        finally:
+            archive.close()
+            close_quietly(stream)
+            if done is not None:
+                done()
+
+
+def _update(batch_id, **fields):
+    batch = db.session.get(PlacementBatch, batch_id)
+    for name, value in fields.items():
+        setattr(batch, name, value)
+    batch.updated_at = _now()
+    db.session.commit()
+
+
+def _run_chunk(batch_id, archive, chunk, save):
+    results = []
+    files = []
+    spools = []
+    entries = {}
+    try:
+        for entry in chunk:
+            extension = os.path.splitext(entry.filename)[1].lower()
+            try:
+                spool = _extract(archive, entry.filename)
+            except Exception as e:
+                results.append(_result(entry, "rejected", reason=getattr(e, "description", None) or str(e)))
+                continue
+            spools.append(spool)
+            if not starts_with_magic(spool.read(16), extension):
+                results.append(_result(entry, "rejected", reason="File content does not match its extension"))
+                continue
+            spool.seek(0)
+            file_key = f"row {entry.row}"
+            entries[file_key] = entry
+            files.append((file_key, ArchiveFile(spool, entry.filename), extension, CONTENT_TYPES[extension]))
+
+        stored = {}
+        if files:
+            # Photos are recompressed all at once in the image pool, then stored on the storage executor
+            files, thumbnails = process_uploads(files)
+            try:
+                stored = content_store.store_many(files, thumbnails)
+            except StorageUploadError as e:
+                db.session.rollback()
+                results.extend(_result(entry, "failed", reason=str(e)) for entry in entries.values())
+
+        if stored:
+            # One query for the chunk's existing rows, save()'s lookups are then answered from the session
+            Placement.query.filter(Placement.gr_no.in_([entries[key].gr_no for key in stored])).all()
+            for file_key, stored_file in stored.items():
+                entry = entries[file_key]
+                save(entry.gr_no, entry.status, stored_file.url)
+                results.append(_result(entry, "saved", file_url=stored_file.url))
+
+        # The chunk's placements and its progress commit together
+        batch = db.session.get(PlacementBatch, batch_id)
+        saved = sum(result["status"] == "saved" for result in results)
+        batch.results = json.dumps(sorted(json.loads(batch.results) + results, key=lambda result: result["row"]))
+        batch.processed += len(results)
+        batch.succeeded += saved
+        batch.failed += len(results) - saved
+        batch.updated_at = _now()
+        db.session.commit()
+        if saved:
+            response_cache.invalidate("placements")
+    finally:
+        for spool in spools:
+            spool.close()
+
+
+def _extract(archive, name):
+    # Inflated to disk in bounded blocks, a member that lies about its size stops at MAX_FILE_SIZE
+    spool = BoundedSpool(MAX_FILE_SIZE)
+    try:
+        with archive.open(name) as member:
+            for block in iter(lambda: member.read(UPLOAD_BUFFER_SIZE), b""):
+                spool.write(block)
+        spool.flush()
+        spool.seek(0)
+        return spool
+    except Exception:
+        spool.close()
+        raise
+
+
+def batch_status(batch):
+    """JSON body for the batch's poll endpoint."""
+    status = batch.status
+    if status in ("queued", "running") and batch.updated_at is not None:
+        if (_now() - batch.updated_at).total_seconds() > PLACEMENT_BATCH_STALE_SECONDS:
+            # Its worker stopped mid-batch, rows committed so far are kept
+            status = "interrupted"
+    return {
+        "job_id": batch.id,
+        "status": status,
+        "total": batch.total,
+        "processed": batch.processed,
+        "succeeded": batch.succeeded,
+        "failed": batch.failed,
+        "error": batch.error,
+        "results": json.loads(batch.results),
+    }
@@ -0,0 +1,302 @@
+"""NBA Criterion 4 report tables and the CSV / XLSX writers that stream them.
+
+Every table is a header plus a row generator. Per-student tables are read
+through a server-side cursor and the writers flush a chunk as soon as it
+fills, so an export of any size holds one batch of rows and one chunk of
+output at a time.
+"""
+import csv
+import io
+import re
+import zipfile
+from collections import namedtuple
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+
+from .models import CriteriaYearStats, EnrollmentRatio, Placement, SemesterResult, Student
+from .performance import API_SEMESTER, SANCTIONED_INTAKE, compute_cohort_metrics, percentage
+from .serialization import STREAM_CHUNK_BYTES
+
+# Rows fetched per round trip from the server-side cursor
+REPORT_BATCH_SIZE = 1000
+
+Table = namedtuple("Table", "name title header rows")
+
+
+class Criteria4Report:
+    """The Criterion 4 tables for some (default all) academic years.
+
+    Nothing is queried until a table's ``rows()`` is iterated, which the
+    writers do one table after another.
+    """
+
+    def __init__(self, session, years=None, api_semester=API_SEMESTER):
+        self.session = session
+        self.years = years or None
+        self.api_semester = api_semester
+        self._metrics = None
+
+    def tables(self, names=None):
+        tables = [
+            Table("summary", "4 Summary", (
+                "academic_year", "sanctioned_intake", "admitted", "documents_submitted", "enrollment_ratio",
+                "placed", "higher_studies", "entrepreneur", "placement_index",
+            ), self._summary_rows),
+            Table("enrollment", "4.1 Enrollment ratio", (
+                "academic_year", "gr_no", "enroll_no", "name",
+                "registration_form_url", "marks10_url", "marks12_url", "gujcet_marksheet_url",
+            ), self._enrollment_rows),
+            Table("success_rate", "4.2 Success rate", (
+                "academic_year", "admitted", "graduated_without_backlog", "success_index_without_backlog",
+                "graduated_stipulated_period", "success_index_stipulated_period",
+            ), self._success_rate_rows),
+            Table("academic_performance", "4.3 Academic performance", (
+                "academic_year", "semester", "mean_cgpa", "successful", "appeared", "api",
+            ), self._performance_rows),
+            Table("placement", "4.4 Placement", (
+                "academic_year", "gr_no", "enroll_no", "name", "after_graduation", "doc_proof_url",
+            ), self._placement_rows),
+        ]
+        if names:
+            tables = [table for table in tables if table.name in names]
+        return tables
+
+    def _year_stats(self):
+        query = self.session.query(CriteriaYearStats)
+        if self.years:
+            query = query.filter(CriteriaYearStats.academic_year.in_(self.years))
+        return query.order_by(CriteriaYearStats.academic_year.desc()).all()
+
+    def _students(self, *columns):
+        query = self.session.query(Student.academic_year, Student.gr_no, Student.enroll_no, Student.name, *columns)
+        if self.years:
+            query = query.filter(Student.academic_year.in_(self.years))
+        return query
+
+    def _summary_rows(self):
+        for stats in self._year_stats():
+            yield (
+                stats.academic_year, SANCTIONED_INTAKE, stats.admitted, stats.documents_submitted,
+                percentage(stats.admitted, SANCTIONED_INTAKE),
+                stats.placed, stats.higher_studies, stats.entrepreneur,
+                percentage(stats.placed + stats.higher_studies + stats.entrepreneur, stats.admitted),
+            )
+
+    def _enrollment_rows(self):
+        query = self._students(
+            EnrollmentRatio.registration_form_url, EnrollmentRatio.marks10_url,
+            EnrollmentRatio.marks12_url, EnrollmentRatio.gujcet_marksheet_url,
+        ).outerjoin(EnrollmentRatio, EnrollmentRatio.gr_no == Student.gr_no)
+        yield from query.order_by(Student.academic_year.desc(), Student.gr_no).yield_per(REPORT_BATCH_SIZE)
+
+    def _placement_rows(self):
+        query = self._students(
+            Placement.after_graduation, Placement.doc_proof_url
+        ).outerjoin(Placement, Placement.gr_no == Student.gr_no)
+        yield from query.order_by(Student.academic_year.desc(), Student.gr_no).yield_per(REPORT_BATCH_SIZE)
+
+    def _cohort_metrics(self):
+        # 4.2 and 4.3 come from the same figures; computed a cohort at a time so only one
+        # cohort's results are in memory, and kept (a few numbers per year) for the second table
+        if self._metrics is None:
+            self._metrics = []
+            for stats in self._year_stats():
+                rows = self.session.query(
+                    Student.academic_year, SemesterResult.gr_no, SemesterResult.semester,
+                    SemesterResult.cgpa, SemesterResult.backlogs, SemesterResult.appeared
+                ).join(Student, Student.gr_no == SemesterResult.gr_no).filter(
+                    Student.academic_year == stats.academic_year
+                ).all()
+                self._metrics.extend(compute_cohort_metrics(
+                    [stats.academic_year], [stats.admitted], rows, api_semester=self.api_semester
+                ))
+        return self._metrics
+
+    def _success_rate_rows(self):
+        for metrics in self._cohort_metrics():
+            success = metrics["success_rate"]
+            yield (
+                metrics["academic_year"], metrics["admitted"],
+                success["without_backlog"]["graduated"], success["without_backlog"]["index"],
+                success["stipulated_period"]["graduated"], success["stipulated_period"]["index"],
+            )
+
+    def _performance_rows(self):
+        for metrics in self._cohort_metrics():
+            performance = metrics["academic_performance"]
+            yield (
+                metrics["academic_year"], performance["semester"], performance["mean_cgpa"],
+                performance["successful"], performance["appeared"], performance["api"],
+            )
+
+
+# 🔹 CSV
+
+class _TextBuffer:
+    """Write target for ``csv.writer`` that hands back what was written so far."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+    def drain(self):
+        data = "".join(self.parts).encode()
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def stream_csv(tables, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yield ``tables`` as one CSV document in chunks.
+
+    With more than one table each starts with its title on a row of its own
+    and tables are separated by a blank line.
+    """
+    buffer = _TextBuffer()
+    buffer.write("\ufeff")  # BOM, so Excel reads the file as UTF-8
+    writer = csv.writer(buffer)
+    for number, table in enumerate(tables):
+        if len(tables) > 1:
+            if number:
+                writer.writerow(())
+            writer.writerow((table.title,))
+        writer.writerow(table.header)
+        for row in table.rows():
+            writer.writerow(row)
+            if buffer.size >= chunk_bytes:
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+# 🔹 XLSX
+# Written by hand rather than with openpyxl, whose writer only produces the file once
+# the whole workbook is done. Sheets use inline strings (no shared string table to
+# hold in memory) and the ZIP is written to a non-seekable sink, which makes zipfile
+# put each entry's sizes after its data so nothing has to be rewritten.
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{number}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_SHEET = '<sheet name={name} sheetId="{number}" r:id="rId{number}"/>'
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}</Relationships>'
+)
+_WORKBOOK_REL = (
+    '<Relationship Id="rId{number}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{number}.xml"/>'
+)
+# Header row frozen so it stays visible while scrolling
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+# Control characters are not allowed in XML 1.0, not even escaped
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_SHEET_NAME_ILLEGAL = re.compile(r"[\[\]:*?/\\]")
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value!r}</v></c>"
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+class _ByteSink:
+    """Non-seekable write target for ``zipfile`` that hands back what was written."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def stream_xlsx(tables, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yield ``tables`` as an XLSX workbook, one sheet per table, in chunks."""
+    numbers = range(1, len(tables) + 1)
+    sink = _ByteSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as workbook:
+        workbook.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_SHEET_CONTENT_TYPE.format(number=number) for number in numbers)
+        ))
+        workbook.writestr("_rels/.rels", _ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            _WORKBOOK_SHEET.format(name=quoteattr(_SHEET_NAME_ILLEGAL.sub(" ", table.title)[:31]), number=number)
+            for number, table in zip(numbers, tables)
+        )))
+        workbook.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+            sheets="".join(_WORKBOOK_REL.format(number=number) for number in numbers)
+        ))
+        yield sink.drain()  # The download starts before the first query runs
+
+        for number, table in zip(numbers, tables):
+            with workbook.open(f"xl/worksheets/sheet{number}.xml", "w") as sheet:
+                # Rows are handed to the compressor a few KB at a time rather than one by one
+                pending = io.StringIO()
+                pending.write(_SHEET_HEAD)
+                for values in chain((table.header,), table.rows()):
+                    pending.write(_xlsx_row(values))
+                    if pending.tell() >= 16 * 1024:
+                        sheet.write(pending.getvalue().encode())
+                        pending = io.StringIO()
+                        if sink.size >= chunk_bytes:
+                            yield sink.drain()
+                pending.write(_SHEET_TAIL)
+                sheet.write(pending.getvalue().encode())
+    yield sink.drain()
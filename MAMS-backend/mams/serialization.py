@@ -0,0 +1,72 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard library encoder is the fallback
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+# Streamed arrays are flushed to the client in pieces of about this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
+if orjson is not None:
+    # Let Flask's default() format dates and dataclasses so output matches the json fallback
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def dumps(obj, sort_keys=False):
+    """Serialize ``obj`` to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option)
+        except TypeError:
+            pass  # e.g. non-string dict keys, which the json module converts
+    return json.dumps(
+        obj, default=DefaultJSONProvider.default, separators=(",", ":"), sort_keys=sort_keys
+    ).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """``jsonify`` and ``app.json`` through :func:`dumps`.
+
+    Pretty-printed output (debug mode) still goes through the json module.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {"separators"} or kwargs.get("separators", (",", ":")) != (",", ":"):
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.sort_keys).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.sort_keys) + b"\n", mimetype=self.mimetype)
+
+
+def stream_json_array(items, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yield a JSON array of ``items`` in chunks, never holding more than one chunk."""
+    parts = [b"["]
+    size = 1
+    separator = b""
+    for item in items:
+        encoded = dumps(item)
+        parts.append(separator)
+        parts.append(encoded)
+        separator = b","
+        size += len(encoded) + 1
+        if size >= chunk_bytes:
+            yield b"".join(parts)
+            parts = []
+            size = 0
+    parts.append(b"]\n")
+    yield b"".join(parts)
@@ -0,0 +1,49 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("mams.startup")
+
+
+class StartupReport:
+    """Wall time spent on each step of building the app.
+
+    Steps that import modules include the cost of everything those modules
+    pull in, so the report doubles as an import-time breakdown. For a
+    per-module view run ``python -X importtime -c "import app"``.
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, name, seconds):
+        self.steps.append((name, seconds))
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.steps)
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "steps": [{"name": name, "ms": round(seconds * 1000, 1)} for name, seconds in self.steps],
+        }
+
+    def format(self):
+        width = max((len(name) for name, _ in self.steps), default=0)
+        lines = [f"{name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in self.steps]
+        lines.append(f"{'total':<{width}}  {self.total * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def log(self):
+        logger.info("App ready in %.0f ms: %s", self.total * 1000, ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.steps
+        ))
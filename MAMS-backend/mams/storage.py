@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .content_store import ContentStore
+from .extensions import db
+from .jobs import OutboxQueue
+from .metrics import InstrumentedBackend
+from .models import StorageJob, StoredObject
+from .storage_backends import create_storage_backend
+
+# 🔹 Storage (Supabase or local filesystem, see storage_backends.py)
+# Bounded pool shared by all requests so a burst of uploads can't spawn unbounded threads.
+# Threads are only started on first submit, so this is safe to build before a fork.
+# Under WORKER_MODE=gevent the threads are greenlets, so far more uploads can wait at once.
+storage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STORAGE_WORKERS", "64" if os.getenv("WORKER_MODE") == "gevent" else "8")),
+    thread_name_prefix="storage"
+)
+
+# The Supabase client itself is only created by the first storage call
+storage_backend = create_storage_backend()
+# Every storage call goes through this wrapper so it shows up in /api/metrics
+storage = InstrumentedBackend(storage_backend)
+
+job_queue = OutboxQueue(db, StorageJob)
+content_store = ContentStore(db, StoredObject, storage, job_queue, storage_executor)
+
+
+def _delete_objects(payload):
+    storage.remove(payload["paths"])
+
+
+STORAGE_JOB_HANDLERS = {
+    "delete_objects": _delete_objects,
+    "gc_object": content_store.collect,
+    "verify_object": content_store.verify,
+}
@@ -0,0 +1,203 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+STORAGE_BUCKET = "documents"
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class SupabaseStorage:
+    """Objects in a Supabase Storage bucket."""
+
+    def __init__(self, url, key, bucket=STORAGE_BUCKET):
+        self.url = url
+        self.key = key
+        self.bucket = bucket
+        self._client = None
+        self._bucket_ready = False
+        self._lock = threading.Lock()
+
+    def _bucket(self):
+        # Client and bucket check are set up once per process, on first use
+        if not self._bucket_ready:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(self.url, self.key)
+                if not self._bucket_ready:
+                    try:
+                        self._client.storage.get_bucket(self.bucket)
+                    except Exception:
+                        try:
+                            self._client.storage.create_bucket(self.bucket)
+                        except Exception:
+                            pass  # Created concurrently by another worker
+                    self._bucket_ready = True
+        return self._client.storage.from_(self.bucket)
+
+    def upload(self, path, content, content_type, upsert=False):
+        self._bucket().upload(path, content, {
+            "content-type": content_type,
+            "cache-control": "3600",
+            "upsert": "true" if upsert else "false"
+        })
+
+    def remove(self, paths):
+        self._bucket().remove(list(paths))
+
+    def exists(self, path):
+        return self._bucket().exists(path)
+
+    def size(self, path):
+        folder, _, name = path.rpartition("/")
+        for entry in self._bucket().list(folder, {"search": name}):
+            if entry.get("name") == name:
+                return (entry.get("metadata") or {}).get("size")
+        return None
+
+    def download(self, path):
+        return self._bucket().download(path)
+
+    def create_signed_upload_url(self, path, content_type):
+        # Supabase fixes the lifetime (2 hours) and refuses to overwrite an existing object
+        signed = self._bucket().create_signed_upload_url(path)
+        return {"url": signed["signed_url"], "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    def public_url(self, path):
+        # Public URLs are deterministic, no need for a round trip to build them
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    def path_from_url(self, url):
+        prefix = self.public_url("")
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+
+class LocalStorage:
+    """Objects as plain files under a directory, for development and tests."""
+
+    def __init__(self, root, base_url):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def full_path(self, path):
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage path: {path}")
+        return full
+
+    def upload(self, path, content, content_type, upsert=False):
+        full = self.full_path(path)
+        if not upsert and os.path.exists(full):
+            raise FileExistsError(f"Object already exists: {path}")
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        # Write next to the target and rename, readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(full))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if isinstance(content, bytes):
+                    out.write(content)
+                else:
+                    shutil.copyfileobj(content, out, COPY_BUFFER_SIZE)
+            os.replace(tmp, full)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def remove(self, paths):
+        for path in paths:
+            try:
+                os.unlink(self.full_path(path))
+            except FileNotFoundError:
+                pass
+
+    def exists(self, path):
+        return os.path.isfile(self.full_path(path))
+
+    def size(self, path):
+        try:
+            return os.path.getsize(self.full_path(path))
+        except FileNotFoundError:
+            return None
+
+    def download(self, path):
+        with open(self.full_path(path), "rb") as f:
+            return f.read()
+
+    def public_url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def path_from_url(self, url):
+        prefix = self.base_url + "/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+
+class MemoryStorage:
+    """Objects kept in a dict, an in-process stand-in for Supabase in benchmarks.
+
+    ``latency`` (seconds) is slept on every call that would be a network
+    round trip, so request timings stay roughly realistic.
+    """
+
+    def __init__(self, base_url="http://storage.invalid", latency=0.0):
+        self.base_url = base_url.rstrip("/")
+        self.latency = latency
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def upload(self, path, content, content_type, upsert=False):
+        data = content if isinstance(content, bytes) else content.read()
+        self._round_trip()
+        with self._lock:
+            if not upsert and path in self.objects:
+                raise FileExistsError(f"Object already exists: {path}")
+            self.objects[path] = (data, content_type)
+
+    def remove(self, paths):
+        self._round_trip()
+        with self._lock:
+            for path in paths:
+                self.objects.pop(path, None)
+
+    def exists(self, path):
+        self._round_trip()
+        return path in self.objects
+
+    def size(self, path):
+        self._round_trip()
+        entry = self.objects.get(path)
+        return len(entry[0]) if entry else None
+
+    def download(self, path):
+        self._round_trip()
+        entry = self.objects.get(path)
+        if entry is None:
+            raise FileNotFoundError(f"Object not found: {path}")
+        return entry[0]
+
+    def public_url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def path_from_url(self, url):
+        prefix = self.base_url + "/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+
+def create_storage_backend():
+    """Pick the backend from ``STORAGE_BACKEND`` (``supabase``, ``local`` or ``memory``)."""
+    backend = os.getenv("STORAGE_BACKEND", "supabase")
+    if backend == "memory":
+        return MemoryStorage(latency=float(os.getenv("MEMORY_STORAGE_LATENCY_MS", "0")) / 1000)
+    if backend == "local":
+        return LocalStorage(
+            os.getenv("LOCAL_STORAGE_ROOT", "local_storage"),
+            os.getenv("LOCAL_STORAGE_URL", "http://localhost:5000/storage")
+        )
+    return SupabaseStorage(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
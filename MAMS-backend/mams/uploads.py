@@ -0,0 +1,129 @@
+import os
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+MB = 1024 * 1024
+
+# Limits for file uploads, configurable per deployment
+MAX_FILE_SIZE = int(os.getenv("MAX_UPLOAD_FILE_MB", "10")) * MB
+MAX_REQUEST_SIZE = int(os.getenv("MAX_UPLOAD_REQUEST_MB", "40")) * MB
+
+# Per-endpoint overrides of MAX_FILE_SIZE, e.g. for spreadsheet imports
+file_size_limits = {}
+
+# Size of each read/write when moving upload bytes around
+UPLOAD_BUFFER_SIZE = 64 * 1024
+
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+# Leading bytes of every file type we accept
+MAGIC_NUMBERS = {
+    ".pdf": (b"%PDF-",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+}
+
+
+class BoundedSpool:
+    """Disk-backed file that refuses to grow past ``limit`` bytes.
+
+    Werkzeug writes each multipart file part into this in small chunks, so an
+    oversized file is rejected as soon as it crosses the limit instead of after
+    it has been fully received.
+    """
+
+    def __init__(self, limit):
+        self._file = tempfile.NamedTemporaryFile(prefix="upload-", dir=UPLOAD_TMP_DIR)
+        self.limit = limit
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge(f"Each file must be at most {self.limit // MB} MB")
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Request class that spools uploaded files to disk rather than memory.
+
+    The body is capped at ``MAX_CONTENT_LENGTH`` (``MAX_REQUEST_SIZE``) as it
+    is read, so a chunked body without a ``Content-Length`` is bounded too.
+    Endpoints with a larger per-file limit get that limit plus room for the
+    rest of the form.
+    """
+
+    @property
+    def max_content_length(self):
+        limit = file_size_limits.get(self.endpoint)
+        if limit is not None:
+            return limit + MAX_REQUEST_SIZE
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        limit = file_size_limits.get(self.endpoint, MAX_FILE_SIZE)
+        if content_length is not None and content_length > limit:
+            raise RequestEntityTooLarge(f"Each file must be at most {limit // MB} MB")
+        return BoundedSpool(limit)
+
+
+def spool_body(stream, limit):
+    """Copy a request body to a :class:`BoundedSpool`, rewound, for readers that need to seek."""
+    spool = BoundedSpool(limit)
+    try:
+        for block in iter(lambda: stream.read(UPLOAD_BUFFER_SIZE), b""):
+            spool.write(block)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def check_request_size(request):
+    """Reject a request early from its ``Content-Length`` header."""
+    if request.content_length is not None and request.content_length > MAX_REQUEST_SIZE:
+        raise RequestEntityTooLarge(f"Upload must be at most {MAX_REQUEST_SIZE // MB} MB in total")
+
+
+def starts_with_magic(head, extension):
+    return any(head.startswith(magic) for magic in MAGIC_NUMBERS.get(extension.lower(), ()))
+
+
+def matches_extension(file, extension):
+    """Check the file's leading bytes against what its extension claims."""
+    stream = file.stream
+    stream.seek(0)
+    head = stream.read(16)
+    stream.seek(0)
+    return starts_with_magic(head, extension)
+
+
+def open_for_upload(file):
+    """Return something the storage client can stream from.
+
+    Spooled uploads are reopened by name so the client reads them from disk in
+    chunks. Anything else (e.g. files built in memory by a test client) is
+    already small and is returned as bytes.
+    """
+    stream = file.stream
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.exists(name):
+        stream.flush()
+        return open(name, "rb", buffering=UPLOAD_BUFFER_SIZE)
+    stream.seek(0)
+    return stream.read()
+
+
+def close_quietly(content):
+    if hasattr(content, "close"):
+        try:
+            content.close()
+        except OSError:
+            pass
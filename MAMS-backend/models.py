@@ -1,14 +0,0 @@
-from db import db
-from flask_bcrypt import generate_password_hash, check_password_hash
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(255), nullable=False)
-
-    def __init__(self, email, password):
-        self.email = email
-        self.password = generate_password_hash(password).decode('utf-8')
-
-    def check_password(self, password):
-        return check_password_hash(self.password, password)
@@ -1,38 +0,0 @@
-from flask import Blueprint, request, jsonify
-from db import db
-from models import User
-from flask_jwt_extended import create_access_token
-from flask_bcrypt import Bcrypt
-
-bcrypt = Bcrypt()
-
-auth = Blueprint("auth", __name__)
-
-@auth.route("/register", methods=["POST"])
-def register():
-    data = request.get_json()
-    email = data.get("email")
-    password = data.get("password")
-
-    if User.query.filter_by(email=email).first():
-        return jsonify({"message": "User already exists"}), 400
-
-    new_user = User(email=email, password=password)
-    db.session.add(new_user)
-    db.session.commit()
-
-    return jsonify({"message": "User registered successfully"}), 201
-
-@auth.route("/login", methods=["POST"])
-def login():
-    data = request.get_json()
-    email = data.get("email")
-    password = data.get("password")
-
-    user = User.query.filter_by(email=email).first()
-
-    if user and user.check_password(password):
-        access_token = create_access_token(identity=user.email)
-        return jsonify({"message": "Login successful", "token": access_token}), 200
-    else:
-        return jsonify({"message": "Invalid credentials"}), 401
@@ -0,0 +1,54 @@
+"""Shared fixtures: an app on a scratch database.
+
+The database tests run on SQLite, and on PostgreSQL as well when
+``TEST_DATABASE_URL`` points at a scratch database.
+"""
+import os
+
+import pytest
+
+# Storage is built on import, keep every test off Supabase
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from mams import create_app  # noqa: E402
+from mams.cache import MemoryBackend  # noqa: E402
+from mams.extensions import db, response_cache  # noqa: E402
+
+SECRET_KEY = "test-secret-key-that-is-32-bytes"
+
+
+def _database_urls():
+    yield pytest.param("sqlite", id="sqlite")
+    url = os.getenv("TEST_DATABASE_URL")
+    yield pytest.param(url, id="postgresql", marks=pytest.mark.skipif(not url, reason="TEST_DATABASE_URL not set"))
+
+
+@pytest.fixture(params=list(_database_urls()))
+def app(request, tmp_path, monkeypatch):
+    # The cache is module level, a fresh one per test so no entry outlives its database
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend())
+    url = request.param
+    if url == "sqlite":
+        url = f"sqlite:///{tmp_path / 'test.db'}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": url, "SECRET_KEY": SECRET_KEY})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def storage_backend(app):
+    """The app's in-memory storage, emptied for the test."""
+    from mams.storage import storage_backend
+
+    storage_backend.objects.clear()
+    return storage_backend
@@ -0,0 +1,97 @@
+"""Admission control: per-user shares, the bounded queue, reclaiming a dead worker's slots."""
+import multiprocessing
+import os
+
+import pytest
+
+from mams import create_app
+from mams.admission import AdmissionRejected, Limiter, _user
+
+fork = multiprocessing.get_context("fork")
+
+
+def _rejection(limiter, user):
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire(user)
+    return rejected.value.status, rejected.value.reason
+
+
+def test_user_over_their_share_gets_429():
+    limiter = Limiter("test", limit=3, per_user=1)
+    limiter.acquire("a@example.com")
+    assert _rejection(limiter, "a@example.com") == (429, "user_share")
+    limiter.acquire("b@example.com")
+
+
+def test_full_route_gets_503():
+    limiter = Limiter("test", limit=1, queue=1, wait=0.05)
+    ticket = limiter.acquire("a")
+    assert _rejection(limiter, "b") == (503, "wait_timeout")
+    assert limiter.waiting == 0
+
+    limiter.queue = 0
+    assert _rejection(limiter, "b") == (503, "queue_full")
+
+    limiter.release(ticket)
+    limiter.acquire("b")
+
+
+def _in_child(target):
+    # Runs `target` in a forked worker that dies without cleaning up, returns its pid
+    def die_after():
+        target()
+        os._exit(0)
+
+    child = fork.Process(target=die_after)
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    return child.pid
+
+
+def test_reclaim_frees_the_slots_of_a_dead_worker():
+    limiter = Limiter("test", limit=3, per_user=2)
+    limiter.acquire("a")
+    pid = _in_child(lambda: (limiter.acquire("b"), limiter.acquire("b")))
+    assert limiter.running == 3
+
+    assert limiter.reclaim(pid) == 2
+    assert limiter.running == 1
+    limiter.acquire("b")
+
+
+def test_reclaim_gives_back_a_lock_held_by_a_dead_worker():
+    limiter = Limiter("test", limit=1)
+    pid = _in_child(limiter._lock.acquire)
+
+    assert _rejection(limiter, "a") == (503, "lock_timeout")
+    assert limiter.reclaim(pid) == 0
+    limiter.acquire("a")
+
+
+@pytest.fixture
+def user_of_request():
+    def build(**config):
+        app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "SECRET_KEY": "test", **config})
+        app.add_url_rule("/user", "user", lambda: {"user": _user()})
+        client = app.test_client()
+
+        def user(remote_addr, forwarded_for=None):
+            headers = {"X-Forwarded-For": forwarded_for} if forwarded_for else {}
+            return client.get("/user", headers=headers, environ_base={"REMOTE_ADDR": remote_addr}).json["user"]
+        return user
+    return build
+
+
+def test_anonymous_users_are_keyed_on_the_peer_address(user_of_request):
+    user = user_of_request()
+    assert user("10.0.0.1") == "10.0.0.1"
+    # A client can't pick its own slot by sending the header
+    assert user("10.0.0.1", "1.2.3.4") == "10.0.0.1"
+
+
+def test_trusted_proxy_hops_come_from_config(user_of_request):
+    user = user_of_request(PROXY_FIX_X_FOR=1)
+    # One proxy: the address it appended is used, whatever the client put before it
+    assert user("10.0.0.1", "6.6.6.6, 1.2.3.4") == "1.2.3.4"
+    assert user("10.0.0.1") == "10.0.0.1"
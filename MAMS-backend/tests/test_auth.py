@@ -0,0 +1,70 @@
+"""Token cache: a verified JWT is only decoded again once it leaves the cache."""
+import time
+
+import jwt
+import pytest
+from flask import current_app
+
+from mams import auth
+from mams.auth import TokenCache, decode_token
+
+
+@pytest.fixture
+def decodes(app, monkeypatch):
+    monkeypatch.setattr(auth, "token_cache", TokenCache(max_entries=2))
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+    with app.test_request_context():
+        yield calls
+
+
+def _token(email, expires_in=60, secret=None):
+    payload = {"email": email, "exp": int(time.time()) + expires_in}
+    return jwt.encode(payload, secret or current_app.config["SECRET_KEY"], algorithm="HS256")
+
+
+def test_second_decode_is_a_cache_hit(decodes):
+    token = _token("a@example.com")
+    assert decode_token(token)["email"] == "a@example.com"
+    assert decode_token(token)["email"] == "a@example.com"
+    assert decodes == [token]
+
+
+def test_other_tokens_miss(decodes):
+    first, second = _token("a@example.com"), _token("b@example.com")
+    decode_token(first)
+    assert decode_token(second)["email"] == "b@example.com"
+    assert decodes == [first, second]
+
+
+def test_least_recently_used_token_is_evicted(decodes):
+    tokens = [_token(f"{n}@example.com") for n in range(3)]
+    for token in tokens:
+        decode_token(token)
+    decode_token(tokens[2])
+    decode_token(tokens[0])
+    assert decodes == tokens + [tokens[0]]
+
+
+def test_expired_entry_is_verified_again(decodes, monkeypatch):
+    token = _token("a@example.com", expires_in=5)
+    decode_token(token)
+    now = time.time()
+    # Only the cache's clock moves on, jwt still accepts the token
+    monkeypatch.setattr(auth.time, "time", lambda: now + 10)
+    decode_token(token)
+    assert decodes == [token, token]
+
+
+def test_invalid_tokens_are_never_cached(decodes, client):
+    forged = _token("a@example.com", secret="a-different-key-also-of-32-bytes")
+    for _ in range(2):
+        response = client.get("/api/students/all", headers={"Authorization": f"Bearer {forged}"})
+        assert response.status_code == 401
+    assert decodes == [forged, forged]
@@ -0,0 +1,96 @@
+"""Benchmark suite: reproducible seed data, scenarios the app answers, report comparison."""
+import json
+
+import pytest
+import sqlalchemy as sa
+from werkzeug.security import generate_password_hash
+
+from bench import compare
+from bench.run import BENCH_PASSWORD, SCENARIOS, Context, _login, percentile
+from bench.seed import seed
+from mams import models
+from mams.extensions import db
+
+STUDENTS = 50
+
+
+def _tables():
+    # Everything but the timestamps the rows get on insert
+    return {
+        table.name: db.session.execute(sa.select(
+            *(column for column in table.columns if not isinstance(column.type, sa.DateTime))
+        ).order_by(*table.primary_key.columns)).all()
+        for table in db.metadata.sorted_tables
+    }
+
+
+def test_seed_is_reproducible(app):
+    pending = seed(models, STUDENTS, semesters=2)
+    tables = _tables()
+    assert seed(models, STUDENTS, semesters=2) == pending
+    assert _tables() == tables
+
+    assert len(tables["student"]) == STUDENTS
+    assert len(tables["semester_result"]) == STUDENTS * 2
+    # The counters are rebuilt after the Core inserts
+    assert sum(stats.admitted for stats in db.session.query(models.CriteriaYearStats)) == STUDENTS
+
+
+def _send(client, method, path, body, headers):
+    with client.open(path, method=method, data=body, headers=headers) as response:
+        return response.status_code, response.get_data()
+
+
+@pytest.fixture
+def bench_context(app, client):
+    ctx = Context(models, STUDENTS, seed(models, STUDENTS), upload_kb=1)
+    # The account bench.run registers, with a cheap hash: logging in is what it's for
+    db.session.add(models.User(
+        email=f"bench-{ctx.run_id}@example.com", password=generate_password_hash(BENCH_PASSWORD, "pbkdf2:sha256:1")
+    ))
+    db.session.commit()
+    status, body = _send(client, *_login(ctx, 0))
+    assert status == 200
+    ctx.token = json.loads(body)["token"]
+    ctx.storm_tokens = [ctx.token]
+    return ctx
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda scenario: scenario.name)
+def test_scenario_is_answered(client, bench_context, scenario):
+    if scenario.prepare:
+        scenario.prepare(bench_context)
+    method, path, body, headers = scenario.request(bench_context, 1)
+    assert (method, path.split("?")[0]) == (scenario.method, scenario.path.split("?")[0])
+    status, response_body = _send(client, method, path, body, headers)
+    assert 200 <= status < 300, response_body[:200]
+    if scenario.background:
+        status, response_body = _send(client, *scenario.background(bench_context, 1))
+        assert 200 <= status < 300, response_body[:200]
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, point) for point in (50, 95, 99)] == [51, 96, 100]
+    assert percentile([], 50) is None
+
+
+def _report(path, throughput, p95, errors=0):
+    path.write_text(json.dumps({"meta": {"commit": "abc"}, "results": [{
+        "students": 1000, "route": "students_all", "concurrency": 8, "errors": errors,
+        "throughput_rps": throughput, "latency_ms": {"p95": p95},
+    }]}))
+    return str(path)
+
+
+@pytest.mark.parametrize("after, regressed", [
+    ((100, 10), False),
+    ((95, 10.5), False),
+    ((80, 10), True),
+    ((100, 12), True),
+    ((100, 10, 1), True),
+])
+def test_compare_flags_regressions(tmp_path, capsys, after, regressed):
+    before = _report(tmp_path / "before.json", 100, 10)
+    assert compare.main([before, _report(tmp_path / "after.json", *after)]) == int(regressed)
+    assert ("REGRESSION" in capsys.readouterr().out) == regressed
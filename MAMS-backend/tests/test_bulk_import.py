@@ -0,0 +1,83 @@
+"""Bulk student import: concurrent conflicts and raw request bodies.
+
+The PostgreSQL runs (see conftest.py) exercise the COPY path.
+"""
+import io
+import json
+
+import openpyxl
+import sqlalchemy as sa
+
+from mams.api import students
+from mams.bulk_import import iter_rows, readable_stream
+from mams.extensions import db
+from mams.models import Student
+
+CSV = (
+    "gr_no,name,enroll_no,academic_year\n"
+    "GR1,One,EN1,2024-25\n"
+    "GR2,Two,EN2,2024-25\n"
+    "GR3,Three,EN3,2024-25\n"
+    "GR4,Four,EN4,2024-25\n"
+)
+
+
+def _post(client, body, content_type="text/csv"):
+    response = client.post("/api/students/bulk?chunk_size=2", data=body, content_type=content_type)
+    try:
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        response.close()
+
+
+def test_concurrent_conflict_rejects_only_its_chunk(app, monkeypatch):
+    insert_students = students._insert_students
+
+    def racing_insert(rows):
+        # A second writer commits GR1 after the chunk's lookup found it free
+        if rows[0]["gr_no"] == "GR1":
+            with db.engine.begin() as other:
+                other.execute(Student.__table__.insert(), {
+                    "gr_no": "GR1", "name": "Other", "enroll_no": "EN-other", "academic_year": "2024-25"
+                })
+        insert_students(rows)
+
+    monkeypatch.setattr(students, "_insert_students", racing_insert)
+    report = _post(app.test_client(), CSV)
+
+    assert [entry.get("status") for entry in report[:4]] == ["rejected", "rejected", "accepted", "accepted"]
+    assert report[0]["reason"] == "Conflicting student was added concurrently, retry this row"
+    assert report[-1] == {"summary": {"accepted": 2, "rejected": 2}}
+    assert not any("error" in entry for entry in report)
+    gr_numbers = db.session.execute(sa.select(Student.gr_no).order_by(Student.gr_no)).scalars().all()
+    assert gr_numbers == ["GR1", "GR3", "GR4"]
+
+
+class _ReadOnlyBody:
+    # Like gunicorn's request body: read() but no readable()
+    def __init__(self, data):
+        self._data = data
+
+    def read(self, size=-1):
+        if size < 0:
+            size = len(self._data)
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+
+def test_csv_rows_from_a_read_only_body():
+    rows = list(iter_rows(readable_stream(_ReadOnlyBody(CSV.encode())), "csv"))
+    assert [row["gr_no"] for row in rows] == ["GR1", "GR2", "GR3", "GR4"]
+
+
+def test_xlsx_raw_body(client):
+    workbook = openpyxl.Workbook()
+    for line in CSV.splitlines():
+        workbook.active.append(line.split(","))
+    body = io.BytesIO()
+    workbook.save(body)
+
+    report = _post(client, body.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    assert report[-1] == {"summary": {"accepted": 4, "rejected": 0}}
+    assert db.session.execute(sa.select(sa.func.count()).select_from(Student)).scalar() == 4
@@ -0,0 +1,98 @@
+"""Content-addressed storage: deduplication, reference counts and garbage collection."""
+import datetime
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from mams import jobs
+from mams.content_store import ContentStore
+from mams.extensions import db
+from mams.models import StoredObject
+from mams.storage import job_queue
+from mams.storage_backends import MemoryStorage
+
+PDF = b"%PDF-1.4 proof"
+
+
+@pytest.fixture
+def backend():
+    return MemoryStorage()
+
+
+@pytest.fixture
+def store(app, backend):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield ContentStore(db, StoredObject, backend, job_queue, executor)
+
+
+def _store(store, data=PDF, file_key="proof"):
+    file = FileStorage(stream=io.BytesIO(data), filename="proof.pdf")
+    stored = store.store_many([(file_key, file, ".pdf", "application/pdf")])[file_key]
+    db.session.commit()
+    return stored
+
+
+def _collect(store, hours=0):
+    # Runs the due gc_object jobs, `hours` from now
+    later = jobs._now() + datetime.timedelta(hours=hours)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(jobs, "_now", lambda: later)
+        while job_queue.run_once({"gc_object": store.collect}):
+            pass
+
+
+def test_identical_bytes_are_stored_once(store, backend):
+    first = _store(store)
+    second = _store(store)
+
+    assert not first.deduplicated and second.deduplicated
+    assert first.path == second.path == ContentStore.object_path(first.sha256, ".pdf")
+    assert db.session.get(StoredObject, first.sha256).ref_count == 2
+    assert list(backend.objects) == [first.path]
+
+    other = _store(store, PDF + b" other")
+    assert not other.deduplicated
+    assert len(backend.objects) == 2
+
+
+def test_object_is_collected_after_its_last_reference(store, backend):
+    stored = _store(store)
+    _store(store)
+    _collect(store, hours=1)  # Only the orphan guard, the object is referenced
+
+    store.release(stored.url)
+    db.session.commit()
+    _collect(store)
+    assert db.session.get(StoredObject, stored.sha256).ref_count == 1
+    assert stored.path in backend.objects
+
+    store.release(stored.url)
+    db.session.commit()
+    _collect(store)
+    assert db.session.get(StoredObject, stored.sha256) is None
+    assert backend.objects == {}
+
+
+def test_gc_skips_an_object_referenced_again(store, backend):
+    stored = _store(store)
+    store.release(stored.url)
+    db.session.commit()
+    _store(store)  # Same bytes again before the worker got to the gc job
+
+    _collect(store)
+    assert db.session.get(StoredObject, stored.sha256).ref_count == 1
+    assert stored.path in backend.objects
+
+
+def test_upload_whose_row_never_commits_is_collected(store, backend):
+    file = FileStorage(stream=io.BytesIO(PDF), filename="proof.pdf")
+    stored = store.store_many([("proof", file, ".pdf", "application/pdf")])["proof"]
+    db.session.rollback()  # The caller's row change failed
+    assert stored.path in backend.objects
+
+    _collect(store)
+    assert stored.path in backend.objects  # Still within the grace period
+    _collect(store, hours=1)
+    assert backend.objects == {}
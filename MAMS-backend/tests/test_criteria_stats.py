@@ -0,0 +1,88 @@
+"""Criterion 4 counters: kept on every write, equal to a rebuild from the source tables."""
+import pytest
+
+from mams.extensions import db
+from mams.models import CriteriaYearStats, EnrollmentRatio, Placement, Student, rebuild_criteria_stats
+
+
+def _counters():
+    # A year whose counters all went back to zero has a row here but none after a rebuild
+    rows = db.session.query(CriteriaYearStats).all()
+    counters = {
+        row.academic_year: (row.admitted, row.documents_submitted, row.placed, row.higher_studies, row.entrepreneur)
+        for row in rows
+    }
+    return {year: counts for year, counts in counters.items() if any(counts)}
+
+
+def _assert_rebuild_matches():
+    db.session.commit()
+    kept = _counters()
+    rebuild_criteria_stats()
+    assert _counters() == kept
+
+
+def _student(gr_no, academic_year="2023-24"):
+    return Student(gr_no=gr_no, name=f"Student {gr_no}", enroll_no=f"EN{gr_no}", academic_year=academic_year)
+
+
+def _placement(gr_no, status="placement"):
+    return Placement(gr_no=gr_no, after_graduation=status, doc_proof_url=f"https://example.com/{gr_no}.pdf")
+
+
+def _documents(gr_no):
+    return EnrollmentRatio(
+        gr_no=gr_no, registration_form_url="r", marks10_url="10", marks12_url="12", gujcet_marksheet_url="g"
+    )
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all(_student(f"GR{n}") for n in range(1, 7))
+    db.session.flush()
+    db.session.add_all([_placement("GR1"), _placement("GR2", "higher-studies"), _placement("GR3", "entrepreneur")])
+    db.session.add_all([_documents("GR1"), _documents("GR2"), _documents("GR4")])
+    db.session.commit()
+
+
+def test_counters_follow_creates_updates_and_deletes(students):
+    assert _counters() == {"2023-24": (6, 3, 1, 1, 1)}
+
+    db.session.get(Placement, "GR1").after_graduation = "higher-studies"
+    db.session.delete(db.session.get(Placement, "GR3"))
+    db.session.delete(db.session.get(EnrollmentRatio, "GR4"))
+    _assert_rebuild_matches()
+
+    db.session.delete(db.session.get(EnrollmentRatio, "GR2"))
+    db.session.delete(db.session.get(Placement, "GR2"))
+    db.session.flush()
+    db.session.delete(db.session.get(Student, "GR2"))
+    db.session.add(_student("GR7", "2024-25"))
+    _assert_rebuild_matches()
+    assert _counters() == {"2023-24": (5, 1, 0, 1, 0), "2024-25": (1, 0, 0, 0, 0)}
+
+
+def test_changing_year_moves_everything_the_student_counted(students):
+    db.session.get(Student, "GR1").academic_year = "2024-25"
+    db.session.get(Student, "GR4").academic_year = "2024-25"
+    _assert_rebuild_matches()
+    assert _counters() == {"2023-24": (4, 1, 0, 1, 1), "2024-25": (2, 2, 1, 0, 0)}
+
+
+def test_changing_year_together_with_the_student_rows(students):
+    # Loaded first, so the placement and document changes land in the same flush as the years
+    gr1, gr2, gr5 = (db.session.get(Student, gr_no) for gr_no in ("GR1", "GR2", "GR5"))
+    gr1_placement, gr2_placement = db.session.get(Placement, "GR1"), db.session.get(Placement, "GR2")
+    gr1_documents = db.session.get(EnrollmentRatio, "GR1")
+
+    gr1.academic_year = "2024-25"
+    gr1_placement.after_graduation = "entrepreneur"
+    db.session.delete(gr1_documents)
+    gr5.academic_year = "2024-25"
+    db.session.add_all([_placement("GR5", "higher-studies"), _documents("GR5")])
+    gr2.academic_year = "2022-23"
+    db.session.delete(gr2_placement)
+    _assert_rebuild_matches()
+    assert _counters() == {
+        "2022-23": (1, 1, 0, 0, 0), "2023-24": (3, 1, 0, 0, 1), "2024-25": (2, 1, 0, 1, 1)
+    }
@@ -0,0 +1,65 @@
+"""Direct-to-storage uploads: signed URLs, the PUT target and finalize."""
+import hashlib
+
+import pytest
+
+from mams.extensions import db
+from mams.models import Placement, Student
+
+PROOF = b"%PDF-1.4 offer letter"
+
+
+def _declared(data=PROOF):
+    return {"proof": {"filename": "offer.pdf", "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}}
+
+
+def _post(client, url, body):
+    with client.post(url, json=body) as response:
+        return response.status_code, response.get_json()
+
+
+@pytest.fixture
+def student(app):
+    db.session.add(Student(gr_no="GR1", name="One", enroll_no="EN1", academic_year="2024-25"))
+    db.session.commit()
+
+
+def test_placement_upload_round_trip(client, student, storage_backend):
+    status, body = _post(client, "/api/placement-details/upload-url", {"gr_no": "GR1", "files": _declared()})
+    assert status == 200
+    target = body["files"]["proof"]
+    with client.put(target["upload"]["url"], data=PROOF, headers=target["upload"]["headers"]) as response:
+        assert response.status_code == 201
+    assert storage_backend.objects[target["path"]][0] == PROOF
+
+    status, body = _post(client, "/api/placement-details/finalize", {
+        "gr_no": "GR1", "status": "placement", "files": _declared()
+    })
+    assert status == 201
+    placement = db.session.get(Placement, "GR1")
+    assert (placement.after_graduation, placement.doc_proof_url) == ("placement", body["file_url"])
+
+
+def test_finalize_without_the_upload_is_a_conflict(client, student, storage_backend):
+    status, body = _post(client, "/api/placement-details/finalize", {
+        "gr_no": "GR1", "status": "placement", "files": _declared()
+    })
+    assert status == 409
+    assert body == {"error": "proof was not uploaded"}
+    assert db.session.get(Placement, "GR1") is None
+
+
+@pytest.mark.parametrize("url", ["/api/placement-details/upload-url", "/api/placement-details/finalize"])
+def test_unknown_student_is_not_found(client, storage_backend, url):
+    status, body = _post(client, url, {"gr_no": "GR404", "status": "placement", "files": _declared()})
+    assert (status, body) == (404, {"error": "Student not found"})
+    assert storage_backend.objects == {}
+
+
+def test_put_of_other_bytes_is_refused(client, student, storage_backend):
+    _, body = _post(client, "/api/placement-details/upload-url", {"gr_no": "GR1", "files": _declared()})
+    upload = body["files"]["proof"]["upload"]
+    tampered = PROOF.replace(b"offer", b"forge")
+    with client.put(upload["url"], data=tampered, headers=upload["headers"]) as response:
+        assert response.status_code == 400
+    assert storage_backend.objects == {}
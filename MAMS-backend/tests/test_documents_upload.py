@@ -0,0 +1,70 @@
+"""Enrollment document upload: every file stored at once, nothing saved when one fails."""
+import io
+import threading
+
+import pytest
+
+from mams.api.documents import DOCUMENT_FILES
+from mams.api.students import DOCUMENT_URL_FIELDS
+from mams.extensions import db
+from mams.models import EnrollmentRatio, Student
+
+
+def _documents():
+    # Distinct bytes per file, identical ones would be stored once
+    return {"gr_no": "GR1", **{
+        file_key: (io.BytesIO(f"%PDF-1.4 {file_key}".encode()), f"{file_key}.pdf") for file_key in DOCUMENT_FILES
+    }}
+
+
+@pytest.fixture
+def student(app):
+    db.session.add(Student(gr_no="GR1", name="One", enroll_no="EN1", academic_year="2024-25"))
+    db.session.commit()
+
+
+def test_files_are_uploaded_concurrently(client, student, storage_backend, monkeypatch):
+    # Every upload waits for all the others, uploading them one by one breaks the barrier
+    barrier = threading.Barrier(len(DOCUMENT_FILES), timeout=5)
+    upload = storage_backend.upload
+
+    def upload_together(*args, **kwargs):
+        barrier.wait()
+        return upload(*args, **kwargs)
+
+    monkeypatch.setattr(storage_backend, "upload", upload_together)
+    with client.post("/api/documents/upload", data=_documents()) as response:
+        assert response.status_code == 200
+        urls = response.get_json()["urls"]
+
+    documents = db.session.get(EnrollmentRatio, "GR1")
+    assert {getattr(documents, field) for field in DOCUMENT_URL_FIELDS} == set(urls.values())
+    assert len(storage_backend.objects) == len(DOCUMENT_FILES)
+
+
+def test_one_failed_upload_saves_nothing(client, student, storage_backend, monkeypatch):
+    upload = storage_backend.upload
+
+    def failing_upload(path, content, *args, **kwargs):
+        if b"marks12" in (content if isinstance(content, bytes) else content.read()):
+            raise ConnectionError("storage unavailable")
+        if not isinstance(content, bytes):
+            content.seek(0)
+        return upload(path, content, *args, **kwargs)
+
+    monkeypatch.setattr(storage_backend, "upload", failing_upload)
+    with client.post("/api/documents/upload", data=_documents()) as response:
+        assert response.status_code == 500
+        assert "marks12" in response.get_json()["error"]
+
+    assert db.session.get(EnrollmentRatio, "GR1") is None
+
+
+def test_mismatched_content_is_refused_before_any_upload(client, student, storage_backend):
+    data = _documents()
+    data["marks10"] = (io.BytesIO(b"not a pdf"), "marks10.pdf")
+    with client.post("/api/documents/upload", data=data) as response:
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Content of marks10 does not match its file type"}
+
+    assert storage_backend.objects == {}
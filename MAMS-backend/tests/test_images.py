@@ -0,0 +1,110 @@
+"""Photo uploads: recompressed upright and stripped, with a JPEG thumbnail."""
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from mams.content_store import ContentStore
+from mams.extensions import db
+from mams.images import IMAGE_MAX_DIMENSION, THUMBNAIL_DIMENSION, process_image, process_uploads
+from mams.models import Placement, Student
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _jpeg(size, orientation=None, quality=95):
+    image = Image.effect_noise(size, 64).convert("RGB")
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        options["exif"] = exif.tobytes()
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, **options)
+    return out.getvalue()
+
+
+def _open(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def test_large_photo_is_turned_upright_scaled_and_stripped():
+    original = _jpeg((3000, 1500), orientation=6)  # Rotated 90°, as phones store portrait shots
+
+    recompressed, thumbnail = process_image(original, ".jpg")
+
+    image = _open(recompressed)
+    assert image.format == "JPEG"
+    assert image.size == (IMAGE_MAX_DIMENSION // 2, IMAGE_MAX_DIMENSION)
+    assert not image.getexif()
+    assert len(recompressed) < len(original)
+    preview = _open(thumbnail)
+    assert preview.format == "JPEG"
+    assert preview.size == (THUMBNAIL_DIMENSION // 2, THUMBNAIL_DIMENSION)
+
+
+def test_small_clean_image_is_kept_as_uploaded():
+    original = _jpeg((200, 100), quality=30)
+    recompressed, thumbnail = process_image(original, ".jpg")
+    assert recompressed == original
+    assert _open(thumbnail).size == (200, 100)
+
+
+def test_transparent_png_keeps_its_format_and_gets_a_white_thumbnail():
+    image = Image.new("RGBA", (40, 40), (255, 0, 0, 0))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+
+    recompressed, thumbnail = process_image(out.getvalue(), ".png")
+
+    assert _open(recompressed).format == "PNG"
+    preview = _open(thumbnail)
+    assert preview.mode == "RGB"
+    assert preview.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_recompression_is_deterministic():
+    # Identical uploads must give identical bytes, or content addressing stops deduplicating
+    original = _jpeg((2500, 1200), orientation=3)
+    assert process_image(original, ".jpg") == process_image(original, ".jpg")
+
+
+def test_pdfs_and_unreadable_images_are_left_alone():
+    pdf = FileStorage(stream=io.BytesIO(b"%PDF-1.4"), filename="a.pdf")
+    broken = FileStorage(stream=io.BytesIO(b"\xff\xd8\xff not really a jpeg"), filename="b.jpg")
+    photo = FileStorage(stream=io.BytesIO(_jpeg((300, 300))), filename="c.jpg")
+
+    processed, thumbnails = process_uploads([
+        ("pdf", pdf, ".pdf", "application/pdf"),
+        ("broken", broken, ".jpg", "image/jpeg"),
+        ("photo", photo, ".jpg", "image/jpeg"),
+    ])
+
+    assert [entry[1] for entry in processed[:2]] == [pdf, broken]
+    assert processed[2][1] is not photo
+    assert set(thumbnails) == {"photo"}
+
+
+@pytest.fixture
+def student(app):
+    db.session.add(Student(gr_no="GR1", name="One", enroll_no="EN1", academic_year="2024-25"))
+    db.session.commit()
+
+
+def test_uploaded_photo_is_stored_recompressed_with_its_thumbnail(client, student, storage_backend):
+    original = _jpeg((3000, 1500), orientation=6)
+    with client.post("/api/placement-details", data={
+        "gr_no": "GR1", "status": "placement", "proof": (io.BytesIO(original), "offer.jpg"),
+    }) as response:
+        assert response.status_code == 201
+
+    path = storage_backend.path_from_url(db.session.get(Placement, "GR1").doc_proof_url)
+    stored, _ = storage_backend.objects[path]
+    assert _open(stored).size == (IMAGE_MAX_DIMENSION // 2, IMAGE_MAX_DIMENSION)
+    sha256 = path.rsplit("/", 1)[-1].split(".")[0]
+    thumbnail, content_type = storage_backend.objects[ContentStore.thumbnail_path(sha256)]
+    assert content_type == "image/jpeg"
+    assert max(_open(thumbnail).size) == THUMBNAIL_DIMENSION
@@ -0,0 +1,92 @@
+"""Storage outbox: retries with exponential backoff until MAX_ATTEMPTS."""
+import datetime
+
+import pytest
+
+from mams import jobs
+from mams.extensions import db
+from mams.models import StorageJob, Student
+from mams.storage import job_queue
+
+START = datetime.datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def clock(app, monkeypatch):
+    now = [START]
+    monkeypatch.setattr(jobs, "_now", lambda: now[0])
+    return now
+
+
+def _fail(payload):
+    raise RuntimeError(f"storage down for {payload['path']}")
+
+
+def _enqueue(kind, path="a.pdf"):
+    job = job_queue.enqueue(kind, {"path": path})
+    db.session.commit()
+    return job.id
+
+
+def test_successful_job_is_deleted(clock):
+    done = []
+    job_id = _enqueue("ok")
+    assert job_queue.run_once({"ok": done.append}) == 1
+    assert done == [{"path": "a.pdf"}]
+    assert db.session.get(StorageJob, job_id) is None
+
+
+def test_failed_job_backs_off_exponentially(clock):
+    job_id = _enqueue("flaky")
+    for attempt in range(1, 4):
+        assert job_queue.run_once({"flaky": _fail}) == 1
+        job = db.session.get(StorageJob, job_id)
+        assert (job.status, job.attempts) == ("pending", attempt)
+        assert job.last_error == "storage down for a.pdf"
+        delay = datetime.timedelta(seconds=2 ** attempt)
+        assert job.available_at == clock[0] + delay
+
+        clock[0] += delay - datetime.timedelta(seconds=1)
+        assert job_queue.run_once({"flaky": _fail}) == 0  # Not due yet
+        clock[0] += datetime.timedelta(seconds=1)
+
+
+def test_job_fails_for_good_after_max_attempts(clock, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_ATTEMPTS", 3)
+    job_id = _enqueue("broken")
+    for _ in range(3):
+        assert job_queue.run_once({"broken": _fail}) == 1
+        clock[0] += datetime.timedelta(hours=1)
+
+    job = db.session.get(StorageJob, job_id)
+    assert (job.status, job.attempts) == ("failed", 3)
+    assert job_queue.run_once({"broken": _fail}) == 0
+    assert job_queue.pending_count() == 0
+
+
+def test_unknown_kind_is_a_failed_attempt(clock):
+    job_id = _enqueue("unheard-of")
+    job_queue.run_once({})
+    job = db.session.get(StorageJob, job_id)
+    assert job.attempts == 1
+    assert "No handler" in job.last_error
+
+
+def test_database_error_rolls_back_only_its_handler(clock):
+    def duplicate_student(payload):
+        # The second insert is an IntegrityError from the database
+        for _ in range(2):
+            db.session.execute(Student.__table__.insert(), {
+                "gr_no": "GR1", "name": "One", "enroll_no": "EN1", "academic_year": "2024-25"
+            })
+
+    def add_student(payload):
+        db.session.add(Student(gr_no="GR2", name="Two", enroll_no="EN2", academic_year="2024-25"))
+
+    poison = _enqueue("poison")
+    good = _enqueue("good")
+    assert job_queue.run_once({"poison": duplicate_student, "good": add_student}) == 2
+
+    assert db.session.get(StorageJob, poison).attempts == 1
+    assert db.session.get(StorageJob, good) is None
+    assert db.session.query(Student.gr_no).all() == [("GR2",)]
@@ -0,0 +1,78 @@
+"""Request, SQL and storage instrumentation and the /api/metrics exposition."""
+import pytest
+from sqlalchemy import text
+
+from mams.extensions import db
+from mams.metrics import N_PLUS_ONE_THRESHOLD, Counter, Histogram, InstrumentedBackend
+from mams.storage_backends import MemoryStorage
+
+
+def _sample(client, series):
+    # The registry is process wide, tests compare values before and after
+    with client.get("/api/metrics") as response:
+        assert response.mimetype == "text/plain"
+        lines = response.get_data(as_text=True).splitlines()
+    values = [line.rsplit(" ", 1)[1] for line in lines if line.startswith(series + " ")]
+    return float(values[0]) if values else 0.0
+
+
+def test_counter_and_histogram_exposition():
+    counter = Counter("c_total", "help", ("route",))
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+    assert list(counter.render())[2] == 'c_total{route="say \\"hi\\""} 3'
+
+    histogram = Histogram("h_seconds", "help", buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+    assert list(histogram.render())[2:] == [
+        'h_seconds_bucket{le="0.1"} 0',
+        'h_seconds_bucket{le="1"} 1',
+        'h_seconds_bucket{le="+Inf"} 1',
+        "h_seconds_sum 0.5",
+        "h_seconds_count 1",
+    ]
+
+
+def test_requests_and_their_queries_are_counted(client):
+    requests = 'mams_requests_total{endpoint="students.get_students",method="GET",status="200"}'
+    queried = 'mams_db_queries_per_request_count{endpoint="students.get_students"}'
+    before = _sample(client, requests), _sample(client, queried)
+
+    client.get("/api/students").close()
+
+    assert (_sample(client, requests), _sample(client, queried)) == (before[0] + 1, before[1] + 1)
+
+
+@pytest.fixture
+def repeating_view(app):
+    def repeated_queries():
+        # Differing literals, one statement shape
+        for n in range(N_PLUS_ONE_THRESHOLD):
+            db.session.execute(text(f"SELECT {n}"))
+        return "ok"
+
+    app.add_url_rule("/test/repeated", "repeated_queries", repeated_queries)
+
+
+def test_repeated_statement_is_reported_as_n_plus_one(client, repeating_view):
+    series = 'mams_n_plus_one_total{endpoint="repeated_queries"}'
+    before = _sample(client, series)
+    client.get("/test/repeated").close()
+    assert _sample(client, series) == before + 1
+    assert _sample(client, 'mams_db_queries_per_request_bucket{endpoint="repeated_queries",le="5"}') == 0
+
+
+def test_storage_calls_are_timed_and_failures_counted(client):
+    storage = InstrumentedBackend(MemoryStorage())
+    series = 'mams_storage_call_duration_seconds_count{operation="download"}'
+    errors = 'mams_storage_errors_total{operation="download"}'
+    before = _sample(client, series), _sample(client, errors)
+
+    storage.upload("a.pdf", b"%PDF", "application/pdf")
+    assert storage.download("a.pdf") == b"%PDF"
+    with pytest.raises(FileNotFoundError):
+        storage.download("missing.pdf")
+    storage.public_url("a.pdf")  # Never leaves the process, not timed
+
+    assert (_sample(client, series), _sample(client, errors)) == (before[0] + 2, before[1] + 1)
+    assert 'operation="public_url"' not in client.get("/api/metrics").get_data(as_text=True)
@@ -0,0 +1,66 @@
+"""``flask migrate``: applying from scratch, adopting a create_all database, running twice."""
+import pytest
+import sqlalchemy as sa
+
+from mams import migrations
+from mams.extensions import db
+
+APPLIED = [
+    "Applied 0001_baseline",
+    "Applied 0002_academic_year_indexes",
+    "2 migration(s) applied",
+]
+
+
+@pytest.fixture
+def migrate(app):
+    runner = app.test_cli_runner()
+    # drop_all() doesn't know the table, a scratch database may still have one
+    migrations.schema_migrations.drop(db.engine, checkfirst=True)
+
+    def migrate():
+        # The checks plan against 100k synthetic rows, they have their own command
+        result = runner.invoke(args=["migrate", "--skip-checks"])
+        assert result.exit_code == 0, result.output
+        return result.output.splitlines()
+
+    yield migrate
+    migrations.schema_migrations.drop(db.engine, checkfirst=True)
+
+
+def _recorded():
+    with db.engine.connect() as connection:
+        return connection.execute(
+            sa.select(migrations.schema_migrations).order_by(migrations.schema_migrations.c.version)
+        ).all()
+
+
+def _indexes(table):
+    return {index["name"] for index in sa.inspect(db.engine).get_indexes(table)}
+
+
+def test_migrate_from_an_empty_database(app, migrate):
+    db.drop_all()
+
+    assert migrate() == APPLIED
+    assert {"student", "placement", "storage_job"} <= set(sa.inspect(db.engine).get_table_names())
+    assert "ix_student_academic_year_gr_no" in _indexes("student")
+
+
+def test_migrate_adopts_a_create_all_database(app, migrate):
+    assert migrate() == APPLIED
+    assert "ix_student_academic_year_gr_no" in _indexes("student")
+    assert "ix_storage_job_pending" in _indexes("storage_job")
+    assert "ix_storage_job_status" not in _indexes("storage_job")
+
+
+def test_migrate_twice_changes_nothing(app, migrate):
+    migrate()
+    recorded = _recorded()
+    indexes = _indexes("student"), _indexes("storage_job")
+
+    assert migrate() == ["Database is up to date"]
+    assert _recorded() == recorded
+    assert [(row.version, row.name) for row in recorded] == [(1, "baseline"), (2, "academic_year_indexes")]
+    assert (_indexes("student"), _indexes("storage_job")) == indexes
+    assert migrations.pending(db.engine) == []
@@ -0,0 +1,77 @@
+"""Criterion 4.2/4.3: the vectorized cohort figures and the endpoints around them."""
+import pytest
+
+from mams.extensions import db
+from mams.models import Student
+from mams.performance import STIPULATED_SEMESTERS, compute_cohort_metrics
+
+
+def _results(year, gr_no, cgpa, backlogs):
+    # One row per semester sat, ``backlogs`` lists them semester by semester
+    return [(year, gr_no, semester, cgpa, count, True) for semester, count in enumerate(backlogs, start=1)]
+
+
+ROWS = (
+    _results("2020-21", "GR1", 8.0, [0] * STIPULATED_SEMESTERS)
+    + _results("2020-21", "GR2", 6.0, [0, 1, 0, 0, 0, 0, 0, 0])
+    + _results("2020-21", "GR3", 5.0, [0, 0, 0, 2])
+    # A cohort nobody asked for is left out
+    + _results("2019-20", "GR9", 9.0, [0] * STIPULATED_SEMESTERS)
+)
+
+
+def test_cohort_figures():
+    older, newer = compute_cohort_metrics(["2020-21", "2021-22"], [3, 0], ROWS)
+
+    assert older["success_rate"] == {
+        "without_backlog": {"graduated": 1, "index": 33.33},
+        "stipulated_period": {"graduated": 2, "index": 66.67},
+    }
+    semesters = {entry["semester"]: entry for entry in older["semesters"]}
+    assert semesters[2] == {"semester": 2, "appeared": 3, "with_backlog": 1, "total_backlogs": 1}
+    assert semesters[4] == {"semester": 4, "appeared": 3, "with_backlog": 1, "total_backlogs": 2}
+    assert semesters[5]["appeared"] == 2
+    # 4.3 on semester 4: mean CGPA of the two who cleared it, times 2 of 3 successful
+    assert older["academic_performance"] == {
+        "semester": 4, "mean_cgpa": 7.0, "successful": 2, "appeared": 3, "api": 4.67
+    }
+
+    # Nothing to divide by, so nothing to report rather than zeros
+    assert newer["success_rate"]["without_backlog"] == {"graduated": 0, "index": None}
+    assert newer["academic_performance"]["api"] is None
+
+
+def test_no_cohorts_and_no_results():
+    assert compute_cohort_metrics([], [], ROWS) == []
+    (cohort,) = compute_cohort_metrics(["2020-21"], [3], [])
+    assert cohort["success_rate"]["stipulated_period"] == {"graduated": 0, "index": 0.0}
+    assert cohort["academic_performance"]["mean_cgpa"] is None
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all(
+        Student(gr_no=gr_no, name=gr_no, enroll_no=f"EN{gr_no}", academic_year="2020-21")
+        for gr_no in ("GR1", "GR2", "GR3")
+    )
+    db.session.commit()
+
+
+def test_uploaded_results_reach_the_report(client, students):
+    results = [
+        {"gr_no": gr_no, "semester": semester, "cgpa": cgpa, "backlogs": backlogs}
+        for _, gr_no, semester, cgpa, backlogs, _ in ROWS
+    ] + [{"gr_no": "GR1", "semester": 9}]
+    with client.post("/api/semester-results", json=results) as response:
+        body = response.get_json()
+    # GR9 isn't a student, the ninth semester doesn't exist
+    assert body["stored"] == len(ROWS) - STIPULATED_SEMESTERS
+    assert len(body["rejected"]) == STIPULATED_SEMESTERS + 1
+
+    with client.get("/api/criteria/4/performance") as response:
+        assert response.get_json() == compute_cohort_metrics(["2020-21"], [3], ROWS)
+
+
+def test_api_semester_out_of_range(client, students):
+    with client.get(f"/api/criteria/4/performance?api_semester={STIPULATED_SEMESTERS + 1}") as response:
+        assert response.status_code == 400
@@ -0,0 +1,122 @@
+"""Batch placement uploads: per-row manifest results, and the admission slot held until the batch is done."""
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from mams import placement_batch
+from mams.admission import LIMITERS
+from mams.extensions import db
+from mams.models import Placement, Student
+
+PDF = b"%PDF-1.4 offer letter"
+
+
+def _archive(files, manifest=None):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+        if manifest is not None:
+            archive.writestr("manifest.csv", manifest)
+    return out.getvalue()
+
+
+def _post(client, archive):
+    with client.post("/api/placement-details/batch", data={"archive": (io.BytesIO(archive), "batch.zip")}) as response:
+        return response.status_code, response.get_json()
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def _finished(client, body):
+    def done():
+        with client.get(body["status_url"]) as response:
+            done.status = response.get_json()
+        return done.status["status"] in ("done", "failed")
+
+    _wait_until(done)
+    return done.status
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all(
+        Student(gr_no=f"GR{n}", name=f"Student {n}", enroll_no=f"EN{n}", academic_year="2024-25") for n in (1, 2, 3)
+    )
+    db.session.commit()
+
+
+def test_manifest_results_per_row(client, students, storage_backend):
+    archive = _archive(
+        {"gr1.pdf": PDF, "gr2.pdf": b"not a pdf", "gr3.exe": b"MZ", "nobody.pdf": PDF},
+        "filename,gr_no,status\n"
+        "gr1.pdf,GR1,placement\n"
+        "gr2.pdf,GR2,higher-studies\n"
+        "gr3.exe,GR3,placement\n"
+        "nobody.pdf,GR404,placement\n"
+        "missing.pdf,GR3,placement\n"
+        "gr1.pdf,GR1,entrepreneur\n"
+        ",GR3,\n"
+    )
+
+    status, body = _post(client, archive)
+    assert status == 202
+    assert (body["total"], body["accepted"], body["rejected"]) == (7, 2, 5)
+
+    result = _finished(client, body)
+    assert (result["status"], result["processed"], result["succeeded"], result["failed"]) == ("done", 7, 1, 6)
+    assert [(row["row"], row["status"], row.get("reason")) for row in result["results"]] == [
+        (1, "saved", None),
+        (2, "rejected", "File content does not match its extension"),
+        (3, "rejected", "Only PDF and image files (JPG, JPEG, PNG) are allowed"),
+        (4, "rejected", "Student not found"),
+        (5, "rejected", "File not found in archive"),
+        (6, "rejected", "Duplicate GR number in manifest"),
+        (7, "rejected", "Missing filename, status"),
+    ]
+    db.session.expire_all()
+    placement = db.session.get(Placement, "GR1")
+    assert placement.after_graduation == "placement"
+    assert placement.doc_proof_url == result["results"][0]["file_url"]
+    assert db.session.get(Placement, "GR2") is None
+
+
+def test_archive_without_a_manifest_is_refused(client, students):
+    status, body = _post(client, _archive({"gr1.pdf": PDF}))
+    assert (status, body) == (400, {"error": "Send a manifest file or put manifest.csv in the archive"})
+    assert LIMITERS["bulk"].running == 0
+
+
+def test_slot_is_held_until_the_batch_is_done(client, students, storage_backend, monkeypatch):
+    release = threading.Event()
+    run_chunk = placement_batch._run_chunk
+
+    def blocked_chunk(*args):
+        release.wait(10)
+        run_chunk(*args)
+
+    monkeypatch.setattr(placement_batch, "_run_chunk", blocked_chunk)
+    archive = _archive({"gr1.pdf": PDF}, "filename,gr_no,status\ngr1.pdf,GR1,placement\n")
+
+    status, body = _post(client, archive)
+    assert status == 202
+    assert LIMITERS["bulk"].running == 1  # The response is closed, the runner still holds the slot
+
+    assert _post(client, archive)[0] == 429
+    with client.post("/api/students/bulk", data="gr_no,name,enroll_no,academic_year\n", content_type="text/csv") as busy:
+        assert busy.status_code == 429
+        assert busy.headers["Retry-After"] == str(LIMITERS["bulk"].retry_after)
+
+    release.set()
+    assert _finished(client, body)["succeeded"] == 1
+    _wait_until(lambda: LIMITERS["bulk"].running == 0)
+    assert _post(client, archive)[0] == 202
+    _wait_until(lambda: LIMITERS["bulk"].running == 0)
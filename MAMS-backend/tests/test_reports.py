@@ -0,0 +1,72 @@
+"""Criterion 4 export: the streamed XLSX is a workbook openpyxl reads back."""
+import io
+
+import openpyxl
+import pytest
+
+from mams.extensions import db
+from mams.models import EnrollmentRatio, Placement, SemesterResult, Student
+from mams.reports import Table, stream_xlsx
+
+XLSX_SHEETS = ["4 Summary", "4.1 Enrollment ratio", "4.2 Success rate", "4.3 Academic performance", "4.4 Placement"]
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all([
+        Student(gr_no="GR1", name="Asha & <Co>", enroll_no="EN1", academic_year="2022-23"),
+        Student(gr_no="GR2", name="Bhavin\x01", enroll_no="EN2", academic_year="2022-23"),
+        Student(gr_no="GR3", name="=1+1", enroll_no="EN3", academic_year="2023-24"),
+    ])
+    db.session.flush()
+    db.session.add_all([
+        Placement(gr_no="GR1", after_graduation="placement", doc_proof_url="https://example.com/1.pdf"),
+        EnrollmentRatio(
+            gr_no="GR1", registration_form_url="r", marks10_url="10", marks12_url="12", gujcet_marksheet_url="g"
+        ),
+        SemesterResult(gr_no="GR1", semester=1, sgpa=8.0, cgpa=8.0, backlogs=0),
+        SemesterResult(gr_no="GR2", semester=1, sgpa=6.5, cgpa=6.5, backlogs=1),
+    ])
+    db.session.commit()
+
+
+def _rows(sheet):
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_xlsx_export_opens_in_openpyxl(client, students):
+    with client.get("/api/reports/criteria-4.xlsx") as response:
+        assert response.status_code == 200
+        assert response.headers["Content-Disposition"] == 'attachment; filename="criteria-4.xlsx"'
+        workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()))
+
+    assert workbook.sheetnames == XLSX_SHEETS
+    summary = _rows(workbook["4 Summary"])
+    assert summary[0][:4] == ["academic_year", "sanctioned_intake", "admitted", "documents_submitted"]
+    assert [(row[0], row[2], row[3], row[5]) for row in summary[1:]] == [("2023-24", 1, 0, 0), ("2022-23", 2, 1, 1)]
+
+    placement = _rows(workbook["4.4 Placement"])
+    assert placement[1:] == [
+        ["2023-24", "GR3", "EN3", "=1+1", None, None],
+        ["2022-23", "GR1", "EN1", "Asha & <Co>", "placement", "https://example.com/1.pdf"],
+        ["2022-23", "GR2", "EN2", "Bhavin", None, None],
+    ]
+    assert workbook["4.4 Placement"].freeze_panes == "A2"
+
+
+def test_xlsx_export_of_selected_tables(client, students):
+    with client.get("/api/reports/criteria-4.xlsx?table=placement&academic_year=2023-24") as response:
+        workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()))
+    assert workbook.sheetnames == ["4.4 Placement"]
+    assert [row[1] for row in _rows(workbook.active)[1:]] == ["GR3"]
+
+
+def test_workbook_streamed_in_many_chunks_is_whole():
+    rows = [(n, f"GR{n}", n / 4, n % 2 == 0) for n in range(5000)]
+    table = Table("numbers", "Numbers: [all]", ("n", "gr_no", "quarter", "even"), lambda: iter(rows))
+
+    chunks = list(stream_xlsx([table], chunk_bytes=4096))
+    assert len(chunks) > 2
+
+    sheet = openpyxl.load_workbook(io.BytesIO(b"".join(chunks)), read_only=True)["Numbers   all "]
+    assert [tuple(row) for row in sheet.iter_rows(min_row=2, values_only=True)] == rows
@@ -0,0 +1,57 @@
+"""Response cache: ETag revalidation and invalidation on write."""
+import pytest
+
+from mams.cache import MemoryBackend, SQLiteBackend, create_response_cache
+from mams.extensions import response_cache
+
+
+def _add_student(client, gr_no):
+    response = client.post("/api/students", json={
+        "gr_no": gr_no, "name": f"Student {gr_no}", "enroll_no": f"EN{gr_no}", "academic_year": "2024-25"
+    })
+    assert response.status_code == 201
+
+
+def test_etag_revalidates_until_a_write(client):
+    _add_student(client, "GR1")
+
+    first = client.get("/api/students/all")
+    assert first.headers["X-Cache"] == "MISS"
+    assert first.get_json() == [{"gr_no": "GR1"}]
+
+    again = client.get("/api/students/all", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["X-Cache"] == "HIT"
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+    _add_student(client, "GR2")
+
+    after_write = client.get("/api/students/all", headers={"If-None-Match": first.headers["ETag"]})
+    assert after_write.status_code == 200
+    assert after_write.headers["X-Cache"] == "MISS"
+    assert after_write.get_json() == [{"gr_no": "GR1"}, {"gr_no": "GR2"}]
+    assert after_write.headers["ETag"] != first.headers["ETag"]
+
+
+def test_invalidation_only_reaches_dependent_lists(client):
+    client.get("/api/students/all")
+    client.get("/api/students")
+    response_cache.invalidate("placements")
+
+    assert client.get("/api/students/all").headers["X-Cache"] == "HIT"
+    assert client.get("/api/students").headers["X-Cache"] == "MISS"
+
+
+@pytest.mark.parametrize("env, backend", [
+    ({}, MemoryBackend),
+    ({"WEB_CONCURRENCY": "4"}, SQLiteBackend),
+    ({"WEB_CONCURRENCY": "4", "RESPONSE_CACHE_BACKEND": "memory"}, MemoryBackend),
+    ({"RESPONSE_CACHE_BACKEND": "sqlite"}, SQLiteBackend),
+])
+def test_backend_defaults_to_sqlite_for_several_workers(monkeypatch, tmp_path, env, backend):
+    for name in ("WEB_CONCURRENCY", "RESPONSE_CACHE_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("RESPONSE_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    assert type(create_response_cache().backend) is backend
@@ -0,0 +1,84 @@
+"""JSON encoding, streamed arrays and response compression."""
+import datetime
+import decimal
+import gzip
+import json
+import uuid
+
+import pytest
+
+from mams import compression, serialization
+from mams.compression import COMPRESS_MIN_BYTES
+from mams.extensions import db
+from mams.models import Student
+
+VALUES = {
+    "date": datetime.date(2024, 6, 1),
+    "datetime": datetime.datetime(2024, 6, 1, 12, 30),
+    "decimal": decimal.Decimal("8.25"),
+    "uuid": uuid.UUID(int=1),
+    "nested": [1, 2.5, None, True, "é"],
+}
+
+
+def test_orjson_output_matches_the_json_fallback(monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    fast = serialization.dumps(VALUES, sort_keys=True)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(fast) == json.loads(serialization.dumps(VALUES, sort_keys=True))
+    # Keys the json module converts, orjson refuses
+    assert serialization.dumps({1: "a"}) == b'{"1":"a"}'
+
+
+@pytest.mark.parametrize("count", [0, 1, 500])
+def test_streamed_array_is_valid_json(count):
+    items = [{"gr_no": f"GR{n}", "name": "x" * 40} for n in range(count)]
+    chunks = list(serialization.stream_json_array(iter(items), chunk_bytes=1024))
+    assert json.loads(b"".join(chunks)) == items
+    # Flushed once a chunk reaches chunk_bytes, never holding much more
+    assert all(1024 <= len(chunk) < 1024 + 100 for chunk in chunks[:-1])
+    assert len(chunks) > 1 or count < 10
+
+
+@pytest.fixture
+def students(app):
+    # Enough rows for the list to be worth compressing
+    db.session.add_all(
+        Student(gr_no=f"GR{n:04}", name=f"Student {n}", enroll_no=f"EN{n:04}", academic_year="2024-25")
+        for n in range(200)
+    )
+    db.session.commit()
+
+
+@pytest.mark.parametrize("url", ["/api/students/all", "/api/students/all?limit=all"])
+def test_list_is_gzipped_for_clients_that_accept_it(client, students, url):
+    with client.get(url) as response:
+        plain = response.get_json()
+    with client.get(url, headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert json.loads(gzip.decompress(response.get_data())) == plain
+    assert len(plain) == 200
+
+
+def test_compressed_body_gets_a_weak_etag(client, students):
+    with client.get("/api/students/all", headers={"Accept-Encoding": "gzip"}) as response:
+        etag, weak = response.get_etag()
+    assert etag and weak
+    with client.get("/api/students/all", headers={"Accept-Encoding": "gzip", "If-None-Match": f'W/"{etag}"'}) as response:
+        assert response.status_code == 304
+
+
+def test_brotli_is_preferred_when_installed(client, students):
+    if compression.brotli is None:
+        pytest.skip("brotli not installed")
+    with client.get("/api/students/all", headers={"Accept-Encoding": "gzip, br"}) as response:
+        assert response.headers["Content-Encoding"] == "br"
+        assert len(json.loads(compression.brotli.decompress(response.get_data()))) == 200
+
+
+def test_small_bodies_are_sent_as_they_are(client):
+    with client.get("/api/students/all", headers={"Accept-Encoding": "gzip"}) as response:
+        assert len(response.get_data()) < COMPRESS_MIN_BYTES
+        assert "Content-Encoding" not in response.headers
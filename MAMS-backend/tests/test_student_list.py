@@ -0,0 +1,70 @@
+"""Student lists: keyset pages, the whole list and the streamed list."""
+import pytest
+from sqlalchemy import event
+
+from mams.api import students as students_api
+from mams.extensions import db
+from mams.models import Student
+
+GR_NUMBERS = [f"GR{n:02}" for n in range(1, 8)]
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all(
+        Student(gr_no=gr_no, name=f"Student {gr_no}", enroll_no=f"EN{gr_no}", academic_year="2024-25")
+        for gr_no in reversed(GR_NUMBERS)
+    )
+    db.session.add(Student(gr_no="GR99", name="Older", enroll_no="EN99", academic_year="2023-24"))
+    db.session.commit()
+
+
+def _pages(client, url):
+    pages = []
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append([item["gr_no"] for item in response.get_json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        url = f"/api/students/all?academic_year=2024-25&limit=3&cursor={cursor}"
+
+
+def test_keyset_pages_round_trip(client, students):
+    pages = _pages(client, "/api/students/all?academic_year=2024-25&limit=3")
+    assert pages == [GR_NUMBERS[:3], GR_NUMBERS[3:6], GR_NUMBERS[6:]]
+
+
+def test_cursor_on_the_last_row_returns_an_empty_page(client, students):
+    response = client.get(f"/api/students/all?academic_year=2024-25&limit=3&cursor={GR_NUMBERS[-1]}")
+    assert response.get_json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_without_limit_the_whole_list_is_returned(client, students):
+    response = client.get("/api/students/all")
+    assert [item["gr_no"] for item in response.get_json()] == GR_NUMBERS + ["GR99"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_streamed_list_matches_the_pages(client, students):
+    response = client.get("/api/students/all?academic_year=2024-25&limit=all")
+    assert [item["gr_no"] for item in response.get_json()] == GR_NUMBERS
+    response.close()
+
+
+def test_streamed_list_runs_under_a_statement_timeout(app, client, students):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("statement_timeout is PostgreSQL only")
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        client.get("/api/students/all?limit=all").close()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    timeout = statements.index(f"SET LOCAL statement_timeout = {students_api.STREAM_STATEMENT_TIMEOUT_MS}")
+    query = next(n for n, statement in enumerate(statements) if statement.lstrip().startswith("SELECT"))
+    assert timeout < query
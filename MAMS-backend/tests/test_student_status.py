@@ -0,0 +1,64 @@
+"""Batch student status: placement and documents of many students in one query."""
+import pytest
+from sqlalchemy import event
+
+from mams.api.students import DOCUMENT_URL_FIELDS, MAX_PAGE_SIZE
+from mams.extensions import db
+from mams.models import EnrollmentRatio, Placement, Student
+
+
+@pytest.fixture
+def students(app):
+    db.session.add_all(
+        Student(gr_no=f"GR{n}", name=f"Student {n}", enroll_no=f"EN{n}", academic_year="2024-25")
+        for n in range(1, 5)
+    )
+    db.session.flush()
+    db.session.add(Placement(gr_no="GR1", after_graduation="placement", doc_proof_url="http://storage.invalid/a.pdf"))
+    db.session.add(EnrollmentRatio(gr_no="GR2", **{field: f"http://storage.invalid/{field}.pdf" for field in DOCUMENT_URL_FIELDS}))
+    db.session.commit()
+
+
+def _statuses(response):
+    with response:
+        assert response.status_code == 200
+        return {entry["gr_no"]: entry for entry in response.get_json()}
+
+
+def test_status_of_the_requested_students(client, students):
+    statuses = _statuses(client.get("/api/students/status?gr_no=GR1,GR2&gr_no=GR3&gr_no=GR404"))
+
+    assert set(statuses) == {"GR1", "GR2", "GR3"}
+    assert statuses["GR1"]["placement"] == {"status": "placement", "doc_proof_url": "http://storage.invalid/a.pdf"}
+    assert (statuses["GR1"]["has_documents"], statuses["GR2"]["has_documents"]) == (False, True)
+    assert statuses["GR2"]["documents"]["marks10_url"] == "http://storage.invalid/marks10_url.pdf"
+    assert statuses["GR3"] == {
+        "gr_no": "GR3", "name": "Student 3", "enroll_no": "EN3", "academic_year": "2024-25",
+        "has_placement": False, "placement": None, "has_documents": False, "documents": None,
+    }
+
+
+def test_post_answers_like_get_in_one_query(app, client, students):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        posted = _statuses(client.post("/api/students/status", json={"gr_nos": ["GR1", "GR2", "GR3", "GR4"]}))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert len([statement for statement in statements if statement.lstrip().startswith("SELECT")]) == 1
+    assert posted == _statuses(client.get("/api/students/status?academic_year=2024-25"))
+
+
+@pytest.mark.parametrize("body", [{}, {"gr_nos": "GR1"}, {"gr_nos": []}, {"gr_nos": [" ", ""]}])
+def test_nothing_to_look_up_is_refused(client, body):
+    with client.post("/api/students/status", json=body) as response:
+        assert response.status_code == 400
+
+
+def test_too_many_gr_numbers_are_refused(client):
+    gr_numbers = [f"GR{n}" for n in range(MAX_PAGE_SIZE + 1)]
+    with client.post("/api/students/status", json={"gr_nos": gr_numbers}) as response:
+        assert response.status_code == 400
+        assert response.get_json() == {"error": f"At most {MAX_PAGE_SIZE} GR numbers per request"}
@@ -0,0 +1,45 @@
+"""Upload size limits: enforced while the body is read."""
+import io
+
+from flask import request
+from werkzeug.test import EnvironBuilder
+
+from mams.uploads import MAX_FILE_SIZE, MAX_REQUEST_SIZE, MB, file_size_limits
+
+
+def _multipart(files, size):
+    data = {"gr_no": "GR1", "status": "placement"}
+    for n in range(files):
+        data[f"proof{n or ''}"] = (io.BytesIO(b"%PDF-" + b"0" * size), "proof.pdf")
+    builder = EnvironBuilder(method="POST", data=data)
+    try:
+        environ = builder.get_environ()
+        return environ["wsgi.input"].read(), environ["CONTENT_TYPE"]
+    finally:
+        builder.close()
+
+
+def _post_chunked(client, url, body, content_type):
+    # No Content-Length, as with Transfer-Encoding: chunked behind gunicorn. Close the
+    # response: the admission slot is held until then
+    return client.post(
+        url, input_stream=io.BytesIO(body), content_type=content_type,
+        headers={"Transfer-Encoding": "chunked"}, environ_overrides={"wsgi.input_terminated": True}
+    )
+
+
+def test_chunked_body_over_the_limit_is_rejected(client):
+    # Every file is under MAX_FILE_SIZE, together they are over MAX_REQUEST_SIZE
+    files = MAX_REQUEST_SIZE // MAX_FILE_SIZE + 1
+    body, content_type = _multipart(files, MAX_FILE_SIZE - MB)
+
+    with _post_chunked(client, "/api/placement-details", body, content_type) as response:
+        assert response.status_code == 413
+
+
+def test_endpoints_with_a_file_limit_get_room_for_it(app):
+    limit = file_size_limits["students.bulk_import_students"]
+    with app.test_request_context("/api/students/bulk", method="POST"):
+        assert request.max_content_length == limit + MAX_REQUEST_SIZE
+    with app.test_request_context("/api/placement-details", method="POST"):
+        assert request.max_content_length == app.config["MAX_CONTENT_LENGTH"] == MAX_REQUEST_SIZE
@@ -0,0 +1,93 @@
+"""WORKER_MODE in gunicorn.conf.py, and a gevent worker overlapping storage round trips."""
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bench.run import _send, start_server, stop_server
+from mams.direct_uploads import LocalUploadSigner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = "worker-mode-test-secret-32-bytes"
+
+# In a fresh interpreter: gevent mode patches the standard library for good
+LOAD_CONFIG = """
+import runpy, socket
+config = runpy.run_path("gunicorn.conf.py")
+from mams.storage import storage_executor
+print(config.get("worker_class", "sync"), config.get("worker_connections"), config["preload_app"],
+      storage_executor._max_workers, socket.socket.__module__.split(".")[0])
+"""
+
+
+def _load_config(mode, **env):
+    env = dict(os.environ, WORKER_MODE=mode, STORAGE_BACKEND="memory", **env)
+    env.pop("STORAGE_WORKERS", None)
+    return subprocess.run(
+        [sys.executable, "-c", LOAD_CONFIG], env=env, cwd=ROOT, capture_output=True, text=True, timeout=60
+    )
+
+
+def test_sync_mode_leaves_the_defaults():
+    result = _load_config("sync")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["sync", "None", "True", "8", "socket"]
+
+
+def test_gevent_mode_patches_before_the_app_is_loaded():
+    pytest.importorskip("gevent")
+    result = _load_config("gevent", WORKER_CONNECTIONS="50")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["gevent", "50", "True", "64", "gevent"]
+
+
+def test_unknown_mode_is_refused():
+    result = _load_config("eventlet")
+    assert result.returncode != 0
+    assert "WORKER_MODE must be sync or gevent, got 'eventlet'" in result.stderr
+
+
+STORAGE_LATENCY = 0.5
+UPLOADS = 8
+
+
+@pytest.fixture
+def gevent_server(tmp_path, monkeypatch):
+    pytest.importorskip("gevent")
+    pytest.importorskip("gunicorn")
+    # Read by the server process bench.run starts
+    for name, value in {
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'unused.db'}",
+        "STORAGE_BACKEND": "memory",
+        "MEMORY_STORAGE_LATENCY_MS": str(STORAGE_LATENCY * 1000),
+        "ADMISSION_CONTROL": "false",
+        "SECRET_KEY": SECRET_KEY,
+    }.items():
+        monkeypatch.setenv(name, value)
+    process, host, port = start_server("gevent", workers=1)
+    yield host, port
+    stop_server(process)
+
+
+def _signed_put(n):
+    # The local stand-in for a signed upload URL: no database, one storage round trip
+    data = b"%PDF-1.4 " + str(n).encode()
+    sha256 = hashlib.sha256(data).hexdigest()
+    token = LocalUploadSigner(SECRET_KEY).sign(f"objects/{sha256}.pdf", "application/pdf", len(data), sha256)
+    return "PUT", f"/api/uploads/{token}", data, {"Content-Type": "application/pdf"}
+
+
+def test_one_gevent_worker_overlaps_storage_calls(gevent_server):
+    host, port = gevent_server
+    started = time.monotonic()
+    with ThreadPoolExecutor(UPLOADS) as clients:
+        statuses = [status for status, _ in clients.map(lambda n: _send(host, port, *_signed_put(n)), range(UPLOADS))]
+    elapsed = time.monotonic() - started
+
+    assert statuses == [201] * UPLOADS
+    # One sync worker would take UPLOADS * STORAGE_LATENCY
+    assert elapsed < UPLOADS * STORAGE_LATENCY / 2
@@ -14,7 +14,7 @@ const AcademicPerformanceUpload = () => {
   const { toast } = useToast();
   const [grNumbers, setGrNumbers] = useState<string[]>([]);
   const [selectedGrNumber, setSelectedGrNumber] = useState("");
-  const [studentDetails, setStudentDetails] = useState<{ name: string; department: string } | null>(null);
+  const [studentDetails, setStudentDetails] = useState<{ name: string; academicYear: string } | null>(null);
   const [gradeHistory, setGradeHistory] = useState<File | null>(null);
   const [appearedForExam, setAppearedForExam] = useState<"yes" | "no" | "">("");
 
@@ -38,9 +38,9 @@ const AcademicPerformanceUpload = () => {
     if (selectedGrNumber) {
       const fetchStudentDetails = async () => {
         try {
-          const response = await fetch(`https://madms-backend.onrender.com/api/students/${selectedGrNumber}`);
-          const data = await response.json();
-          setStudentDetails({ name: data.name, department: data.department });
+          const response = await fetch(`https://madms-backend.onrender.com/api/students/status?gr_no=${encodeURIComponent(selectedGrNumber)}`);
+          const [data] = await response.json();
+          setStudentDetails(data ? { name: data.name, academicYear: data.academic_year } : null);
         } catch (error) {
           console.error("Error fetching student details:", error);
           setStudentDetails(null);
@@ -126,7 +126,7 @@ const AcademicPerformanceUpload = () => {
           {studentDetails && (
             <div className="mb-6 p-4 bg-gray-100 rounded-lg">
               <p className="text-gray-700"><strong>Name:</strong> {studentDetails.name}</p>
-              <p className="text-gray-700"><strong>Department:</strong> {studentDetails.department}</p>
+              <p className="text-gray-700"><strong>Academic Year:</strong> {studentDetails.academicYear}</p>
             </div>
           )}
 